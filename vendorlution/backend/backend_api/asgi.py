@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_api.settings')
 
 application = get_asgi_application()
+
+# the in-memory search indexes (SEARCH_ENGINE = "memory") are built before serving
+from main.search_engines import warm_up  # noqa: E402
+
+warm_up()
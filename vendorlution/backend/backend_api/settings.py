@@ -25,9 +25,11 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Third-party
     "rest_framework",
+    "django_filters",
     "corsheaders",
 
     # Local
@@ -96,6 +98,22 @@ USE_TZ = True
 STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Uploads are stored once per distinct content (main.storage); set MEDIA_STORAGE to
+# django.core.files.storage.FileSystemStorage for plain upload_to paths
+STORAGES = {
+    "default": {"BACKEND": os.environ.get("MEDIA_STORAGE", "main.storage.ContentAddressedStorage")},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# Widths (px) of the WebP/JPEG copies main.images makes of every uploaded image,
+# and the threads building them (0 = build inline after commit)
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "160,320,640,1280").split(","))
+IMAGE_VARIANT_WORKERS = int(os.environ.get("IMAGE_VARIANT_WORKERS", "2"))
+# Resumable chunked uploads (main.uploads); partial files stay outside MEDIA_ROOT until completed
+CHUNKED_UPLOAD_DIR = os.environ.get("CHUNKED_UPLOAD_DIR", str(BASE_DIR / "uploads-partial"))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get("CHUNKED_UPLOAD_MAX_SIZE", str(20 * 1024 * 1024)))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get("CHUNKED_UPLOAD_CHUNK_SIZE", str(2 * 1024 * 1024)))
+# seconds an unfinished or unclaimed upload is kept (purge_chunked_uploads)
+CHUNKED_UPLOAD_TTL = int(os.environ.get("CHUNKED_UPLOAD_TTL", str(24 * 3600)))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -125,6 +143,59 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
 }
 
+# ---------------- Cache ----------------
+# CACHE_BACKEND: locmem (per process, dev default) | file | redis.
+# Use redis when running several workers so invalidations reach all of them.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+_CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "vendorlution",
+        "OPTIONS": {"MAX_ENTRIES": _CACHE_MAX_ENTRIES},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_LOCATION", str(BASE_DIR / "cache")),
+        "OPTIONS": {"MAX_ENTRIES": _CACHE_MAX_ENTRIES},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    },
+}
+CACHES = {"default": _CACHE_BACKENDS[CACHE_BACKEND]}
+# Seconds a read-through catalog entry (product/vendor detail, category list) may live
+CATALOG_CACHE_TTL = int(os.environ.get("CATALOG_CACHE_TTL", "600"))
+
+# ---------------- Catalog search ----------------
+# Postgres text search configuration used for Product.search_vector
+PRODUCT_SEARCH_CONFIG = os.environ.get("PRODUCT_SEARCH_CONFIG", "english")
+# ?search= engine for product / vendor lists: "database" (full-text / icontains) or "memory" (in-process BM25)
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "database")
+# Seconds a facet-count result is cached per normalized filter query string
+CATALOG_FACETS_TTL = int(os.environ.get("CATALOG_FACETS_TTL", "60"))
+# Upper bound (seconds) for the /api/home/ payload; writes invalidate it sooner
+HOME_CACHE_TTL = int(os.environ.get("HOME_CACHE_TTL", "300"))
+# Sharded sitemaps / JSONL product feed written by `manage.py build_catalog_feeds`
+CATALOG_FEED_ROOT = os.environ.get("CATALOG_FEED_ROOT", str(BASE_DIR / "feeds"))
+# Cache-Control max-age (seconds) for the sitemap / feed endpoints
+CATALOG_FEED_TTL = int(os.environ.get("CATALOG_FEED_TTL", "3600"))
+# Static browse snapshots (`manage.py build_catalog_snapshots`), published under MEDIA_URL
+CATALOG_SNAPSHOT_ROOT = os.environ.get("CATALOG_SNAPSHOT_ROOT", str(MEDIA_ROOT / "snapshots"))
+CATALOG_SNAPSHOT_URL = os.environ.get("CATALOG_SNAPSHOT_URL", f"{MEDIA_URL}snapshots/")
+# Listing pages per category (and for the all-products list) captured in a snapshot
+CATALOG_SNAPSHOT_PAGES = int(os.environ.get("CATALOG_SNAPSHOT_PAGES", "3"))
+# Days for a view / wishlist / cart / order event to lose half its weight in Product.popularity
+POPULARITY_HALF_LIFE_DAYS = float(os.environ.get("POPULARITY_HALF_LIFE_DAYS", "7"))
+# Product detail views are buffered per process and written in one batch once
+# the buffer is this old (seconds) or covers this many products
+PRODUCT_VIEW_FLUSH_SECONDS = float(os.environ.get("PRODUCT_VIEW_FLUSH_SECONDS", "30"))
+PRODUCT_VIEW_FLUSH_SIZE = int(os.environ.get("PRODUCT_VIEW_FLUSH_SIZE", "1000"))
+# Products kept in each user's recently-viewed list, and how long (seconds) an idle list survives
+RECENTLY_VIEWED_LIMIT = int(os.environ.get("RECENTLY_VIEWED_LIMIT", "20"))
+RECENTLY_VIEWED_TTL = int(os.environ.get("RECENTLY_VIEWED_TTL", str(30 * 24 * 3600)))
+
 # ---------------- CORS / CSRF ----------------
 CORS_ALLOWED_ORIGINS = [
     FRONTEND_ORIGIN,
@@ -0,0 +1,81 @@
+# main/blurhash.py - BlurHash encoder for image placeholders
+"""
+encode(image) turns a Pillow image into a BlurHash string (about 20-30
+characters; https://blurha.sh): a few cosine components of a 32px
+thumbnail, which clients decode into a blurred preview while the real
+image loads. Plain Python, no extra dependency: the thumbnail is tiny and
+the sums are done separably (rows first), so it costs a few milliseconds
+on top of the resizing main.images does anyway.
+"""
+import math
+
+from PIL import Image
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+SAMPLE_SIZE = 32
+
+_SRGB_TO_LINEAR = [
+    c / 255 / 12.92 if c / 255 <= 0.04045 else ((c / 255 + 0.055) / 1.055) ** 2.4
+    for c in range(256)
+]
+
+
+def _linear_to_srgb(value):
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _base83(value, length):
+    return "".join(ALPHABET[value // 83 ** (length - i - 1) % 83] for i in range(length))
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(image, x_components=4, y_components=3):
+    """BlurHash of `image` with x_components * y_components (each 1-9) cosine terms."""
+    sample = image.convert("RGB")
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+    width, height = sample.size
+    pixels = [tuple(_SRGB_TO_LINEAR[c] for c in pixel) for pixel in sample.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    # row_sums[i][y] = sum over x of cos_x[i][x] * pixel(x, y), per channel
+    row_sums = [[None] * height for _ in range(x_components)]
+    for y in range(height):
+        row = pixels[y * width:(y + 1) * width]
+        for i in range(x_components):
+            weights = cos_x[i]
+            row_sums[i][y] = (
+                sum(w * p[0] for w, p in zip(weights, row)),
+                sum(w * p[1] for w, p in zip(weights, row)),
+                sum(w * p[2] for w, p in zip(weights, row)),
+            )
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            sums = [0.0, 0.0, 0.0]
+            for weight, rgb in zip(cos_y[j], row_sums[i]):
+                for channel in range(3):
+                    sums[channel] += weight * rgb[channel]
+            factors.append([total * scale for total in sums])
+
+    dc, ac = factors[0], factors[1:]
+    blurhash = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, math.floor(max(abs(c) for factor in ac for c in factor) * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max, max_value = 0, 1
+    blurhash += _base83(quantised_max, 1)
+    blurhash += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, math.floor(_sign_pow(c / max_value, 0.5) * 9 + 9.5))) for c in factor)
+        blurhash += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return blurhash
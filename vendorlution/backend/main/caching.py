@@ -0,0 +1,201 @@
+# main/caching.py - Versioned cache keys and read-through caching for catalog payloads
+"""
+Cached payloads embed the current version of every namespace they read.
+Namespaces are either collections ("product") or single rows
+("product:42"). Saving or deleting a row bumps both (after commit), so
+stale entries are never served again and simply age out of the cache.
+
+The backend is whatever CACHES["default"] is (locmem, file or Redis, see
+settings.CACHE_BACKEND). Hit/miss/stale/eviction counters are kept in the
+same cache so every worker reports into one set of numbers.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:ver:{}"
+STATS_KEY = "catalog:stats:{}"
+STAT_NAMES = ("hits", "misses", "stale", "evictions")
+
+
+def get_version(namespace):
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value an older entry was stored under.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(namespaces):
+    found = cache.get_many([VERSION_KEY.format(ns) for ns in namespaces])
+    return {ns: found.get(VERSION_KEY.format(ns)) or get_version(ns) for ns in namespaces}
+
+
+def bump_version(namespace):
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(namespace)
+
+
+def bump_on_commit(*namespaces):
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+    transaction.on_commit(bump)
+
+
+def versioned_key(prefix, namespaces, *parts):
+    versions = ".".join(str(get_version(ns)) for ns in namespaces)
+    return ":".join([prefix, versions, *map(str, parts)])
+
+
+# ---------------- counters ----------------
+
+def _count(name):
+    key = STATS_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_stats():
+    found = cache.get_many([STATS_KEY.format(name) for name in STAT_NAMES])
+    stats = {name: found.get(STATS_KEY.format(name), 0) for name in STAT_NAMES}
+    lookups = stats["hits"] + stats["misses"] + stats["stale"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([STATS_KEY.format(name) for name in STAT_NAMES])
+
+
+class _WriteLog:
+    """
+    Keys this process stored and when they expire (bounded). A miss on a
+    key that should still be alive means the backend evicted it.
+    """
+
+    def __init__(self, size=10000):
+        self.size = size
+        self.expires = OrderedDict()
+
+    def add(self, key, timeout):
+        self.expires[key] = time.monotonic() + timeout
+        self.expires.move_to_end(key)
+        while len(self.expires) > self.size:
+            self.expires.popitem(last=False)
+
+    def evicted(self, key):
+        expires = self.expires.pop(key, None)
+        return expires is not None and expires > time.monotonic()
+
+
+_written = _WriteLog()
+
+
+# ---------------- read-through ----------------
+
+def read_through(key, namespaces, build, timeout=None):
+    """
+    Return the cached payload for `key` while every namespace it depends
+    on is still at the version it was built against; otherwise call
+    build() and store the result.
+
+    `namespaces` (a list, or a callable returning one) is resolved and its
+    versions read *before* build() runs, so a write that commits during
+    the build leaves the entry under the older version: it reads as stale
+    and is rebuilt instead of being served until the TTL.
+    """
+    timeout = timeout or settings.CATALOG_CACHE_TTL
+    entry = cache.get(key)
+    if entry is not None:
+        versions, payload = entry
+        if get_versions(list(versions)) == versions:
+            _count("hits")
+            return payload
+        _count("stale")
+    else:
+        _count("misses")
+        if _written.evicted(key):
+            _count("evictions")
+
+    versions = get_versions(namespaces() if callable(namespaces) else namespaces)
+    payload = build()
+    cache.set(key, (versions, payload), timeout)
+    _written.add(key, timeout)
+    return payload
+
+
+def request_cache_key(request, prefix, *parts):
+    """Key for a response to `request`: host (absolute media URLs) and sorted query string."""
+    query = "&".join(
+        f"{name}={','.join(sorted(request.query_params.getlist(name)))}"
+        for name in sorted(request.query_params)
+    )
+    digest = hashlib.sha1(f"{request.build_absolute_uri('/')}?{query}".encode()).hexdigest()
+    return ":".join(["resp", prefix, *map(str, parts), digest])
+
+
+def _cached_headers(view, queryset):
+    """Validators (ETag/Last-Modified) stored with the entry when the view is conditional."""
+    validator_headers = getattr(view, "validator_headers", None)
+    return validator_headers(queryset) if validator_headers else {}
+
+
+class CachedRetrieveMixin:
+    """
+    Read-through cache for RetrieveAPIView GETs: a hit costs no queries.
+    Entries depend on "<cache_namespace>:<pk>" plus cache_dependencies().
+    """
+    cache_namespace = None
+
+    def cache_dependencies(self, instance):
+        return []
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().retrieve(request, *args, **kwargs)
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = request_cache_key(request, self.cache_namespace, self.lookup_field, lookup)
+
+        def namespaces():
+            instance = self.get_object()
+            return [f"{self.cache_namespace}:{instance.pk}", *self.cache_dependencies(instance)]
+
+        def build():
+            # fetched again after the versions were read, so it can't predate them
+            instance = self.get_object()
+            headers = _cached_headers(self, self.get_queryset().filter(pk=instance.pk))
+            return self.get_serializer(instance).data, headers
+
+        data, headers = read_through(key, namespaces, build)
+        return Response(data, headers=headers)
+
+
+class CachedListMixin:
+    """Read-through cache for ListAPIView GETs, keyed by query string, guarded by the collection version."""
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        parent_list = super().list
+
+        def build():
+            headers = _cached_headers(self, self.filter_queryset(self.get_queryset()))
+            return parent_list(request, *args, **kwargs).data, headers
+
+        key = request_cache_key(request, self.cache_namespace, "list")
+        data, headers = read_through(key, [self.cache_namespace], build)
+        return Response(data, headers=headers)
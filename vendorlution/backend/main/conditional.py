@@ -0,0 +1,104 @@
+# main/conditional.py - Conditional GET (ETag / Last-Modified) for list and detail views
+"""
+Validators come from one aggregate query over the rows a response would
+render: MAX() of each timestamp in `conditional_fields` plus a COUNT of
+the rows behind it (so deletions change the fingerprint too). When the
+client's If-None-Match / If-Modified-Since still matches, the view
+answers 304 without loading or serializing anything.
+
+Last-Modified can only carry the MAX(), so a deleted row or an edit to a
+row that is not the newest would still look unmodified to a client
+sending only If-Modified-Since. It is therefore sent for single rows
+validated by their own columns only; lists and details with related
+rows rely on the ETag alone. Views whose rows depend on the requesting
+user set conditional_per_user: the user goes into the ETag and responses
+vary on Authorization / Cookie.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    # Timestamp paths whose latest value changes whenever the payload does,
+    # e.g. ("updated_at", "vendor__updated_at", "images__updated_at")
+    conditional_fields = ("updated_at",)
+    conditional_per_user = False
+
+    def last_modified_is_safe(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return lookup_url_kwarg in self.kwargs and not any("__" in path for path in self.conditional_fields)
+
+    def get_validators(self, queryset):
+        """(etag, last_modified) for `queryset`, or (None, None) if it is empty; last_modified may be None."""
+        aggregates = {}
+        for i, path in enumerate(self.conditional_fields):
+            relation = path.rpartition("__")[0]
+            aggregates[f"max{i}"] = Max(path)
+            aggregates[f"count{i}"] = Count(f"{relation}__pk" if relation else "pk", distinct=True)
+        row = queryset.order_by().aggregate(**aggregates)
+        stamps = [row[f"max{i}"] for i in range(len(self.conditional_fields)) if row[f"max{i}"]]
+        if not stamps:
+            return None, None
+        last_modified = int(max(stamps).timestamp()) if self.last_modified_is_safe() else None
+        parts = [self.request.build_absolute_uri(), *(str(row[k]) for k in sorted(row))]
+        if self.conditional_per_user:
+            parts.append(f"user={self.request.user.pk}")
+        etag = f'W/"{hashlib.sha1("|".join(parts).encode()).hexdigest()}"'
+        return etag, last_modified
+
+    def validator_headers(self, queryset):
+        etag, last_modified = self.get_validators(queryset)
+        if etag is None:
+            return {}
+        headers = {"ETag": etag}
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        return headers
+
+    def vary(self, response):
+        if self.conditional_per_user:
+            patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
+
+    def conditional(self, queryset, render):
+        meta = self.request.META
+        if "HTTP_IF_NONE_MATCH" not in meta and "HTTP_IF_MODIFIED_SINCE" not in meta:
+            # Nothing to compare; read-through cached views bring their own headers
+            response = render()
+            if response.status_code == 200 and "ETag" not in response.headers:
+                for header, value in self.validator_headers(queryset).items():
+                    response.headers[header] = value
+            return self.vary(response)
+
+        etag, last_modified = self.get_validators(queryset)
+        if etag is None:
+            return self.vary(render())
+        not_modified = get_conditional_response(self.request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self.vary(not_modified)
+        response = render()
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+        return self.vary(response)
+
+    def list(self, request, *args, **kwargs):
+        parent_list = super().list
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()),
+            lambda: parent_list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        parent_retrieve = super().retrieve
+        if request.method not in ("GET", "HEAD"):
+            return parent_retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional(queryset, lambda: parent_retrieve(request, *args, **kwargs))
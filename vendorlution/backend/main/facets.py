@@ -0,0 +1,115 @@
+# main/facets.py - Facet counts for product listings
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+from django.db.models.functions import Cast
+
+from .caching import versioned_key
+from .models import Product
+
+# (label, lower bound inclusive, upper bound exclusive); None = open-ended
+PRICE_BUCKETS = [
+    ("0-50", None, Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100-250", Decimal("100"), Decimal("250")),
+    ("250-500", Decimal("250"), Decimal("500")),
+    ("500-1000", Decimal("500"), Decimal("1000")),
+    ("1000+", Decimal("1000"), None),
+]
+
+# Cache versions the counts depend on (bumped by main.signals)
+FACET_CACHE_NAMESPACES = ("product", "category", "vendor")
+
+# Params that change the page/order but not the matching set
+NON_FILTER_PARAMS = {"page", "page_size", "cursor", "count", "ordering", "facets", "format", "fields", "expand"}
+
+
+def _price_bucket():
+    whens = []
+    for i, (_label, low, high) in enumerate(PRICE_BUCKETS):
+        bounds = {}
+        if low is not None:
+            bounds["price__gte"] = low
+        if high is not None:
+            bounds["price__lt"] = high
+        whens.append(When(then=Value(i), **bounds))
+    return Case(*whens, output_field=IntegerField())
+
+
+def _grouped(queryset, facet, key, label):
+    return (
+        queryset.order_by()
+        .annotate(facet=Value(facet, output_field=CharField()), key=Cast(key, CharField()), label=label)
+        .values("facet", "key", "label")
+        .annotate(n=Count("pk"))
+        .values_list("facet", "key", "label", "n")
+    )
+
+
+def compute_facets(queryset, category_label="category__title", vendor_label="vendor__shop_name"):
+    """
+    Category / condition / price bucket / vendor counts for `queryset`,
+    fetched as one UNION ALL of four GROUP BYs (a single round trip).
+    The label paths point at the flat columns when counting ProductListing rows.
+    """
+    text = Value("", output_field=CharField())
+    grouped = _grouped(queryset, "category", F("category_id"), F(category_label))
+    grouped = grouped.union(
+        _grouped(queryset, "condition", F("condition"), text),
+        _grouped(queryset.annotate(price_bucket=_price_bucket()), "price", F("price_bucket"), text),
+        _grouped(queryset, "vendor", F("vendor_id"), F(vendor_label)),
+        all=True,
+    )
+
+    conditions = dict(Product.Condition.choices)
+    facets = {"category": [], "condition": [], "price": [], "vendor": []}
+    for facet, key, label, n in grouped:
+        if key is None:
+            continue
+        if facet == "condition":
+            facets[facet].append({"value": key, "label": conditions.get(key, key), "count": n})
+        elif facet == "price":
+            bucket, low, high = PRICE_BUCKETS[int(key)]
+            facets[facet].append({
+                "value": bucket,
+                "min": str(low) if low is not None else None,
+                "max": str(high) if high is not None else None,
+                "count": n,
+            })
+        else:
+            facets[facet].append({"value": int(key), "label": label, "count": n})
+
+    order = {bucket[0]: i for i, bucket in enumerate(PRICE_BUCKETS)}
+    facets["price"].sort(key=lambda b: order[b["value"]])
+    for name in ("category", "condition", "vendor"):
+        facets[name].sort(key=lambda b: (-b["count"], str(b["label"])))
+    return facets
+
+
+def facet_cache_key(query_params):
+    """
+    Normalized key: filter params only, sorted, values sorted, blanks dropped.
+    Versioned on the product / category / vendor namespaces, so a write to
+    any of them invalidates the counts along with the list they describe.
+    """
+    parts = []
+    for name in sorted(query_params.keys()):
+        if name in NON_FILTER_PARAMS:
+            continue
+        values = sorted(v.strip() for v in query_params.getlist(name) if v.strip())
+        if values:
+            parts.append(f"{name}={','.join(values)}")
+    digest = hashlib.sha1("&".join(parts).encode()).hexdigest()
+    return versioned_key("facets", FACET_CACHE_NAMESPACES, digest)
+
+
+def cached_facets(queryset, query_params, **labels):
+    key = facet_cache_key(query_params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, **labels)
+        cache.set(key, facets, getattr(settings, "CATALOG_FACETS_TTL", 60))
+    return facets
@@ -0,0 +1,212 @@
+# main/feeds.py - Sharded, gzip-compressed XML sitemaps and JSONL product feed
+"""
+Live products are split into shards by id range (SHARD_SIZE ids each, so
+a shard never holds more than 50,000 URLs). Every shard is written once as
+sitemap-<n>.xml.gz and feed-<n>.jsonl.gz under CATALOG_FEED_ROOT.
+
+manifest.json records each shard's fingerprint: MAX(updated_at) of its
+products, their categories and vendors, plus the count and id sum of the
+live rows. build_feeds() recomputes the fingerprints, which is one
+aggregate query per shard, and rewrites only the shards whose fingerprint
+moved. Rows are streamed in keyset chunks through iterator(), so memory
+does not grow with the catalog.
+"""
+import gzip
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+
+from .models import LIVE_PRODUCT, Product
+
+SHARD_SIZE = 50000
+CHUNK_SIZE = 2000
+MANIFEST = "manifest.json"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def feed_root():
+    return settings.CATALOG_FEED_ROOT
+
+
+def shard_path(kind, shard):
+    """kind is "sitemap" or "feed"."""
+    extension = "xml" if kind == "sitemap" else "jsonl"
+    return os.path.join(feed_root(), f"{kind}-{shard}.{extension}.gz")
+
+
+def product_url(product):
+    return f"{settings.FRONTEND_ORIGIN.rstrip('/')}/products/{product.pk}"
+
+
+def _shard_products(shard):
+    lo, hi = shard * SHARD_SIZE, (shard + 1) * SHARD_SIZE
+    return Product.objects.filter(LIVE_PRODUCT, pk__gt=lo, pk__lte=hi)
+
+
+def shard_fingerprint(shard):
+    row = _shard_products(shard).order_by().aggregate(
+        updated=Max("updated_at"),
+        category=Max("category__updated_at"),
+        vendor=Max("vendor__updated_at"),
+        count=Count("pk"),
+        ids=Sum("pk"),
+    )
+    stamps = [row[k] for k in ("updated", "category", "vendor") if row[k]]
+    return {
+        "shard": shard,
+        "fingerprint": "|".join(str(row[k]) for k in sorted(row)),
+        "count": row["count"],
+        "lastmod": max(stamps).isoformat() if stamps else None,
+    }
+
+
+# ---------------- manifest ----------------
+
+def load_manifest():
+    try:
+        with open(os.path.join(feed_root(), MANIFEST)) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {"shard_size": SHARD_SIZE, "shards": {}}
+
+
+def _replace(path, write):
+    """Write through a temp file and rename, so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def save_manifest(manifest):
+    def write(tmp):
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+    _replace(os.path.join(feed_root(), MANIFEST), write)
+
+
+# ---------------- shard writers ----------------
+
+def _stream(shard):
+    """Live products of a shard in id order, CHUNK_SIZE rows per keyset query."""
+    queryset = (
+        _shard_products(shard)
+        .select_related("category", "vendor")
+        .only(
+            "title", "price", "condition", "main_image", "updated_at", "stock",
+            "category", "category__title", "vendor", "vendor__shop_name",
+        )
+        .order_by("pk")
+    )
+    last_id = 0
+    while True:
+        count = 0
+        for product in queryset.filter(pk__gt=last_id)[:CHUNK_SIZE].iterator(chunk_size=CHUNK_SIZE):
+            count += 1
+            last_id = product.pk
+            yield product
+        if count < CHUNK_SIZE:
+            return
+
+
+def _feed_entry(product):
+    return {
+        "id": product.pk,
+        "title": product.title,
+        "url": product_url(product),
+        "price": str(product.price),
+        "condition": product.condition,
+        "in_stock": product.stock > 0,
+        "image": product.main_image.url if product.main_image else None,
+        "category": product.category.title if product.category else None,
+        "vendor": product.vendor.shop_name if product.vendor else None,
+        "updated_at": product.updated_at.isoformat(),
+    }
+
+
+def write_shard(shard):
+    """Rewrite both files of `shard` in one pass over its products."""
+    sitemap_tmp = f"{shard_path('sitemap', shard)}.tmp"
+    feed_tmp = f"{shard_path('feed', shard)}.tmp"
+    with gzip.open(sitemap_tmp, "wt", encoding="utf-8") as sitemap, gzip.open(feed_tmp, "wt", encoding="utf-8") as feed:
+        sitemap.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        for product in _stream(shard):
+            sitemap.write(
+                f"<url><loc>{escape(product_url(product))}</loc>"
+                f"<lastmod>{product.updated_at.date().isoformat()}</lastmod></url>\n"
+            )
+            feed.write(json.dumps(_feed_entry(product), separators=(",", ":")) + "\n")
+        sitemap.write("</urlset>\n")
+    os.replace(sitemap_tmp, shard_path("sitemap", shard))
+    os.replace(feed_tmp, shard_path("feed", shard))
+
+
+def _remove_shard(shard):
+    for kind in ("sitemap", "feed"):
+        try:
+            os.remove(shard_path(kind, shard))
+        except FileNotFoundError:
+            pass
+
+
+def _is_current(stored, state):
+    return (
+        stored is not None
+        and stored["fingerprint"] == state["fingerprint"]
+        and all(os.path.exists(shard_path(kind, state["shard"])) for kind in ("sitemap", "feed"))
+    )
+
+
+def ensure_shard(shard):
+    """Write `shard` if its files are missing; returns its manifest entry or None if it is empty."""
+    manifest = load_manifest()
+    stored = manifest["shards"].get(str(shard))
+    if stored is not None and all(os.path.exists(shard_path(kind, shard)) for kind in ("sitemap", "feed")):
+        return stored
+    state = shard_fingerprint(shard)
+    if state["count"] == 0:
+        return None
+    os.makedirs(feed_root(), exist_ok=True)
+    write_shard(shard)
+    manifest["shards"][str(shard)] = state
+    save_manifest(manifest)
+    return state
+
+
+def build_feeds(force=False):
+    """
+    Bring every shard up to date. Yields (shard, action) with action one of
+    "written", "unchanged" or "removed".
+    """
+    os.makedirs(feed_root(), exist_ok=True)
+    manifest = load_manifest()
+    if manifest.get("shard_size") != SHARD_SIZE:
+        manifest, force = {"shard_size": SHARD_SIZE, "shards": {}}, True
+    shards = manifest["shards"]
+    last = Product.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+    wanted = range((last - 1) // SHARD_SIZE + 1 if last else 0)
+
+    for shard in wanted:
+        state = shard_fingerprint(shard)
+        key = str(shard)
+        if state["count"] == 0:
+            if shards.pop(key, None) is not None:
+                _remove_shard(shard)
+                save_manifest(manifest)
+                yield shard, "removed"
+            continue
+        if not force and _is_current(shards.get(key), state):
+            yield shard, "unchanged"
+            continue
+        write_shard(shard)
+        shards[key] = state
+        save_manifest(manifest)
+        yield shard, "written"
+
+    for key in [k for k in shards if int(k) not in wanted]:
+        del shards[key]
+        _remove_shard(int(key))
+        save_manifest(manifest)
+        yield int(key), "removed"
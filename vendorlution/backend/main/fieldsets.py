@@ -0,0 +1,210 @@
+# main/fieldsets.py - Sparse fieldsets (?fields=) and on-demand expansion (?expand=)
+"""
+GET requests may shape serializer output:
+
+    ?fields=id,title,price,vendor.shop_name
+    ?expand=vendor,vendor.owner
+
+Once either parameter is present (even empty) the response is "sparse":
+  * `fields` keeps only the listed fields at each level; dotted names
+    select fields inside a nested object. A level with no entries keeps
+    all of its fields.
+  * nested objects collapse to their primary key(s) unless the relation
+    is listed in `expand` or addressed by a dotted `fields` entry.
+Without either parameter the output is unchanged.
+
+SparseFieldsetMixin applies this to serializers; SparseQuerysetMixin lets
+views load only the columns, joins and prefetches the shaped output
+needs.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _join(path, name):
+    return f"{path}.{name}" if path else name
+
+
+def _param_set(request, name):
+    values = set()
+    for raw in request.query_params.getlist(name):
+        values.update(part.strip() for part in raw.split(",") if part.strip())
+    return values
+
+
+class SparseOptions:
+    def __init__(self, fields, expand):
+        self.fields = fields
+        self.expand = expand
+
+    def field_names(self, path):
+        """Names requested at `path`, or None when the level is unrestricted."""
+        prefix = f"{path}." if path else ""
+        names = {f[len(prefix):].split(".")[0] for f in self.fields if f.startswith(prefix)}
+        return names or None
+
+    def is_expanded(self, path, name):
+        target = _join(path, name)
+        nested = f"{target}."
+        return target in self.expand or any(p.startswith(nested) for p in self.expand | self.fields)
+
+
+def sparse_options(request):
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return None
+    return SparseOptions(_param_set(request, FIELDS_PARAM), _param_set(request, EXPAND_PARAM))
+
+
+def _nested(field):
+    """(serializer, many) for a nested serializer field, else (None, False)."""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child, True
+    if isinstance(field, serializers.BaseSerializer):
+        return field, False
+    return None, False
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ?fields= / ?expand= from context["request"].
+
+    Meta.sparse_sources maps computed fields (SerializerMethodField etc.)
+    to the model attributes they read, so the queryset planner keeps them.
+    """
+
+    def _sparse_path(self):
+        parts, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                parts.append(node.field_name)
+            node = node.parent
+        return ".".join(reversed(parts))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        opts = sparse_options(self.context.get("request"))
+        if opts is None:
+            return fields
+        path = self._sparse_path()
+        wanted = opts.field_names(path)
+        for name in list(fields):
+            if wanted is not None and name not in wanted:
+                del fields[name]
+                continue
+            nested, many = _nested(fields[name])
+            if nested is not None and not opts.is_expanded(path, name):
+                fields[name] = _collapsed(fields[name], nested, many)
+        return fields
+
+
+def _collapsed(field, nested, many):
+    if field.source == "*":
+        # relation flattened into this row (read models): keep its id column
+        return serializers.ReadOnlyField(source=nested.fields["id"].source)
+    return serializers.PrimaryKeyRelatedField(read_only=True, many=many, source=field.source)
+
+
+# ---------------- queryset planning ----------------
+
+def _plan(serializer_class, opts, path, prefix, model):
+    """
+    Columns (only), joins (select_related) and prefetches needed to render
+    `serializer_class` for `model` at API `path` / ORM `prefix`.
+    """
+    only, select, prefetch = {prefix + model._meta.pk.name}, [], []
+    fields = serializer_class().get_fields()
+    wanted = opts.field_names(path)
+    extra_sources = getattr(getattr(serializer_class, "Meta", None), "sparse_sources", {})
+
+    for name, field in fields.items():
+        if field.write_only or (wanted is not None and name not in wanted):
+            continue
+        if name in extra_sources:
+            only.update(prefix + src for src in extra_sources[name])
+            continue
+        source = (field.source or name).split(".")[0]
+        nested, _many = _nested(field)
+        expanded = nested is not None and opts.is_expanded(path, name)
+        if source == "*" and nested is not None:
+            # flattened relation: its columns live on this model, keyed by its id column
+            only.add(prefix + type(nested)().fields["id"].source)
+            if expanded:
+                sub_only, sub_select, sub_prefetch = _plan(type(nested), opts, _join(path, name), prefix, model)
+                only |= sub_only
+                select += sub_select
+                prefetch += sub_prefetch
+            continue
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+
+        if not model_field.is_relation:
+            only.add(prefix + source)
+        elif model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            only.add(prefix + source)
+            if expanded:
+                select.append(prefix + source)
+                sub_only, sub_select, sub_prefetch = _plan(
+                    type(nested), opts, _join(path, name), f"{prefix}{source}__", model_field.related_model
+                )
+                only |= sub_only
+                select += sub_select
+                prefetch += sub_prefetch
+        else:
+            related = model_field.related_model
+            if expanded:
+                sub_only, sub_select, sub_prefetch = _plan(type(nested), opts, _join(path, name), "", related)
+            else:
+                sub_only, sub_select, sub_prefetch = {related._meta.pk.name}, [], []
+            if model_field.one_to_many:
+                sub_only.add(model_field.field.name)
+            queryset = related._default_manager.only(*sub_only)
+            if sub_select:
+                queryset = queryset.select_related(*sub_select)
+            if sub_prefetch:
+                queryset = queryset.prefetch_related(*sub_prefetch)
+            prefetch.append(Prefetch(prefix + source, queryset=queryset))
+    return only, select, prefetch
+
+
+def sparse_queryset(serializer_class, queryset, request, keep=()):
+    """
+    Reshape `queryset` for a sparse request; returns it untouched otherwise.
+    `keep` names extra columns the view reads (e.g. client-selectable orderings).
+    """
+    opts = sparse_options(request)
+    if opts is None or queryset.query.is_sliced:
+        return queryset
+    only, select, prefetch = _plan(serializer_class, opts, "", "", queryset.model)
+    # ordering/cursor columns are read back from the rows
+    names = {f.name for f in queryset.model._meta.concrete_fields}
+    for item in [*queryset.query.order_by, *keep]:
+        if isinstance(item, str) and item.lstrip("-") in names:
+            only.add(item.lstrip("-"))
+    queryset = queryset.select_related(None).prefetch_related(None).only(*only)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """Generic-view mixin: narrow get_queryset() to what ?fields= / ?expand= render."""
+
+    def sparse(self, queryset):
+        ordering_fields = getattr(self, "ordering_fields", None)
+        keep = ordering_fields if isinstance(ordering_fields, (list, tuple)) else ()
+        return sparse_queryset(self.get_serializer_class(), queryset, self.request, keep)
+
+    def get_queryset(self):
+        return self.sparse(super().get_queryset())
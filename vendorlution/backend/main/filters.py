@@ -0,0 +1,23 @@
+# main/filters.py - Query-string filters for public product listings
+from django_filters import rest_framework as django_filters
+
+from .models import Product
+from .models_extended import ProductListing
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    ?min_price=&max_price=&condition=&category=<id> over ProductListing rows.
+    Plain column comparisons so they combine with the live-listing partial
+    indexes (price range on main_listing_price_idx, category and
+    condition on main_listing_category_idx / main_listing_condition_idx).
+    """
+    min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    condition = django_filters.ChoiceFilter(choices=Product.Condition.choices)
+    # plain id column on the read model (no lookup query, no join)
+    category = django_filters.NumberFilter(field_name="category_id")
+
+    class Meta:
+        model = ProductListing
+        fields = ["min_price", "max_price", "condition", "category"]
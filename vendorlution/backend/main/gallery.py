@@ -0,0 +1,55 @@
+# main/gallery.py - Adding many gallery images to a product at once
+"""
+add_images() backs POST /api/vendor/products/<pk>/images/ and the
+gallery_uploads tokens of ProductCreateSerializer. Uploaded files are
+streamed into storage one after another (the storage reads them in
+chunks), then every ProductImage row goes in with a single bulk_create.
+
+bulk_create sends no post_save, so what main.signals would do per saved
+image happens here once for the batch: variants are queued for each new
+row and the product's cache version is bumped.
+"""
+from django.db import transaction
+
+from .caching import bump_on_commit
+from .images import queue_variants
+from .models import Product, ProductImage
+from .storage import release
+
+MAX_IMAGES = 20
+
+
+def add_images(product, files=(), names=(), primary=None):
+    """
+    Add uploaded `files`, then already-stored `names`, to the product's
+    gallery. `primary` is the index (within that order) of the new primary
+    image; by default the first one becomes primary if the product has
+    none. Returns the created rows.
+    """
+    field = ProductImage._meta.get_field("image")
+    images, stored = [], []
+    try:
+        for upload in files:
+            image = ProductImage(product=product)
+            name = field.generate_filename(image, upload.name)
+            image.image = field.storage.save(name, upload, max_length=field.max_length)
+            stored.append(image.image.name)
+            images.append(image)
+        images.extend(ProductImage(product=product, image=name) for name in names)
+        with transaction.atomic():
+            # the product row lock serializes concurrent primary changes
+            Product.objects.select_for_update().only("pk").get(pk=product.pk)
+            current = ProductImage.objects.filter(product=product, is_primary=True)
+            if primary is None and images and not current.exists():
+                primary = 0
+            if primary is not None:
+                current.update(is_primary=False)
+                images[primary].is_primary = True
+            ProductImage.objects.bulk_create(images)
+    except Exception:
+        release(*stored)
+        raise
+    for image in images:
+        queue_variants(image, "image")
+    bump_on_commit(f"product:{product.pk}")
+    return images
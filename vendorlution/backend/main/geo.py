@@ -0,0 +1,172 @@
+# main/geo.py - Geohash grid and ?near= radius filtering without PostGIS
+"""
+Vendors carry latitude/longitude plus a geohash of that point; product
+listings copy their vendor's. A radius query
+
+    ?near=<lat>,<lng>&radius=<km>
+
+first narrows rows to the 3x3 block of geohash cells around the point
+(prefix matches on an indexed column), then keeps rows whose great-circle
+distance is within the radius and sorts them nearest first. Everything
+is plain SQL arithmetic, so it runs on stock Postgres and on SQLite.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+GEOHASH_PRECISION = 9  # ~5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+NEAR_PARAM = "near"
+RADIUS_PARAM = "radius"
+DEFAULT_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 500.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base-32 geohash of the point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees."""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _decode_center(geohash):
+    """(lat, lng) at the centre of a geohash cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def cover(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells together contain every point within
+    `radius_km`: the cell holding the point plus its 8 neighbours, at the
+    finest precision whose cells are at least `radius_km` across. None when
+    the radius is too large for any grid level to help.
+    """
+    # width shrinks towards the poles; size cells for the far edge of the circle
+    far_lat = min(abs(latitude) + radius_km / KM_PER_DEGREE, 89.9)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if min(height * KM_PER_DEGREE, width * KM_PER_DEGREE * math.cos(math.radians(far_lat))) >= radius_km:
+            break
+    else:
+        return None
+    center = encode(latitude, longitude, precision)
+    # centre of the cell, so neighbour offsets never land on a boundary
+    lat, lng = _decode_center(center)
+    cells = set()
+    for dlat in (-1, 0, 1):
+        cell_lat = lat + dlat * height
+        if not -90 <= cell_lat <= 90:
+            continue
+        for dlng in (-1, 0, 1):
+            cell_lng = (lng + dlng * width + 180) % 360 - 180
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def distance_km(latitude, longitude, lat_field="latitude", lng_field="longitude"):
+    """Haversine distance (km) from the point to each row, as an ORM expression."""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2, lng2 = Radians(F(lat_field)), Radians(F(lng_field))
+    half_chord = (
+        Power(Sin((lat2 - Value(lat1)) / 2), 2)
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(lng1)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(half_chord, Value(1.0))), output_field=FloatField())
+
+
+def parse_near(request):
+    """(lat, lng, radius_km) from ?near=&radius=, or None when ?near= is absent."""
+    raw = request.query_params.get(NEAR_PARAM)
+    if not raw:
+        return None
+    try:
+        latitude, longitude = (float(part) for part in raw.split(","))
+    except ValueError:
+        raise ValidationError({NEAR_PARAM: "Expected near=<latitude>,<longitude>"})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({NEAR_PARAM: "Coordinates out of range"})
+    try:
+        radius = float(request.query_params.get(RADIUS_PARAM, DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise ValidationError({RADIUS_PARAM: "Expected a distance in km"})
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValidationError({RADIUS_PARAM: f"Must be between 0 and {MAX_RADIUS_KM:g} km"})
+    return latitude, longitude, radius
+
+
+class NearFilter(filters.BaseFilterBackend):
+    """
+    ?near=<lat>,<lng>&radius=<km> for models with latitude/longitude/geohash
+    columns. Rows without coordinates are left out; results are annotated
+    with `distance` (km) and sorted nearest first unless ?ordering= is given
+    (place this backend before OrderingFilter).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        near = parse_near(request)
+        if near is None:
+            return queryset
+        latitude, longitude, radius = near
+        cells = cover(latitude, longitude, radius)
+        if cells:
+            in_cells = Q()
+            for cell in cells:
+                in_cells |= Q(geohash__startswith=cell)
+            queryset = queryset.filter(in_cells)
+        return (
+            queryset.filter(latitude__isnull=False, longitude__isnull=False)
+            .annotate(distance=distance_km(latitude, longitude))
+            .filter(distance__lte=radius)
+            .order_by("distance")
+        )
+
+
+class DistanceFieldMixin:
+    """Serializer mixin: adds "distance" (km) to rows that NearFilter annotated."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        distance = getattr(instance, "distance", None)
+        if distance is not None:
+            data["distance"] = round(distance, 3)
+        return data
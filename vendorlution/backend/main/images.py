@@ -0,0 +1,227 @@
+# main/images.py - Resized WebP/JPEG variants of uploaded images, built in a worker pool
+"""
+Every image field listed in IMAGE_FIELDS has a sibling "<field>_variants"
+JSON column:
+
+    {"src": "products/5/main/kettle.jpg",
+     "width": 1600, "height": 1200, "blurhash": "LKO2?U%2Tw=w]~RBVZRi};RPxuwH",
+     "files": {"webp": {"320": "variants/products/5/main/kettle/320.webp", ...},
+               "jpeg": {"320": "variants/products/5/main/kettle/320.jpg", ...}}}
+
+When a row is saved with an image whose variants were not built yet
+("src" differs), main.signals queues build_variants() after commit. The
+job runs on a thread pool of IMAGE_VARIANT_WORKERS threads (Pillow drops
+the GIL while decoding, resizing and encoding) or inline when that is 0,
+and stores the file map only if the row still holds the same image.
+ImageVariantsField renders the map as URLs plus a ready-made srcset;
+ImagePlaceholderField gives the dimensions and BlurHash (main.blurhash)
+so grids can reserve space and paint a preview before any image loads.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from .blurhash import encode as blurhash
+from .models import Banner, Product, ProductImage, VendorProfile
+from .models_extended import Shipment
+from .storage import release
+
+IMAGE_FIELDS = {
+    Product: ["main_image"],
+    ProductImage: ["image"],
+    VendorProfile: ["logo", "banner"],
+    Banner: ["image"],
+}
+# Other fields saved through the default storage: no variants, but the
+# storage counts a reference for them all the same (see main.signals)
+FILE_FIELDS = {
+    Shipment: ["proof_of_dropoff"],
+}
+FORMATS = {"webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+           "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True})}
+
+
+def variants_field(field):
+    return f"{field}_variants"
+
+
+def variant_path(name, width, fmt):
+    stem = os.path.splitext(name)[0]
+    return f"variants/{stem}/{width}.{FORMATS[fmt][1]}"
+
+
+def variant_files(variants):
+    return [name for by_width in variants.get("files", {}).values() for name in by_width.values()]
+
+
+def release_image(name, variants):
+    """Give back the storage references of an image and its variants (see main.storage)."""
+    release(name, *variant_files(variants or {}))
+
+
+def has_current_variants(instance, field):
+    name = getattr(instance, field).name
+    return not name or getattr(instance, variants_field(field)).get("src") == name
+
+
+# ---------------- rendering ----------------
+
+def _encode(image, fmt):
+    pil_format, _extension, options = FORMATS[fmt]
+    if fmt == "jpeg" and image.mode != "RGB":
+        flat = Image.new("RGB", image.size, "white")
+        flat.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = flat
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(name):
+    """Write every width/format of the stored image `name`; returns the "<field>_variants" value."""
+    with default_storage.open(name) as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+    # never upscale: widths past the original collapse into one full-width copy
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_VARIANT_WIDTHS})
+    files = {fmt: {} for fmt in FORMATS}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in FORMATS:
+            path = variant_path(name, width, fmt)
+            files[fmt][str(width)] = default_storage.save(path, ContentFile(_encode(resized, fmt)))
+    return {"src": name, "width": image.width, "height": image.height, "blurhash": blurhash(image), "files": files}
+
+
+# ---------------- jobs ----------------
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix="variants")
+    return _executor
+
+
+def build_variants(model, pk, field, name):
+    """Render `name` and store the result on the row, unless its image has changed since."""
+    try:
+        variants = render_variants(name)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        variants = {"src": name}  # unreadable: remember it so saves stop re-queueing it
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if instance is None or getattr(instance, field).name != name:
+            release(*variant_files(variants))
+            return None
+        replaced = variant_files(getattr(instance, variants_field(field)))
+        setattr(instance, variants_field(field), variants)
+        instance.save(update_fields=[variants_field(field), "updated_at"])
+    # every save above took a reference of its own, also for a file identical to one replaced
+    release(*replaced)
+    return variants
+
+
+def build_variants_in_thread(*job):
+    """build_variants() for pool threads, which outlive requests."""
+    try:
+        build_variants(*job)
+    finally:
+        connections.close_all()
+
+
+def queue_variants(instance, field):
+    """Build variants for the image now on `instance` once the current transaction commits."""
+    job = (type(instance), instance.pk, field, getattr(instance, field).name)
+
+    def submit():
+        if settings.IMAGE_VARIANT_WORKERS:
+            _pool().submit(build_variants_in_thread, *job)
+        else:
+            build_variants(*job)
+    transaction.on_commit(submit)
+
+
+def missing_variants(model, field, force=False, chunk_size=500):
+    """Rows of `model` whose `field` image has no current variants, as (pk, name) in keyset chunks."""
+    queryset = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).order_by("pk")
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id).values_list("pk", field, variants_field(field))[:chunk_size])
+        if not rows:
+            return
+        for pk, name, variants in rows:
+            # rendered before placeholders existed: build again to add them
+            if force or variants.get("src") != name or ("files" in variants and "blurhash" not in variants):
+                yield pk, name
+        last_id = rows[-1][0]
+
+
+# ---------------- serializing ----------------
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    {"webp": {"<width>": url}, "jpeg": {...}, "srcset": {"webp": "url 320w, ...", "jpeg": ...}}
+    for the image in `image_field`, or None until its variants are built.
+    Declare it as "<image_field>_variants" and list that name in
+    Meta.sparse_sources with both columns.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.image_field), super().get_attribute(instance)
+
+    def to_representation(self, value):
+        image, variants = value
+        if not image or not variants or variants.get("src") != image.name or not variants.get("files"):
+            return None
+        request = self.context.get("request")
+
+        def url(path):
+            url = default_storage.url(path)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        data, srcset = {}, {}
+        for fmt, by_width in variants["files"].items():
+            urls = {width: url(path) for width, path in sorted(by_width.items(), key=lambda item: int(item[0]))}
+            data[fmt] = urls
+            srcset[fmt] = ", ".join(f"{u} {width}w" for width, u in urls.items())
+        data["srcset"] = srcset
+        return data
+
+
+class ImagePlaceholderField(serializers.ReadOnlyField):
+    """
+    {"width", "height", "blurhash"} of the image in `image_field` (read from
+    its variants column), or None until they are computed. Declare it as
+    "<image_field>_placeholder" and list both columns in Meta.sparse_sources.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs.setdefault("source", variants_field(image_field))
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.image_field), super().get_attribute(instance)
+
+    def to_representation(self, value):
+        image, variants = value
+        if not image or not variants or variants.get("src") != image.name or "blurhash" not in variants:
+            return None
+        return {key: variants[key] for key in ("width", "height", "blurhash")}
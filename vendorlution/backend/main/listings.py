@@ -0,0 +1,96 @@
+# main/listings.py - Keeps the ProductListing read model in step with the catalog
+from .models import Product
+from .models_extended import ProductListing
+
+# Product fields copied into ProductListing (saves touching none of them skip the refresh)
+LISTING_SOURCE_FIELDS = {
+    "title", "slug", "price", "stock", "condition", "main_image", "main_image_variants", "rating_avg",
+    "is_active", "is_sold", "created_at", "popularity", "category", "vendor",
+}
+LISTING_COLUMNS = [
+    "title", "slug", "price", "stock", "condition", "main_image", "main_image_variants", "rating_avg",
+    "is_active", "is_sold", "created_at", "popularity",
+    "category_id", "category_title", "category_slug",
+    "vendor_id", "vendor_shop_name", "vendor_slug",
+    "latitude", "longitude", "geohash",
+]
+
+
+def _listing_row(product):
+    category, vendor = product.category, product.vendor
+    return ProductListing(
+        product_id=product.pk,
+        title=product.title,
+        slug=product.slug,
+        price=product.price,
+        stock=product.stock,
+        condition=product.condition,
+        main_image=product.main_image.name or None,
+        main_image_variants=product.main_image_variants,
+        rating_avg=product.rating_avg,
+        is_active=product.is_active,
+        is_sold=product.is_sold,
+        created_at=product.created_at,
+        popularity=product.popularity,
+        category_id=category.pk if category else None,
+        category_title=category.title if category else None,
+        category_slug=category.slug if category else None,
+        vendor_id=vendor.pk if vendor else None,
+        vendor_shop_name=vendor.shop_name if vendor else None,
+        vendor_slug=vendor.slug if vendor else None,
+        latitude=vendor.latitude if vendor else None,
+        longitude=vendor.longitude if vendor else None,
+        geohash=vendor.geohash if vendor else "",
+    )
+
+
+def refresh_listings(product_ids):
+    """Upsert the listing rows for `product_ids` (one SELECT, one INSERT .. ON CONFLICT)."""
+    products = Product.objects.filter(pk__in=product_ids).select_related("category", "vendor")
+    rows = [_listing_row(product) for product in products]
+    if rows:
+        ProductListing.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["product"], update_fields=LISTING_COLUMNS
+        )
+    return len(rows)
+
+
+def sync_category(category):
+    # the exclude() makes no-op saves write nothing
+    ProductListing.objects.filter(category_id=category.pk).exclude(
+        category_title=category.title, category_slug=category.slug
+    ).update(category_title=category.title, category_slug=category.slug)
+
+
+def detach_category(category_id):
+    """Product.category is SET_NULL, which Django applies with a bulk UPDATE (no signals)."""
+    ProductListing.objects.filter(category_id=category_id).update(
+        category_id=None, category_title=None, category_slug=None
+    )
+
+
+def sync_vendor(vendor):
+    copied = {
+        "vendor_shop_name": vendor.shop_name,
+        "vendor_slug": vendor.slug,
+        "latitude": vendor.latitude,
+        "longitude": vendor.longitude,
+        "geohash": vendor.geohash,
+    }
+    ProductListing.objects.filter(vendor_id=vendor.pk).exclude(**copied).update(**copied)
+
+
+def rebuild_listings(chunk_size=1000):
+    """
+    Re-derive every listing row, walking Product ids in keyset chunks so
+    memory stays flat. Yields the number of rows written per chunk.
+    """
+    last_id = 0
+    while True:
+        ids = list(
+            Product.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield refresh_listings(ids)
+        last_id = ids[-1]
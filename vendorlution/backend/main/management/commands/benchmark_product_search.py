@@ -0,0 +1,162 @@
+# main/management/commands/benchmark_product_search.py
+"""
+Compare ?search= latency on /api/products/ between the old DRF SearchFilter
+(icontains over title/detail/category/vendor), the full-text filter and the
+in-process BM25 engine (main.search_engines, SEARCH_ENGINE="memory").
+
+Seed a synthetic catalog first (kept apart from real data by the "bench-" prefix):
+    python manage.py benchmark_product_search --seed 1000000
+    python manage.py benchmark_product_search --queries 200
+    python manage.py benchmark_product_search --cleanup
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from main.models import Product, ProductCategory, VendorProfile
+from main.search import ProductSearchFilter, fts_enabled, refresh_product_search_vectors
+from main.search_engines import get_search_engine, indexes
+from main.views import ProductListCreateView
+
+BENCH_PREFIX = "bench-"
+
+WORDS = (
+    "vintage leather jacket denim jeans sneakers running shoes hoodie backpack laptop "
+    "charger textbook calculator desk lamp chair mattress kettle microwave fridge bicycle "
+    "helmet guitar keyboard headphones speaker monitor mouse printer phone case tablet "
+    "camera lens tripod watch bracelet necklace ring perfume blazer dress skirt shirt "
+    "jersey cap beanie scarf gloves boots sandals heels notebook stationery marker "
+    "engineering chemistry biology economics accounting law medicine statistics physics "
+    "wireless bluetooth portable rechargeable waterproof leather cotton wool silk classic "
+    "retro modern compact foldable ergonomic gaming student campus residence kitchen"
+).split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+class MemorySearchFilter(filters.SearchFilter):
+    """The memory engine as a filter backend, whatever SEARCH_ENGINE says."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        return get_search_engine("memory").filter_queryset(request, queryset, view, terms)
+
+
+class Command(BaseCommand):
+    help = "Benchmark product search latency (icontains vs full-text vs in-process BM25) on a synthetic catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert N synthetic products before benchmarking")
+        parser.add_argument("--batch", type=int, default=5000, help="bulk_create batch size when seeding")
+        parser.add_argument("--queries", type=int, default=100, help="Search queries per mode")
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--random-seed", type=int, default=42)
+        parser.add_argument("--cleanup", action="store_true", help="Delete synthetic rows and exit")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["random_seed"])
+
+        if options["cleanup"]:
+            self._cleanup()
+            return
+        if options["seed"]:
+            self._seed(rng, options["seed"], options["batch"])
+        modes = [("icontains", filters.SearchFilter)]
+        if fts_enabled():
+            modes.append(("fulltext", ProductSearchFilter))
+        else:
+            self.stdout.write("Full-text search needs PostgreSQL; skipping it.")
+        modes.append(("bm25", MemorySearchFilter))
+
+        terms = [" ".join(rng.sample(WORDS, rng.choice([1, 1, 2]))) for _ in range(options["queries"])]
+        total = Product.objects.filter(is_active=True).count()
+        self.stdout.write(f"Active products: {total:,}  queries/mode: {len(terms)}")
+        started = time.perf_counter()
+        indexes["product"].build()
+        self.stdout.write(f"BM25 index built in {time.perf_counter() - started:.1f}s")
+
+        for label, backend in modes:
+            samples = [self._run_query(backend(), term, options["page_size"]) for term in terms]
+            self.stdout.write(
+                f"{label:>10}: p50={statistics.median(samples):8.1f}ms  "
+                f"p95={_percentile(samples, 95):8.1f}ms  p99={_percentile(samples, 99):8.1f}ms  "
+                f"max={max(samples):8.1f}ms"
+            )
+
+    # ---------------- measuring ----------------
+
+    def _run_query(self, backend, term, page_size):
+        """Filter + COUNT + first page, which is what one paginated list request costs."""
+        request = Request(APIRequestFactory().get("/api/products/", {"search": term}))
+        view = ProductListCreateView()
+        view.request = request
+        started = time.perf_counter()
+        qs = backend.filter_queryset(request, view.get_queryset(), view)
+        qs.count()
+        list(qs.values_list("id", flat=True)[:page_size])
+        return (time.perf_counter() - started) * 1000
+
+    # ---------------- fixtures ----------------
+
+    def _seed(self, rng, count, batch):
+        self.stdout.write(f"Seeding {count:,} synthetic products...")
+        categories = [
+            ProductCategory.objects.get_or_create(title=f"{BENCH_PREFIX}{w}")[0] for w in WORDS[:40]
+        ]
+        vendors = []
+        for i in range(200):
+            user, _ = User.objects.get_or_create(username=f"{BENCH_PREFIX}vendor-{i}")
+            vendor, _ = VendorProfile.objects.get_or_create(
+                user=user, defaults={"shop_name": f"{BENCH_PREFIX}{_sentence(rng, 2)} {i}"}
+            )
+            vendors.append(vendor)
+
+        start = Product.objects.filter(slug__startswith=BENCH_PREFIX).count()
+        created = 0
+        while created < count:
+            size = min(batch, count - created)
+            rows = [
+                Product(
+                    title=_sentence(rng, rng.randint(2, 5)),
+                    slug=f"{BENCH_PREFIX}{start + created + i}",
+                    detail=_sentence(rng, rng.randint(10, 40)),
+                    price=Decimal(rng.randint(10, 50000)) / 10,
+                    stock=rng.randint(0, 5),
+                    condition=rng.choice(Product.Condition.values),
+                    category=rng.choice(categories),
+                    vendor=rng.choice(vendors),
+                )
+                for i in range(size)
+            ]
+            with transaction.atomic():
+                Product.objects.bulk_create(rows)
+            created += size
+            self.stdout.write(f"  {created:,}/{count:,}")
+
+        self.stdout.write("Building search vectors...")
+        refresh_product_search_vectors(Product.objects.filter(slug__startswith=BENCH_PREFIX))
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Product._meta.db_table}")
+
+    def _cleanup(self):
+        deleted, _ = Product.objects.filter(slug__startswith=BENCH_PREFIX).delete()
+        ProductCategory.objects.filter(title__startswith=BENCH_PREFIX).delete()
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted:,} synthetic rows"))
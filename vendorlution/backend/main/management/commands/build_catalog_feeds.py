@@ -0,0 +1,33 @@
+# main/management/commands/build_catalog_feeds.py
+"""
+Write gzip XML sitemaps and the JSONL product feed (50k-id shards) to
+CATALOG_FEED_ROOT. Only shards whose products, categories or vendors
+changed since the last run are rewritten; --force rewrites all of them.
+Usage: python manage.py build_catalog_feeds [--force]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.feeds import build_feeds
+
+
+class Command(BaseCommand):
+    help = "Incrementally rebuild sharded sitemaps and the JSONL product feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every shard even if its fingerprint is unchanged'
+        )
+
+    def handle(self, *args, **options):
+        counts = {"written": 0, "unchanged": 0, "removed": 0}
+        for shard, action in build_feeds(force=options['force']):
+            counts[action] += 1
+            if action != "unchanged":
+                self.stdout.write(f"  shard {shard}: {action}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Feeds in {settings.CATALOG_FEED_ROOT}: {counts['written']} written, "
+            f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+        ))
@@ -0,0 +1,30 @@
+# main/management/commands/build_catalog_snapshots.py
+"""
+Export static browse snapshots (categories, featured vendors, first pages
+of each category) as content-hashed gzip JSON shards plus manifest.json.
+Unchanged shards keep their file; only new content is written.
+Usage: python manage.py build_catalog_snapshots [--pages 3]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.snapshots import build_snapshots
+
+
+class Command(BaseCommand):
+    help = "Write static catalog snapshot shards and publish their manifest"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=None,
+            help='Listing pages per category (default: CATALOG_SNAPSHOT_PAGES)'
+        )
+
+    def handle(self, *args, **options):
+        result = build_snapshots(pages=options['pages'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['shards']} shards in {settings.CATALOG_SNAPSHOT_ROOT}: "
+            f"{result['written']} written, {result['unchanged']} unchanged, {result['removed']} stale files removed"
+        ))
@@ -0,0 +1,35 @@
+# main/management/commands/build_product_similarity.py
+"""
+Rebuild the precomputed "similar products" table from order, wishlist and
+cart co-occurrence. Meant to run nightly; /api/products/<pk>/similar/
+keeps serving the previous lists until each chunk is swapped in.
+Usage: python manage.py build_product_similarity [--top-k 20] [--chunk-size 500]
+"""
+from django.core.management.base import BaseCommand
+
+from main.similarity import TOP_K, build_similarity
+
+
+class Command(BaseCommand):
+    help = "Recompute the top-K similar products of every product"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=TOP_K,
+            help=f'Neighbours kept per product (default: {TOP_K})'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Products scored per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for written in build_similarity(top_k=options['top_k'], chunk_size=options['chunk_size']):
+            total += written
+            self.stdout.write(f"  {total} neighbour rows written", ending="\r")
+        self.stdout.write(self.style.SUCCESS(f"Stored {total} similar-product rows"))
@@ -0,0 +1,28 @@
+# main/management/commands/catalog_cache_stats.py
+"""
+Show read-through catalog cache counters (hits, misses, stale, evictions).
+Usage: python manage.py catalog_cache_stats [--reset]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.caching import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show (and optionally reset) catalog cache hit/miss/eviction counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Zero the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"backend: {settings.CACHES['default']['BACKEND']}")
+        for name, value in cache_stats().items():
+            self.stdout.write(f"{name:>10}: {value}")
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
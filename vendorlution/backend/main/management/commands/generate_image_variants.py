@@ -0,0 +1,49 @@
+# main/management/commands/generate_image_variants.py
+"""
+Build the resized WebP/JPEG variants of every stored image that has none
+(uploads made before main.images existed, or rows written with .update()),
+or whose variants predate the dimensions/BlurHash placeholder.
+Uploads made through the models are handled by main.signals on their own.
+Usage: python manage.py generate_image_variants [--workers 4] [--force]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice, repeat
+
+from django.core.management.base import BaseCommand
+
+from main.images import IMAGE_FIELDS, build_variants, build_variants_in_thread, missing_variants
+
+
+class Command(BaseCommand):
+    help = "Generate missing image variants (thumbnails / srcset sources) in a thread pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Images rendered in parallel; 0 renders in this thread (default: 4)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild variants that already exist (e.g. after changing IMAGE_VARIANT_WIDTHS)'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        workers = options['workers']
+        batch_size = max(workers, 1) * 8
+        with ThreadPoolExecutor(max_workers=workers) if workers else nullcontext() as pool:
+            run = pool.map if pool else map
+            build = build_variants_in_thread if pool else build_variants
+            for model, fields in IMAGE_FIELDS.items():
+                for field in fields:
+                    jobs = missing_variants(model, field, force=options['force'])
+                    while batch := list(islice(jobs, batch_size)):
+                        pks, names = zip(*batch)
+                        list(run(build, repeat(model), pks, repeat(field), names))
+                        total += len(batch)
+                        self.stdout.write(f"  {total} images processed", ending="\r")
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {total} images"))
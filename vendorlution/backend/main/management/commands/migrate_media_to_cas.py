@@ -0,0 +1,83 @@
+# main/management/commands/migrate_media_to_cas.py
+"""
+Move images stored before ContentAddressedStorage (plain MEDIA_ROOT
+paths) into the cas/ layout. Each file is streamed through the storage,
+so it is hashed and written in chunks and duplicates are stored once;
+the row (and for products the listing) is then pointed at the new name.
+Variants built for the old name stay valid and are kept as they are.
+Usage: python manage.py migrate_media_to_cas [--delete-originals]
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.images import IMAGE_FIELDS, variants_field
+from main.models import Product
+from main.models_extended import ProductListing
+from main.storage import PREFIX, ContentAddressedStorage
+
+
+def legacy_rows(model, field, chunk_size=500):
+    """(pk, name, variants) of rows whose `field` is a non-empty name outside cas/, in keyset chunks."""
+    queryset = (
+        model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+        .exclude(**{f"{field}__startswith": f"{PREFIX}/"}).order_by("pk")
+    )
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id).values_list("pk", field, variants_field(field))[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def is_referenced(name):
+    return any(
+        model.objects.filter(**{field: name}).exists()
+        for model, fields in IMAGE_FIELDS.items() for field in fields
+    )
+
+
+class Command(BaseCommand):
+    help = "Stream existing MEDIA_ROOT images into content-addressed storage and repoint their rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-originals',
+            action='store_true',
+            help='Remove each old file once no row refers to it any more'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not main.storage.ContentAddressedStorage (see MEDIA_STORAGE)")
+        moved = missing = deleted = 0
+        for model, fields in IMAGE_FIELDS.items():
+            for field in fields:
+                for pk, legacy, variants in legacy_rows(model, field):
+                    if not default_storage.exists(legacy):
+                        missing += 1
+                        continue
+                    with default_storage.open(legacy) as fh:
+                        name = default_storage.save(legacy, fh)
+                    changes = {field: name}
+                    if variants.get("src") == legacy:
+                        changes[variants_field(field)] = {**variants, "src": name}
+                    with transaction.atomic():
+                        updated = model.objects.filter(pk=pk, **{field: legacy}).update(**changes)
+                        if updated and model is Product:
+                            ProductListing.objects.filter(pk=pk, main_image=legacy).update(
+                                main_image=name, main_image_variants=changes.get("main_image_variants", variants)
+                            )
+                    if not updated:
+                        default_storage.delete(name)  # the row changed meanwhile; drop our reference
+                        continue
+                    moved += 1
+                    if options['delete_originals'] and not is_referenced(legacy):
+                        default_storage.delete(legacy)
+                        deleted += 1
+                    self.stdout.write(f"  {moved} images moved", ending="\r")
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} images point at files that do not exist; left as they are"))
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} images into {PREFIX}/ ({deleted} originals deleted)"))
@@ -0,0 +1,19 @@
+# main/management/commands/purge_chunked_uploads.py
+"""
+Delete chunked uploads that were abandoned or never attached to a product
+within CHUNKED_UPLOAD_TTL: their partial files are removed and completed
+files lose the reference the upload held (see main.uploads).
+Run this command hourly via cron: python manage.py purge_chunked_uploads
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.models_extended import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = "Remove expired chunked uploads and their files"
+
+    def handle(self, *args, **options):
+        deleted, _ = ChunkedUpload.objects.filter(expires_at__lt=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired uploads"))
@@ -0,0 +1,28 @@
+# main/management/commands/rebuild_product_listings.py
+"""
+Rebuild the ProductListing read model from Product/ProductCategory/VendorProfile.
+Signals keep it current; run this after bulk imports or raw .update() calls.
+Usage: python manage.py rebuild_product_listings [--chunk-size 1000]
+"""
+from django.core.management.base import BaseCommand
+
+from main.listings import rebuild_listings
+
+
+class Command(BaseCommand):
+    help = "Re-derive every product listing card, streaming products in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Products read and upserted per round trip (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for written in rebuild_listings(chunk_size=options['chunk_size']):
+            total += written
+            self.stdout.write(f"  {total} listings written", ending="\r")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} product listings"))
@@ -0,0 +1,30 @@
+# main/management/commands/recompute_popularity.py
+"""
+Recompute Product.popularity (and the listing copy) from product views,
+wishlist adds, cart adds and completed orders. Signals keep the scores
+current between runs; schedule this nightly to fold in anything written
+around them (bulk imports, raw updates, changed weights or half-life).
+Usage: python manage.py recompute_popularity [--chunk-size 5000]
+"""
+from django.core.management.base import BaseCommand
+
+from main.popularity import recompute_popularity
+
+
+class Command(BaseCommand):
+    help = "Recompute time-decayed popularity scores in product id chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Products scored per UPDATE statement (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        changed = 0
+        for rows in recompute_popularity(chunk_size=options['chunk_size']):
+            changed += rows
+            self.stdout.write(f"  {changed} scores changed", ending="\r")
+        self.stdout.write(self.style.SUCCESS(f"Recomputed popularity ({changed} scores changed)"))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("main", "Product")
+    ProductCategory = apps.get_model("main", "ProductCategory")
+    VendorProfile = apps.get_model("main", "VendorProfile")
+    config = getattr(settings, "PRODUCT_SEARCH_CONFIG", "english")
+
+    category_title = Subquery(ProductCategory.objects.filter(pk=OuterRef("category_id")).values("title")[:1])
+    shop_name = Subquery(VendorProfile.objects.filter(pk=OuterRef("vendor_id")).values("shop_name")[:1])
+    Product.objects.update(
+        search_vector=(
+            SearchVector("title", weight="A", config=config)
+            + SearchVector(category_title, weight="B", config=config)
+            + SearchVector(shop_name, weight="B", config=config)
+            + SearchVector("detail", weight="C", config=config)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_product_is_sold_product_sold_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='main_product_search_gin'),
+        ),
+    ]
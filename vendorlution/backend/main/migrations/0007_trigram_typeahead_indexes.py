@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ('product', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='main_product_title_trgm')),
+    ('vendorprofile', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('shop_name'), name='gin_trgm_ops'), name='main_vendor_shop_trgm')),
+]
+
+
+def _pg_trgm_available(schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm is a contrib module; without it typeahead falls back to the in-process prefix index
+    if not _pg_trgm_available(schema_editor):
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for model_name, index in TRIGRAM_INDEXES:
+        schema_editor.add_index(apps.get_model('main', model_name), index)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _model_name, index in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_product_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Database-only on purpose: the indexes are not part of model state, so SQLite
+    # table rebuilds in later migrations never try to re-create a gin_trgm_ops index.
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_listings(apps, schema_editor):
+    Product = apps.get_model("main", "Product")
+    ProductListing = apps.get_model("main", "ProductListing")
+    last_id = 0
+    while True:
+        chunk = list(Product.objects.filter(pk__gt=last_id).select_related("category", "vendor").order_by("pk")[:1000])
+        if not chunk:
+            return
+        ProductListing.objects.bulk_create([
+            ProductListing(
+                product_id=p.pk, title=p.title, slug=p.slug, price=p.price, stock=p.stock,
+                condition=p.condition, main_image=p.main_image.name or None, rating_avg=p.rating_avg,
+                is_active=p.is_active, is_sold=p.is_sold, created_at=p.created_at,
+                category_id=p.category_id,
+                category_title=p.category.title if p.category else None,
+                category_slug=p.category.slug if p.category else None,
+                vendor_id=p.vendor_id,
+                vendor_shop_name=p.vendor.shop_name if p.vendor else None,
+                vendor_slug=p.vendor.slug if p.vendor else None,
+            )
+            for p in chunk
+        ])
+        last_id = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_trigram_typeahead_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='main.product')),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=230)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('condition', models.CharField(choices=[('new', 'New'), ('like_new', 'Like New'), ('very_good', 'Very Good'), ('good', 'Good'), ('fair', 'Fair'), ('poor', 'Poor')], max_length=20)),
+                ('main_image', models.ImageField(blank=True, null=True, upload_to='')),
+                ('rating_avg', models.FloatField(default=0.0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_sold', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('category_title', models.CharField(blank=True, max_length=200, null=True)),
+                ('category_slug', models.SlugField(blank=True, max_length=220, null=True)),
+                ('vendor_id', models.BigIntegerField(blank=True, null=True)),
+                ('vendor_shop_name', models.CharField(blank=True, max_length=150, null=True)),
+                ('vendor_slug', models.SlugField(blank=True, max_length=170, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['-created_at', '-product'], name='main_listing_created_idx'), models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['-rating_avg', '-product'], name='main_listing_rating_idx'), models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['-rating_avg', '-created_at'], name='main_listing_popular_idx'), models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['price', 'product'], name='main_listing_price_idx'), models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['category_id', '-created_at', '-product'], name='main_listing_category_idx'), models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['condition', '-created_at', '-product'], name='main_listing_condition_idx'), models.Index(fields=['vendor_id'], name='main_listing_vendor_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_product_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='main_listing_popular_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='popularity',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_sold', False)), fields=['-popularity', '-product'], name='main_listing_popular_idx'),
+        ),
+        migrations.AddField(
+            model_name='productviewday',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_days', to='main.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='productviewday',
+            constraint=models.UniqueConstraint(fields=('product', 'day'), name='main_viewday_product_day_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_product_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='main.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='main.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['neighbor'], name='main_similarity_neighbor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='main_similarity_product_rank_uniq')],
+            },
+        ),
+    ]
@@ -3,10 +3,14 @@ from __future__ import annotations
 from decimal import Decimal
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .geo import encode as geohash_encode
+
 
 # -------------------- Upload helpers --------------------
 
@@ -56,13 +60,33 @@ class VendorProfile(TimeStampedModel):
     description = models.TextField(blank=True)
     logo = models.ImageField(upload_to=upload_vendor_logo, blank=True, null=True)
     banner = models.ImageField(upload_to=upload_vendor_banner, blank=True, null=True)
+    # Resized WebP/JPEG copies of logo/banner, written by main.images
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    banner_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.TextField(blank=True)
+    # Meetup location; geohash is derived on save and backs ?near= (see main.geo)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90.0), MaxValueValidator(90.0)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180.0), MaxValueValidator(180.0)])
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     rating_avg = models.FloatField(default=0.0, validators=[MinValueValidator(0.0), MaxValueValidator(5.0)])
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        # the pg_trgm typeahead index on UPPER(shop_name) is created by migration 0007
+        # on Postgres only; it is kept out of model state so SQLite never sees it
+        indexes = [
+            # geohash prefix (LIKE 'abc%') lookups; the opclass is ignored off Postgres
+            models.Index(fields=["geohash"], opclasses=["varchar_pattern_ops"], name="main_vendor_geohash_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.shop_name)[:170]
+        located = self.latitude is not None and self.longitude is not None
+        self.geohash = geohash_encode(self.latitude, self.longitude) if located else ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -85,6 +109,10 @@ class ProductCategory(TimeStampedModel):
         return self.title
 
 
+# Rows shown on public listings; ProductListing's partial indexes are scoped to it
+LIVE_PRODUCT = models.Q(is_active=True, is_sold=False)
+
+
 class Product(TimeStampedModel):
     class Condition(models.TextChoices):
         NEW = "new", "New"
@@ -106,13 +134,24 @@ class Product(TimeStampedModel):
     sold_at = models.DateTimeField(blank=True, null=True)  # ⭐ NEW FIELD - Track when item was sold
     condition = models.CharField(max_length=20, choices=Condition.choices, default=Condition.NEW)
     main_image = models.ImageField(upload_to=upload_product_main_image, blank=True, null=True)
+    # Resized WebP/JPEG copies of main_image, written by main.images
+    main_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     rating_avg = models.FloatField(default=0.0, validators=[MinValueValidator(0.0), MaxValueValidator(5.0)])
+    # Time-decayed activity score (log space), maintained by main.popularity
+    popularity = models.FloatField(default=0.0, editable=False)
+    # Detail page views, buffered in memory and flushed in batches by main.view_counts
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted title/category/vendor/detail document, kept current by main.signals
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["-created_at"]),
             models.Index(fields=["-rating_avg"]),
             models.Index(fields=["is_sold"]),  # ⭐ NEW INDEX for faster queries
+            GinIndex(fields=["search_vector"], name="main_product_search_gin"),
+            # (the pg_trgm typeahead index on UPPER(title) lives in migration 0007, Postgres only)
+            # public lists read ProductListing, whose partial indexes serve each ordering
         ]
 
     def save(self, *args, **kwargs):
@@ -136,6 +175,7 @@ class Product(TimeStampedModel):
 class ProductImage(TimeStampedModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to=upload_product_image)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_primary = models.BooleanField(default=False)
 
     def __str__(self):
@@ -345,6 +385,7 @@ class Notification(TimeStampedModel):
         ORDER = "order", "Order"
         PROMO = "promo", "Promotion"
         DISPUTE = "dispute", "Dispute"
+        SAVED_SEARCH = "saved_search", "Saved search"
         SYSTEM = "system", "System"
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
@@ -425,6 +466,7 @@ class SiteSettings(TimeStampedModel):
 
 class Banner(TimeStampedModel):
     image = models.ImageField(upload_to=upload_site_banner)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     title = models.CharField(max_length=200, blank=True)
     link = models.URLField(blank=True)
     active = models.BooleanField(default=True)
@@ -1,11 +1,13 @@
-# main/models_extended.py - NEW models for Shipments and Disputes
+# main/models_extended.py - NEW models for Shipments, Disputes, saved searches and catalog read models
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
 from django.core.validators import MinValueValidator
 
-from .models import Order, TimeStampedModel
+from .models import LIVE_PRODUCT, Order, Product, ProductCategory, TimeStampedModel
 
 
 class Shipment(TimeStampedModel):
@@ -123,4 +125,159 @@ class Dispute(TimeStampedModel):
         self.resolution_notes = notes
         self.resolved_by = resolved_by
         self.resolved_at = timezone.now()
-        self.save(update_fields=["status", "resolution_notes", "resolved_by", "resolved_at"])
\ No newline at end of file
+        self.save(update_fields=["status", "resolution_notes", "resolved_by", "resolved_at"])
+
+
+class ProductListing(models.Model):
+    """
+    Denormalized product card (read model): everything a listing grid shows,
+    in one narrow table so public lists need no joins. Rows are written only
+    by main.listings (signals + rebuild_product_listings), never by hand.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="listing")
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=230)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    stock = models.PositiveIntegerField(default=0)
+    condition = models.CharField(max_length=20, choices=Product.Condition.choices)
+    main_image = models.ImageField(blank=True, null=True)
+    main_image_variants = models.JSONField(default=dict, blank=True)
+    rating_avg = models.FloatField(default=0.0)
+    is_active = models.BooleanField(default=True)
+    is_sold = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    popularity = models.FloatField(default=0.0)
+    # copied from the category / vendor rows (plain columns, no FK joins)
+    category_id = models.BigIntegerField(blank=True, null=True)
+    category_title = models.CharField(max_length=200, blank=True, null=True)
+    category_slug = models.SlugField(max_length=220, blank=True, null=True)
+    vendor_id = models.BigIntegerField(blank=True, null=True)
+    vendor_shop_name = models.CharField(max_length=150, blank=True, null=True)
+    vendor_slug = models.SlugField(max_length=170, blank=True, null=True)
+    # vendor location (see main.geo)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # one per ordering / filter of the public product lists, each ending in the keyset tie-breaker
+            models.Index(fields=["-created_at", "-product"], condition=LIVE_PRODUCT, name="main_listing_created_idx"),
+            models.Index(fields=["-rating_avg", "-product"], condition=LIVE_PRODUCT, name="main_listing_rating_idx"),
+            models.Index(fields=["-popularity", "-product"], condition=LIVE_PRODUCT, name="main_listing_popular_idx"),
+            models.Index(fields=["price", "product"], condition=LIVE_PRODUCT, name="main_listing_price_idx"),
+            models.Index(
+                fields=["category_id", "-created_at", "-product"], condition=LIVE_PRODUCT, name="main_listing_category_idx"
+            ),
+            models.Index(
+                fields=["condition", "-created_at", "-product"], condition=LIVE_PRODUCT, name="main_listing_condition_idx"
+            ),
+            models.Index(fields=["vendor_id"], name="main_listing_vendor_idx"),
+            models.Index(
+                fields=["geohash"], opclasses=["varchar_pattern_ops"], condition=LIVE_PRODUCT,
+                name="main_listing_geohash_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Listing({self.title})"
+
+
+class ProductViewDay(models.Model):
+    """Product detail views per day; source of the "view" term in main.popularity."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="view_days")
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "day"], name="main_viewday_product_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.day}: {self.views}"
+
+
+class ProductSimilarity(models.Model):
+    """Precomputed top-K neighbours of a product (written by main.similarity, read by /similar/)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="similar_to")
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "rank"], name="main_similarity_product_rank_uniq"),
+        ]
+        indexes = [models.Index(fields=["neighbor"], name="main_similarity_neighbor_idx")]
+
+    def __str__(self):
+        return f"{self.product_id} ~ {self.neighbor_id} ({self.score:.3f})"
+
+
+class SavedSearch(TimeStampedModel):
+    """A buyer's stored product search; new matching listings create a Notification."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="saved_searches")
+    name = models.CharField(max_length=100, blank=True)
+    query = models.CharField(max_length=200, blank=True)
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, null=True, blank=True)
+    condition = models.CharField(max_length=20, choices=Product.Condition.choices, blank=True)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(Decimal("0.00"))])
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(Decimal("0.00"))])
+    is_active = models.BooleanField(default=True)
+    # number of SavedSearchKey rows; a product must hit all of them (see main.saved_searches)
+    key_count = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"SavedSearch({self.user.username}, {self.query!r})"
+
+
+class SavedSearchKey(models.Model):
+    """Inverted index entry: one search term or filter bucket of a SavedSearch."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="keys")
+    key = models.CharField(max_length=120)
+
+    class Meta:
+        indexes = [models.Index(fields=["key", "search"], name="main_savedsearch_key_idx")]
+
+    def __str__(self):
+        return f"{self.key} -> {self.search_id}"
+
+
+class MediaBlob(models.Model):
+    """A file in the content-addressed media store (main.storage) and how many fields reference it."""
+    name = models.CharField(max_length=100, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} x{self.refs}"
+
+
+def new_upload_token():
+    return secrets.token_urlsafe(24)
+
+
+class ChunkedUpload(TimeStampedModel):
+    """A resumable upload (main.uploads): chunks go to a partial file until it is finalized into storage."""
+    class Status(models.TextChoices):
+        OPEN = "open", "Open"
+        COMPLETE = "complete", "Complete"
+
+    token = models.CharField(max_length=32, unique=True, default=new_upload_token, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chunked_uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    # storage name once complete; handed to a Product/ProductImage by main.uploads.claim()
+    file = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Upload {self.token} ({self.offset}/{self.size})"
@@ -1,6 +1,240 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class CustomPagination(PageNumberPagination):
     page_size = 10                    # default page size
     page_size_query_param = "page_size"  # allow clients to set ?page_size=xx
-    max_page_size = 100               # cap to avoid abuse
\ No newline at end of file
+    max_page_size = 100               # cap to avoid abuse
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from planner statistics instead of COUNT(*).
+    Unfiltered tables use pg_class.reltuples; anything else reads the
+    top-level "Plan Rows" of EXPLAIN. Non-Postgres backends count exactly.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return int(row[0])
+        sql, params = queryset.order_by().values("pk").query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the queryset's active ordering plus `id`,
+    e.g. (created_at, id) or (rating_avg, id), so each page is an index
+    range scan with no OFFSET and no COUNT(*).
+
+    ?cursor=<opaque>      position returned in `next` / `previous`
+    ?page_size=<n>        same cap as CustomPagination
+    ?count=exact|estimate optional total (estimate = planner statistics)
+
+    A search engine that keeps only its best hits (main.search_engines
+    MemorySearchEngine) sets request.search_hit_limit; the response then
+    carries it as `search_hit_limit`, since the pages end there.
+
+    Ordering columns must be non-null; the ordering itself comes from the
+    view (queryset.order_by / OrderingFilter / search rank).
+    """
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["d"] == "p")
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if cursor:
+            queryset = queryset.filter(self._after(cursor["v"], reverse))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    # ---------------- ordering ----------------
+
+    def get_ordering(self, queryset):
+        """[(field, descending)] from the queryset, with the primary key appended as tie-breaker."""
+        pk = queryset.model._meta.pk.attname
+        ordering = []
+        for item in queryset.query.order_by or queryset.model._meta.ordering or []:
+            if not isinstance(item, str):
+                raise TypeError("KeysetPagination only supports field-name orderings")
+            name = item.lstrip("-")
+            ordering.append((pk if name == "pk" else name, item.startswith("-")))
+        if not any(name == pk for name, _desc in ordering):
+            ordering.append((pk, ordering[-1][1] if ordering else True))
+        return ordering
+
+    def _order_by(self, reverse):
+        return [f"{'-' if desc != reverse else ''}{name}" for name, desc in self.ordering]
+
+    def _after(self, values, reverse):
+        """
+        Rows strictly after `values` in the (possibly reversed) ordering:
+        f1 <= v1 AND (f1 < v1 OR (f1 = v1 AND f2 < v2) OR ...), with the
+        leading bound repeated so the planner gets an index range.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(self.ordering, values):
+            op = "lt" if desc != reverse else "gt"
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        name, desc = self.ordering[0]
+        bound = "lte" if desc != reverse else "gte"
+        return Q(**{f"{name}__{bound}": values[0]}) & condition
+
+    # ---------------- cursor encoding ----------------
+
+    def _field(self, model, name):
+        parts = name.split("__")
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        try:
+            return model._meta.get_field(parts[-1])
+        except FieldDoesNotExist:
+            return None  # annotation such as search_rank
+
+    def _value(self, obj, name):
+        for part in name.split("__"):
+            obj = getattr(obj, part)
+        return obj
+
+    @staticmethod
+    def _jsonable(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, obj, direction):
+        values = [self._jsonable(self._value(obj, name)) for name, _desc in self.ordering]
+        raw = json.dumps({"d": direction, "v": values}, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            cursor = json.loads(raw)
+            values = cursor["v"]
+            if cursor["d"] not in ("n", "p") or len(values) != len(self.ordering):
+                raise ValueError
+            decoded = []
+            for (name, _desc), value in zip(self.ordering, values):
+                field = self._field(self.model, name)
+                decoded.append(field.to_python(value) if field is not None else value)
+            cursor["v"] = decoded
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    # ---------------- count / response ----------------
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        self.count_is_estimate = mode == "estimate"
+        if mode == "exact":
+            return queryset.count()
+        if mode == "estimate":
+            return estimate_count(queryset)
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], "n")
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], "p")
+
+    def get_paginated_response(self, data):
+        body = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "count": self.count,
+        }
+        if self.count is not None:
+            body["count_is_estimate"] = self.count_is_estimate
+        hit_limit = getattr(self.request, "search_hit_limit", None)
+        if hit_limit is not None:
+            body["search_hit_limit"] = hit_limit
+        body["results"] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer", "nullable": True},
+                "count_is_estimate": {"type": "boolean"},
+                "search_hit_limit": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {"name": self.cursor_query_param, "required": False, "in": "query", "schema": {"type": "string"}},
+            {"name": self.page_size_query_param, "required": False, "in": "query", "schema": {"type": "integer"}},
+            {"name": self.count_query_param, "required": False, "in": "query",
+             "schema": {"type": "string", "enum": ["exact", "estimate"]}},
+        ]
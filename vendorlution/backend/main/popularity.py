@@ -0,0 +1,180 @@
+# main/popularity.py - Time-decayed popularity score for products
+"""
+popularity = ln( sum over events of weight * 2 ** (age_from_epoch / half_life) )
+
+Every event (view, wishlist add, cart add, completed order line) adds
+its weight scaled by how far after EPOCH it happened, so newer activity
+outweighs older activity without rewriting any row as time passes: the
+decay factor for "now" is the same for every product and ordering by the
+stored value is ordering by the decayed score. The sum is kept in log
+space (log-sum-exp) so it never overflows a float.
+
+add_popularity() applies one event incrementally; recompute_popularity()
+re-derives every score from the source tables in set-based chunks (see
+the recompute_popularity command). Product.popularity and
+ProductListing.popularity always move together.
+"""
+import math
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Order, Product
+from .models_extended import ProductListing
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+WEIGHTS = {"view": 1.0, "wishlist": 3.0, "cart": 5.0, "order": 10.0}
+# exp() of anything below this is 0 for a float; Postgres raises on underflow instead
+_MIN_EXPONENT = -50.0
+
+
+def decay_rate():
+    """Per-day growth rate of new event weights (ln 2 / half-life)."""
+    return math.log(2) / float(getattr(settings, "POPULARITY_HALF_LIFE_DAYS", 7))
+
+
+def event_score(kind, count=1, when=None):
+    """Log-space contribution of `count` events of `kind` at `when`."""
+    when = when or timezone.now()
+    days = (when - EPOCH).total_seconds() / 86400
+    return math.log(WEIGHTS[kind] * count) + decay_rate() * days
+
+
+def _log_add(score):
+    # ln(e^a + e^b) = max(a, b) + ln(1 + e^-|a - b|)
+    current, score = F("popularity"), Value(score)
+    gap = Least(Abs(current - score), Value(-_MIN_EXPONENT))
+    return Greatest(current, score) + Ln(Value(1.0) + Exp(-gap))
+
+
+def add_popularity(product_ids, kind, count=1, when=None):
+    """Fold `count` `kind` events into the score of each product in `product_ids`."""
+    increment = _log_add(event_score(kind, count, when))
+    with transaction.atomic():
+        Product.objects.filter(pk__in=product_ids).update(popularity=increment)
+        ProductListing.objects.filter(product_id__in=product_ids).update(popularity=increment)
+
+
+def add_order_popularity(order):
+    """Completed order: every line counts `quantity` order events."""
+    for item in order.items.all():
+        add_popularity([item.product_id], "order", item.quantity, order.updated_at)
+
+
+# (product id, views, log-space score) rows in VALUES; ids deleted since the
+# views were buffered simply match nothing
+_RECORD_VIEWS_SQL = """
+    WITH batch (product_id, views, score) AS (VALUES {rows}),
+    live AS (SELECT b.* FROM batch b JOIN main_product p ON p.id = b.product_id),
+    days AS (
+        INSERT INTO main_productviewday (product_id, day, views)
+        SELECT product_id, %s, views FROM live
+        ON CONFLICT (product_id, day) DO UPDATE SET views = main_productviewday.views + EXCLUDED.views
+    ),
+    bumped AS (
+        UPDATE main_product p SET
+            view_count = p.view_count + live.views,
+            popularity = GREATEST(p.popularity, live.score)
+                + LN(1 + EXP(-LEAST(ABS(p.popularity - live.score), %s)))
+        FROM live WHERE p.id = live.product_id
+        RETURNING p.id, p.popularity
+    )
+    UPDATE main_productlisting SET popularity = bumped.popularity
+    FROM bumped WHERE main_productlisting.product_id = bumped.id
+"""
+
+
+def record_product_views(counts, when=None):
+    """
+    Add {product_id: views} to today's ProductViewDay rows (kept for the
+    batch recompute), to Product.view_count and to each product's score,
+    in one statement however many products the batch holds.
+    """
+    counts = {pk: n for pk, n in counts.items() if n > 0}
+    if not counts:
+        return
+    day = (when or timezone.now()).astimezone(dt_timezone.utc).date()
+    # scored at the start of the day, exactly as the batch recompute sees the row
+    day_start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    rows = ", ".join(["(%s::integer, %s::integer, %s::float8)"] * len(counts))
+    params = [value for pk, n in counts.items() for value in (pk, n, event_score("view", n, day_start))]
+    with connection.cursor() as cursor:
+        cursor.execute(_RECORD_VIEWS_SQL.format(rows=rows), [*params, day, -_MIN_EXPONENT])
+
+
+# ---------------- batch recompute ----------------
+
+# One row per event: (product_id, log-space score). Timestamps are turned
+# into days since EPOCH; %(lo)s / %(hi)s bound the product id chunk.
+_EVENTS_SQL = """
+    SELECT product_id, LN(%(w_view)s * views)
+        + %(rate)s * EXTRACT(EPOCH FROM (day::timestamptz - %(epoch)s)) / 86400 AS score
+    FROM main_productviewday WHERE product_id BETWEEN %(lo)s AND %(hi)s AND views > 0
+    UNION ALL
+    SELECT product_id, LN(%(w_wishlist)s)
+        + %(rate)s * EXTRACT(EPOCH FROM (created_at - %(epoch)s)) / 86400
+    FROM main_wishlist WHERE product_id BETWEEN %(lo)s AND %(hi)s
+    UNION ALL
+    SELECT product_id, LN(%(w_cart)s)
+        + %(rate)s * EXTRACT(EPOCH FROM (created_at - %(epoch)s)) / 86400
+    FROM main_cartitem WHERE product_id BETWEEN %(lo)s AND %(hi)s
+    UNION ALL
+    SELECT i.product_id, LN(%(w_order)s * i.quantity)
+        + %(rate)s * EXTRACT(EPOCH FROM (o.updated_at - %(epoch)s)) / 86400
+    FROM main_orderitem i JOIN main_order o ON o.id = i.order_id
+    WHERE i.product_id BETWEEN %(lo)s AND %(hi)s AND o.status = %(completed)s
+"""
+
+_RECOMPUTE_SQL = f"""
+    WITH events AS ({_EVENTS_SQL}),
+    peaks AS (SELECT product_id, MAX(score) AS peak FROM events GROUP BY product_id),
+    totals AS (
+        SELECT e.product_id, p.peak + LN(SUM(EXP(GREATEST(e.score - p.peak, %(min_exp)s)))) AS score
+        FROM events e JOIN peaks p ON p.product_id = e.product_id
+        GROUP BY e.product_id, p.peak
+    )
+    UPDATE main_product SET popularity = COALESCE(totals.score, 0)
+    FROM main_product AS chunk LEFT JOIN totals ON totals.product_id = chunk.id
+    WHERE main_product.id = chunk.id AND chunk.id BETWEEN %(lo)s AND %(hi)s
+        AND main_product.popularity IS DISTINCT FROM COALESCE(totals.score, 0)
+"""
+
+_COPY_TO_LISTINGS_SQL = """
+    UPDATE main_productlisting SET popularity = p.popularity
+    FROM main_product p
+    WHERE main_productlisting.product_id = p.id AND p.id BETWEEN %(lo)s AND %(hi)s
+        AND main_productlisting.popularity <> p.popularity
+"""
+
+
+def recompute_popularity(chunk_size=5000):
+    """
+    Re-derive every score from the event tables, one product-id range at a
+    time (two UPDATE statements per chunk, rows left alone when unchanged).
+    Yields the number of product rows changed per chunk.
+    """
+    params = {
+        "rate": decay_rate(),
+        "epoch": EPOCH,
+        "completed": Order.Status.DELIVERED,
+        "min_exp": _MIN_EXPONENT,
+        **{f"w_{kind}": weight for kind, weight in WEIGHTS.items()},
+    }
+    last_id = 0
+    while True:
+        ids = list(
+            Product.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        bounds = {**params, "lo": ids[0], "hi": ids[-1]}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(_RECOMPUTE_SQL, bounds)
+            changed = cursor.rowcount
+            cursor.execute(_COPY_TO_LISTINGS_SQL, bounds)
+        yield changed
+        last_id = ids[-1]
@@ -0,0 +1,39 @@
+# main/recently_viewed.py - Per-user "recently viewed" list kept in the cache
+"""
+Each signed-in user's last RECENTLY_VIEWED_LIMIT product ids live under
+one cache key as a tuple, newest first. Viewing a product moves it to the
+front and drops whatever falls off the end, so the entry never grows.
+The list is a convenience, not a record: losing it to eviction is fine,
+and nothing touches the database until it is read back.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import LIVE_PRODUCT
+from .models_extended import ProductListing
+
+KEY = "recent:{}"
+
+
+def recently_viewed_ids(user_id):
+    return list(cache.get(KEY.format(user_id), ()))
+
+
+def record_view(user_id, product_id):
+    ids = [product_id, *(pk for pk in recently_viewed_ids(user_id) if pk != product_id)]
+    cache.set(KEY.format(user_id), tuple(ids[: settings.RECENTLY_VIEWED_LIMIT]), settings.RECENTLY_VIEWED_TTL)
+
+
+def clear(user_id):
+    cache.delete(KEY.format(user_id))
+
+
+def recently_viewed_listings(user_id, queryset=None):
+    """Live listing cards for the stored ids, newest view first, from one IN query."""
+    ids = recently_viewed_ids(user_id)
+    if not ids:
+        return []
+    if queryset is None:
+        queryset = ProductListing.objects.all()
+    found = {listing.pk: listing for listing in queryset.filter(LIVE_PRODUCT, pk__in=ids)}
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,118 @@
+# main/saved_searches.py - Match newly listed products against buyers' saved searches
+"""
+Saved searches are indexed by key rather than re-run per new product:
+
+    "t:<lexeme>"   each search term (same text-search lexemes as ?search=),
+                   cut to fit SavedSearchKey.key on both sides
+    "c:<id>"       category filter
+    "k:<value>"    condition filter
+    "*"            searches with none of the above (price filter only, or empty)
+
+SavedSearch.key_count is the number of keys a search has; a product
+matches it when the product's own key set contains all of them. One
+grouped query over SavedSearchKey finds those searches, with the price
+range checked in the same statement, so the cost of listing a product
+depends on how many searches share its keys, not on how many exist.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import Notification, Product
+from .models_extended import SavedSearch, SavedSearchKey
+from .search import fts_enabled
+
+ANY_KEY = "*"
+_WORD_RE = re.compile(r"\w+")
+TERM_PREFIX = "t:"
+MAX_TERM_LENGTH = SavedSearchKey._meta.get_field("key").max_length - len(TERM_PREFIX)
+
+
+def lexemes(text):
+    """Distinct normalized terms of `text` (Postgres text-search lexemes when available)."""
+    if not text.strip():
+        return set()
+    if not fts_enabled():
+        return {word.lower() for word in _WORD_RE.findall(text)}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT tsvector_to_array(to_tsvector(%s::regconfig, %s))",
+            [getattr(settings, "PRODUCT_SEARCH_CONFIG", "english"), text],
+        )
+        return set(cursor.fetchone()[0])
+
+
+def term_keys(text):
+    return {TERM_PREFIX + term[:MAX_TERM_LENGTH] for term in lexemes(text)}
+
+
+def search_keys(search):
+    keys = term_keys(search.query)
+    if search.category_id:
+        keys.add(f"c:{search.category_id}")
+    if search.condition:
+        keys.add(f"k:{search.condition}")
+    return keys or {ANY_KEY}
+
+
+def product_keys(product):
+    category, vendor = product.category, product.vendor
+    text = " ".join([
+        product.title,
+        category.title if category else "",
+        vendor.shop_name if vendor else "",
+        product.detail,
+    ])
+    keys = term_keys(text)
+    keys.add(ANY_KEY)
+    if product.category_id:
+        keys.add(f"c:{product.category_id}")
+    keys.add(f"k:{product.condition}")
+    return keys
+
+
+def index_saved_search(search):
+    """(Re)write the keys of `search`; called whenever it is saved."""
+    keys = search_keys(search)
+    with transaction.atomic():
+        SavedSearchKey.objects.filter(search=search).delete()
+        SavedSearchKey.objects.bulk_create(SavedSearchKey(search=search, key=key) for key in keys)
+        SavedSearch.objects.filter(pk=search.pk).update(key_count=len(keys))
+
+
+def matching_searches(product):
+    """Active saved searches `product` satisfies (one query)."""
+    hits = (
+        SavedSearchKey.objects.filter(key__in=product_keys(product), search__is_active=True)
+        .values("search")
+        .annotate(hits=Count("pk"))
+        .filter(hits=F("search__key_count"))
+        .values("search")
+    )
+    return SavedSearch.objects.filter(
+        Q(min_price__isnull=True) | Q(min_price__lte=product.price),
+        Q(max_price__isnull=True) | Q(max_price__gte=product.price),
+        pk__in=hits,
+    )
+
+
+def notify_saved_searches(product_id):
+    """Notify the owners of saved searches matching a newly listed product."""
+    product = Product.objects.select_related("category", "vendor").filter(pk=product_id).first()
+    if product is None or not product.is_active or product.is_sold:
+        return 0
+    searches = matching_searches(product)
+    if product.vendor_id:
+        searches = searches.exclude(user_id=product.vendor.user_id)
+    user_ids = set(searches.values_list("user_id", flat=True))
+    Notification.objects.bulk_create(
+        Notification(
+            user_id=user_id,
+            type=Notification.Type.SAVED_SEARCH,
+            message=f'New listing matching your saved search: "{product.title}" (R{product.price})',
+        )
+        for user_id in user_ids
+    )
+    return len(user_ids)
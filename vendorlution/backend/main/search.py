@@ -0,0 +1,226 @@
+# main/search.py - Postgres full-text search and typeahead for the product catalog
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast, Length
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from rest_framework import filters
+
+from .models import Product, ProductCategory, VendorProfile
+
+# Fields that feed Product.search_vector (a save touching none of them skips the refresh)
+PRODUCT_SEARCH_SOURCE_FIELDS = {"title", "detail", "category", "vendor"}
+
+
+def _search_config():
+    return getattr(settings, "PRODUCT_SEARCH_CONFIG", "english")
+
+
+def fts_enabled():
+    """Full-text search needs Postgres; other backends keep the icontains filter."""
+    return connection.vendor == "postgresql"
+
+
+def product_search_vector():
+    """
+    Weighted document for a product row:
+      A = title, B = category title + vendor shop name, C = detail.
+    Category and vendor names come from correlated subqueries so the
+    expression can be used directly in a bulk UPDATE.
+    """
+    config = _search_config()
+    category_title = Subquery(
+        ProductCategory.objects.filter(pk=OuterRef("category_id")).values("title")[:1]
+    )
+    shop_name = Subquery(
+        VendorProfile.objects.filter(pk=OuterRef("vendor_id")).values("shop_name")[:1]
+    )
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector(category_title, weight="B", config=config)
+        + SearchVector(shop_name, weight="B", config=config)
+        + SearchVector("detail", weight="C", config=config)
+    )
+
+
+def refresh_product_search_vectors(queryset=None):
+    """Recompute search_vector for the given products (all products if None)."""
+    if not fts_enabled():
+        return 0
+    if queryset is None:
+        queryset = Product.objects.all()
+    return queryset.update(search_vector=product_search_vector())
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on product lists.
+
+    On Postgres `?search=` is matched against the stored, GIN-indexed
+    search_vector and results are ordered by ts_rank (an explicit
+    `?ordering=` still wins, since OrderingFilter runs afterwards).
+    Elsewhere it falls back to the stock icontains behaviour over
+    `search_fields`. Views listing another model point
+    `search_vector_field` at the Product vector (e.g. "product__search_vector").
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not fts_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        query = SearchQuery(" ".join(terms), search_type="websearch", config=_search_config())
+        vector = getattr(view, "search_vector_field", "search_vector")
+        # ts_rank is float4; widen it so the value round-trips exactly through keyset cursors
+        rank = Cast(SearchRank(F(vector), query), FloatField())
+        return (
+            queryset.filter(**{vector: query})
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", "-created_at")
+        )
+
+
+# ============================================================
+# Typeahead suggestions
+# ============================================================
+
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MIN_CHARS = 2
+
+_WORD_RE = re.compile(r"\w+")
+_trigram_installed = None
+
+
+def trigram_enabled():
+    """True when pg_trgm is installed, i.e. migration 0007 built the typeahead indexes."""
+    global _trigram_installed
+    if not fts_enabled():
+        return False
+    if _trigram_installed is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_installed = cursor.fetchone() is not None
+    return _trigram_installed
+
+
+def _normalize(text):
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+class PrefixIndex:
+    """
+    In-process completion index used when pg_trgm is unavailable (SQLite, tests).
+
+    Every word boundary of a name becomes a sorted key ("purple kettle" ->
+    "purple kettle", "kettle"), so a prefix lookup is a bisect plus a short
+    scan. Built lazily on first use (one sort over all keys) and patched
+    from main.signals afterwards (insort per key).
+    """
+
+    def __init__(self):
+        self._keys = []      # sorted (key, kind, pk)
+        self._docs = {}      # (kind, pk) -> suggestion dict
+        self._lock = threading.Lock()
+        self.built = False
+
+    @staticmethod
+    def _keys_for(text):
+        words = _normalize(text).split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _add(self, kind, pk, text, **extra):
+        self._discard(kind, pk)
+        self._docs[(kind, pk)] = {"type": kind, "id": pk, "text": text, **extra}
+        for key in self._keys_for(text):
+            insort(self._keys, (key, kind, pk))
+
+    def _discard(self, kind, pk):
+        doc = self._docs.pop((kind, pk), None)
+        if doc is None:
+            return
+        for key in self._keys_for(doc["text"]):
+            i = bisect_left(self._keys, (key, kind, pk))
+            if i < len(self._keys) and self._keys[i] == (key, kind, pk):
+                del self._keys[i]
+
+    def build(self):
+        # read and sort once outside the lock (insort per key would be quadratic);
+        # lookups only wait for the swap
+        docs = {}
+        products = Product.objects.filter(is_active=True, is_sold=False).values_list("id", "title")
+        for pk, title in products.iterator(chunk_size=2000):
+            docs[("product", pk)] = {"type": "product", "id": pk, "text": title}
+        vendors = VendorProfile.objects.filter(is_active=True).values_list("id", "shop_name", "slug")
+        for pk, shop_name, slug in vendors.iterator(chunk_size=2000):
+            docs[("vendor", pk)] = {"type": "vendor", "id": pk, "text": shop_name, "slug": slug}
+        keys = [(key, kind, pk) for (kind, pk), doc in docs.items() for key in self._keys_for(doc["text"])]
+        keys.sort()
+        with self._lock:
+            self._keys, self._docs = keys, docs
+            self.built = True
+
+    def update(self, kind, pk, text=None, **extra):
+        """Add/replace an entry, or drop it when text is None. No-op until built."""
+        if not self.built:
+            return
+        with self._lock:
+            if text is None:
+                self._discard(kind, pk)
+            else:
+                self._add(kind, pk, text, **extra)
+
+    def search(self, query, limit):
+        if not self.built:
+            self.build()
+        prefix = _normalize(query)
+        seen, hits = set(), []
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                _key, kind, pk = self._keys[i]
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    hits.append(dict(self._docs[(kind, pk)]))
+                i += 1
+        # Names that start with the query first, then shorter names
+        hits.sort(key=lambda d: (not _normalize(d["text"]).startswith(prefix), len(d["text"]), d["text"]))
+        return hits[:limit]
+
+
+prefix_index = PrefixIndex()
+
+
+def _trigram_suggestions(query, limit):
+    # icontains compiles to UPPER(col) LIKE UPPER(...), which the UPPER() trigram indexes serve
+    products = (
+        Product.objects.filter(is_active=True, is_sold=False, title__icontains=query)
+        .annotate(score=TrigramWordSimilarity(query, "title"))
+        .order_by("-score", Length("title"))
+        .values_list("id", "title", "score")[:limit]
+    )
+    vendors = (
+        VendorProfile.objects.filter(is_active=True, shop_name__icontains=query)
+        .annotate(score=TrigramWordSimilarity(query, "shop_name"))
+        .order_by("-score", Length("shop_name"))
+        .values_list("id", "shop_name", "slug", "score")[:limit]
+    )
+    ranked = [(score, {"type": "vendor", "id": pk, "text": name, "slug": slug}) for pk, name, slug, score in vendors]
+    ranked += [(score, {"type": "product", "id": pk, "text": title}) for pk, title, score in products]
+    ranked.sort(key=lambda pair: (-pair[0], len(pair[1]["text"])))
+    return [hit for _score, hit in ranked[:limit]]
+
+
+def suggest_completions(query, limit=SUGGEST_DEFAULT_LIMIT):
+    """Top-N product titles and shop names matching `query` (pg_trgm, else prefix index)."""
+    query = (query or "").strip()
+    if len(query) < SUGGEST_MIN_CHARS:
+        return []
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+    if trigram_enabled():
+        return _trigram_suggestions(query, limit)
+    return prefix_index.search(query, limit)
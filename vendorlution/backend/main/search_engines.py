@@ -0,0 +1,295 @@
+# main/search_engines.py - Pluggable ?search= engines for the product and vendor lists
+"""
+List views that search put CatalogSearchFilter in filter_backends and
+name the index they read with `search_index` ("product" or "vendor").
+The filter hands ?search= to the engine picked by settings.SEARCH_ENGINE:
+
+    database   Postgres full-text on Product.search_vector where the view
+               has one (ProductSearchFilter), DRF icontains otherwise
+    memory     in-process inverted index with BM25 ranking (InvertedIndex)
+
+The memory engine needs no Postgres features, so it gives relevance
+ranking on SQLite / dev setups, and benchmark_product_search can time it
+against the database engine.
+"""
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from array import array
+
+from django.conf import settings
+from django.db.models import Case, FloatField, Value, When
+from rest_framework import filters
+
+from .models import Product, VendorProfile
+from .search import ProductSearchFilter
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased words with plural "s" folded ("kettles" and "kettle" match)."""
+    tokens = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class InvertedIndex(ABC):
+    """
+    BM25 over weighted fields, kept in compact arrays:
+
+        postings[term]  array("I") of doc numbers, ascending
+        freqs[term]     array("H") of field-weighted term counts, aligned
+        doc_pks         array("I") doc number -> primary key
+        doc_lens        array("I") doc number -> field-weighted length
+        live            bytearray, 0 once a doc number is superseded
+
+    Updating a row appends it under a new doc number and clears the old
+    one's live flag, so postings never need inserting into; compact()
+    squeezes out dead entries once they outnumber the live ones. Built at
+    server startup by warm_up() when the memory engine is selected (else on
+    first search) and patched from main.signals afterwards (no-op until
+    built, so the database engine pays nothing for it).
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, fields):
+        self.fields = fields  # {field: weight}
+        self._lock = threading.Lock()
+        self.built = False
+        self._reset()
+
+    def _reset(self):
+        self._postings, self._freqs = {}, {}
+        self._doc_pks, self._doc_lens, self._live = array("I"), array("I"), bytearray()
+        self._docno = {}  # pk -> current doc number
+        self._total_len = 0
+
+    # ---------------- documents ----------------
+
+    @abstractmethod
+    def documents(self, pks=None):
+        """Yields (pk, {field: text}) for indexable rows (all of them, or just `pks`)."""
+
+    def _add(self, pk, texts):
+        self._discard(pk)
+        counts = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(texts.get(field)):
+                counts[token] = counts.get(token, 0) + weight
+        docno = len(self._doc_pks)
+        length = sum(counts.values())
+        self._doc_pks.append(pk)
+        self._doc_lens.append(length)
+        self._live.append(1)
+        self._docno[pk] = docno
+        self._total_len += length
+        for token, count in counts.items():
+            if token not in self._postings:
+                self._postings[token], self._freqs[token] = array("I"), array("H")
+            self._postings[token].append(docno)
+            self._freqs[token].append(min(count, 0xFFFF))
+
+    def _discard(self, pk):
+        docno = self._docno.pop(pk, None)
+        if docno is not None:
+            self._live[docno] = 0
+            self._total_len -= self._doc_lens[docno]
+
+    def compact(self):
+        """Renumber live docs and drop dead postings (caller holds the lock)."""
+        remap = array("I", [0]) * len(self._doc_pks)
+        doc_pks, doc_lens = array("I"), array("I")
+        for docno, alive in enumerate(self._live):
+            if alive:
+                remap[docno] = len(doc_pks)
+                doc_pks.append(self._doc_pks[docno])
+                doc_lens.append(self._doc_lens[docno])
+        for token in list(self._postings):
+            docs, freqs = array("I"), array("H")
+            for docno, freq in zip(self._postings[token], self._freqs[token]):
+                if self._live[docno]:
+                    docs.append(remap[docno])
+                    freqs.append(freq)
+            if docs:
+                self._postings[token], self._freqs[token] = docs, freqs
+            else:
+                del self._postings[token], self._freqs[token]
+        self._doc_pks, self._doc_lens, self._live = doc_pks, doc_lens, bytearray(b"\x01") * len(doc_pks)
+        self._docno = {pk: docno for docno, pk in enumerate(doc_pks)}
+
+    def build(self):
+        with self._lock:
+            self._reset()
+            for pk, texts in self.documents():
+                self._add(pk, texts)
+            self.built = True
+
+    def refresh(self, pks):
+        """Re-read `pks` from the database: indexable rows are (re)added, the rest dropped."""
+        if not self.built:
+            return
+        pks = list(pks)
+        documents = dict(self.documents(pks))
+        with self._lock:
+            for pk in pks:
+                if pk in documents:
+                    self._add(pk, documents[pk])
+                else:
+                    self._discard(pk)
+            if len(self._doc_pks) > 2 * len(self._docno) + 1000:
+                self.compact()
+
+    # ---------------- ranking ----------------
+
+    def search(self, text, limit):
+        """[(pk, score)] of docs holding every term of `text`, best first."""
+        if not self.built:
+            self.build()
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        with self._lock:
+            live_docs = len(self._docno)
+            if not live_docs:
+                return []
+            avg_len = self._total_len / live_docs
+            lists = [(self._postings.get(term), self._freqs.get(term)) for term in terms]
+            if any(docs is None for docs, _freqs in lists):
+                return []
+            scores = None
+            # rarest term first, so later terms only score the surviving candidates
+            for docs, freqs in sorted(lists, key=lambda pair: len(pair[0])):
+                df, term_freqs = 0, {}
+                for docno, freq in zip(docs, freqs):
+                    if self._live[docno]:
+                        df += 1
+                        if scores is None or docno in scores:
+                            term_freqs[docno] = freq
+                if not term_freqs:
+                    return []
+                idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                scores = {
+                    docno: (scores[docno] if scores is not None else 0.0)
+                    + idf * freq * (self.K1 + 1)
+                    / (freq + self.K1 * (1 - self.B + self.B * self._doc_lens[docno] / avg_len))
+                    for docno, freq in term_freqs.items()
+                }
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+            return [(self._doc_pks[docno], score) for docno, score in ranked]
+
+
+class ProductIndex(InvertedIndex):
+    def __init__(self):
+        super().__init__({"title": 3, "category": 2, "vendor": 2, "detail": 1})
+
+    def documents(self, pks=None):
+        rows = Product.objects.filter(is_active=True, is_sold=False)
+        if pks is not None:
+            rows = rows.filter(pk__in=pks)
+        rows = rows.values_list("pk", "title", "detail", "category__title", "vendor__shop_name")
+        for pk, title, detail, category, vendor in rows.iterator(chunk_size=2000):
+            yield pk, {"title": title, "detail": detail, "category": category, "vendor": vendor}
+
+
+class VendorIndex(InvertedIndex):
+    def __init__(self):
+        super().__init__({"shop_name": 3, "description": 1, "address": 1})
+
+    def documents(self, pks=None):
+        rows = VendorProfile.objects.filter(is_active=True)
+        if pks is not None:
+            rows = rows.filter(pk__in=pks)
+        for pk, *texts in rows.values_list("pk", *self.fields).iterator(chunk_size=2000):
+            yield pk, dict(zip(self.fields, texts))
+
+
+indexes = {"product": ProductIndex(), "vendor": VendorIndex()}
+
+
+# ============================================================
+# Engines
+# ============================================================
+
+class SearchEngine(ABC):
+    """filter_queryset(request, queryset, view, terms) narrows and ranks a list for ?search= terms."""
+
+    name = None
+
+    @abstractmethod
+    def filter_queryset(self, request, queryset, view, terms):
+        pass
+
+
+class DatabaseSearchEngine(SearchEngine):
+    name = "database"
+
+    def filter_queryset(self, request, queryset, view, terms):
+        backend = ProductSearchFilter if getattr(view, "search_vector_field", None) else filters.SearchFilter
+        return backend().filter_queryset(request, queryset, view)
+
+
+class MemorySearchEngine(SearchEngine):
+    """
+    Ranks with the view's InvertedIndex and keeps the best MAX_HITS rows
+    in the queryset, annotated with their BM25 score as `search_rank`
+    (so KeysetPagination and an explicit ?ordering= work as with the
+    database engine). Other filters on the list apply within those hits.
+
+    The rank is a CASE over the kept primary keys, which costs the
+    database hits x rows, hence the cap. When a search matches more,
+    `request.search_hit_limit` is set and the paginated response reports
+    it, so clients can tell the end of the hits from the end of the
+    matches (the database engine has no such limit).
+    """
+
+    name = "memory"
+    MAX_HITS = 500
+
+    def filter_queryset(self, request, queryset, view, terms):
+        hits = indexes[view.search_index].search(" ".join(terms), self.MAX_HITS + 1)
+        if not hits:
+            return queryset.none()
+        if len(hits) > self.MAX_HITS:
+            hits = hits[:self.MAX_HITS]
+            request.search_hit_limit = self.MAX_HITS
+        rank = Case(*(When(pk=pk, then=Value(score)) for pk, score in hits), output_field=FloatField())
+        return (
+            queryset.filter(pk__in=[pk for pk, _score in hits])
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", "-pk")
+        )
+
+
+ENGINES = {engine.name: engine for engine in (DatabaseSearchEngine(), MemorySearchEngine())}
+
+
+def get_search_engine(name=None):
+    return ENGINES[name or getattr(settings, "SEARCH_ENGINE", "database")]
+
+
+def warm_up():
+    """Build the in-memory indexes before the first request (called from the WSGI/ASGI entry points)."""
+    if get_search_engine().name == "memory":
+        for index in indexes.values():
+            index.build()
+
+
+class CatalogSearchFilter(filters.SearchFilter):
+    """
+    ?search= through the configured engine. Views set `search_index`
+    ("product" / "vendor") for the memory engine and keep `search_fields`
+    (plus `search_vector_field` for products) for the database one.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_engine().filter_queryset(request, queryset, view, terms)
@@ -1,5 +1,14 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+
+from .fieldsets import SparseFieldsetMixin
+from .gallery import MAX_IMAGES, add_images
+from .geo import DistanceFieldMixin
+from .images import ImagePlaceholderField, ImageVariantsField
+from .models_extended import ChunkedUpload, ProductListing, SavedSearch
+from .uploads import UploadTokenField, attach, claim
 
 from .models import (
     # Catalog
@@ -16,47 +25,56 @@ from .models import (
     Conversation, Message, PaymentMethod,
     # Notifications / Support / Disputes
     Notification, SupportTicket, ResolutionCase,
+    # Site
+    Banner,
 )
 
 # =========================
 # Catalog
 # =========================
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = ["id", "title", "slug", "detail"]
 
 
 # ---- USERS (public) ----
-class UserPublicSerializer(serializers.ModelSerializer):
+class UserPublicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "first_name", "last_name"]
 
 
 # ---- VENDORS ----
-class VendorProfileSerializer(serializers.ModelSerializer):
+class VendorProfileSerializer(DistanceFieldMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     owner = UserPublicSerializer(source="user", read_only=True)
     public_url = serializers.SerializerMethodField()
+    logo_variants = ImageVariantsField("logo")
+    banner_variants = ImageVariantsField("banner")
 
     class Meta:
         model = VendorProfile
         fields = [
-            "id", "shop_name", "slug", "description", "logo", "banner",
-            "address", "rating_avg", "is_active", "owner", "public_url",
+            "id", "shop_name", "slug", "description", "logo", "logo_variants", "banner", "banner_variants",
+            "address", "latitude", "longitude", "rating_avg", "is_active", "owner", "public_url",
             "created_at", "updated_at",
         ]
         read_only_fields = [
             "slug", "rating_avg", "is_active", "owner", "public_url",
             "created_at", "updated_at",
         ]
+        sparse_sources = {
+            "public_url": ["slug"],
+            "logo_variants": ["logo", "logo_variants"],
+            "banner_variants": ["banner", "banner_variants"],
+        }
 
     def get_public_url(self, obj):
         return f"/vendor/store/{obj.slug}/{obj.id}"
 
 
-class VendorLiteSerializer(serializers.ModelSerializer):
+class VendorLiteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = VendorProfile
         fields = ["id", "shop_name", "slug"]
@@ -65,18 +83,32 @@ class VendorLiteSerializer(serializers.ModelSerializer):
 class VendorProfileWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = VendorProfile
-        fields = ["shop_name", "description", "logo", "banner", "address", "is_active"]
+        fields = ["shop_name", "description", "logo", "banner", "address", "latitude", "longitude", "is_active"]
+
+    def validate(self, attrs):
+        latitude = attrs.get("latitude", getattr(self.instance, "latitude", None))
+        longitude = attrs.get("longitude", getattr(self.instance, "longitude", None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("latitude and longitude must be set together")
+        return attrs
 
 
 # ---- IMAGES ----
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField("image")
+    image_placeholder = ImagePlaceholderField("image")
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "is_primary", "created_at"]
+        fields = ["id", "image", "image_variants", "image_placeholder", "is_primary", "created_at"]
+        sparse_sources = {
+            "image_variants": ["image", "image_variants"],
+            "image_placeholder": ["image", "image_variants"],
+        }
 
 
 # ---- PRODUCTS ----
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = ProductCategorySerializer(read_only=True)
     vendor = VendorProfileSerializer(read_only=True)
 
@@ -88,34 +120,202 @@ class ProductListSerializer(serializers.ModelSerializer):
         ]
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductCategoryLiteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ProductCategory
+        fields = ["id", "title", "slug"]
+
+
+class ProductCardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact product for listing grids: vendor/category reduced to id/name/slug."""
+    category = ProductCategoryLiteSerializer(read_only=True)
+    vendor = VendorLiteSerializer(read_only=True)
+
+    main_image_variants = ImageVariantsField("main_image")
+    main_image_placeholder = ImagePlaceholderField("main_image")
+
+    class Meta:
+        model = Product
+        fields = [
+            "id", "title", "slug", "price", "stock", "is_active", "condition",
+            "rating_avg", "main_image", "main_image_variants", "main_image_placeholder", "created_at",
+            "category", "vendor",
+        ]
+        sparse_sources = {
+            "main_image_variants": ["main_image", "main_image_variants"],
+            "main_image_placeholder": ["main_image", "main_image_variants"],
+        }
+
+
+# Columns ProductCardSerializer reads; views pin them with select_related()/only()
+PRODUCT_CARD_FIELDS = [
+    "id", "title", "slug", "price", "stock", "is_active", "condition",
+    "rating_avg", "main_image", "main_image_variants", "created_at", "category_id", "vendor_id",
+    "category__id", "category__title", "category__slug",
+    "vendor__id", "vendor__shop_name", "vendor__slug",
+]
+
+
+class VendorProductCardSerializer(ProductCardSerializer):
+    """Product card on the vendor's own dashboard: adds the (write-behind) view count."""
+
+    class Meta(ProductCardSerializer.Meta):
+        fields = ProductCardSerializer.Meta.fields + ["view_count"]
+
+
+class ListingCategorySerializer(SparseFieldsetMixin, serializers.Serializer):
+    """Category block rebuilt from a ProductListing's flat columns."""
+    id = serializers.IntegerField(source="category_id")
+    title = serializers.CharField(source="category_title")
+    slug = serializers.CharField(source="category_slug")
+
+    def to_representation(self, instance):
+        return super().to_representation(instance) if instance.category_id else None
+
+
+class ListingVendorSerializer(SparseFieldsetMixin, serializers.Serializer):
+    """Vendor block rebuilt from a ProductListing's flat columns."""
+    id = serializers.IntegerField(source="vendor_id")
+    shop_name = serializers.CharField(source="vendor_shop_name")
+    slug = serializers.CharField(source="vendor_slug")
+
+    def to_representation(self, instance):
+        return super().to_representation(instance) if instance.vendor_id else None
+
+
+class ProductListingSerializer(DistanceFieldMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    """ProductCardSerializer's output, read from the denormalized ProductListing table."""
+    id = serializers.IntegerField(source="product_id", read_only=True)
+    main_image_variants = ImageVariantsField("main_image")
+    main_image_placeholder = ImagePlaceholderField("main_image")
+    category = ListingCategorySerializer(source="*", read_only=True)
+    vendor = ListingVendorSerializer(source="*", read_only=True)
+
+    class Meta:
+        model = ProductListing
+        fields = [
+            "id", "title", "slug", "price", "stock", "is_active", "condition",
+            "rating_avg", "main_image", "main_image_variants", "main_image_placeholder", "created_at",
+            "category", "vendor",
+        ]
+        sparse_sources = {
+            "main_image_variants": ["main_image", "main_image_variants"],
+            "main_image_placeholder": ["main_image", "main_image_variants"],
+        }
+
+
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = ProductCategorySerializer(read_only=True)
     vendor = VendorProfileSerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
+    main_image_variants = ImageVariantsField("main_image")
+    main_image_placeholder = ImagePlaceholderField("main_image")
 
     class Meta:
         model = Product
         fields = [
             "id", "title", "slug", "detail", "price", "stock", "is_active",
-            "condition", "rating_avg", "main_image", "created_at", "updated_at",
-            "category", "vendor", "images",
+            "condition", "rating_avg", "main_image", "main_image_variants", "main_image_placeholder",
+            "created_at", "updated_at", "category", "vendor", "images",
         ]
+        sparse_sources = {
+            "main_image_variants": ["main_image", "main_image_variants"],
+            "main_image_placeholder": ["main_image", "main_image_variants"],
+        }
 
 
 class ProductCreateSerializer(serializers.ModelSerializer):
+    # tokens of completed chunked uploads (main.uploads), instead of sending the files themselves
+    main_image_upload = UploadTokenField(required=False)
+    gallery_uploads = serializers.ListField(
+        child=UploadTokenField(), required=False, write_only=True, max_length=MAX_IMAGES
+    )
+
     class Meta:
         model = Product
         fields = [
             "id", "category", "vendor", "title", "detail", "price", "stock",
-            "is_active", "condition", "main_image",
+            "is_active", "condition", "main_image", "main_image_upload", "gallery_uploads",
         ]
 
+    def create(self, validated_data):
+        main_upload = validated_data.pop("main_image_upload", None)
+        gallery = validated_data.pop("gallery_uploads", [])
+        with transaction.atomic():
+            if main_upload is not None:
+                validated_data["main_image"] = claim(main_upload)
+            product = super().create(validated_data)
+            self.add_gallery(product, gallery)
+        return product
+
+    def update(self, instance, validated_data):
+        main_upload = validated_data.pop("main_image_upload", None)
+        gallery = validated_data.pop("gallery_uploads", [])
+        with transaction.atomic():
+            if main_upload is not None:
+                attach(instance, "main_image", main_upload)
+            product = super().update(instance, validated_data)
+            self.add_gallery(product, gallery)
+        return product
+
+    def add_gallery(self, product, uploads):
+        if uploads:
+            add_images(product, names=[claim(upload) for upload in uploads])
+
 
 # Back-compat alias
 class ProductSerializer(ProductDetailSerializer):
     pass
 
 
+class ProductImageUploadSerializer(serializers.Serializer):
+    """Many gallery images at once: multipart `images` and/or tokens of completed chunked `uploads`."""
+    images = serializers.ListField(child=serializers.ImageField(), required=False, max_length=MAX_IMAGES)
+    uploads = serializers.ListField(child=UploadTokenField(), required=False, max_length=MAX_IMAGES)
+    # index into images + uploads of the new primary image
+    primary = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        count = len(attrs.get("images", [])) + len(attrs.get("uploads", []))
+        if not count:
+            raise serializers.ValidationError("Send at least one file in images or token in uploads")
+        if count > MAX_IMAGES:
+            raise serializers.ValidationError(f"At most {MAX_IMAGES} images per request")
+        if attrs.get("primary", 0) >= count:
+            raise serializers.ValidationError({"primary": f"Must be below {count}"})
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            names = [claim(upload) for upload in validated_data.get("uploads", [])]
+            return add_images(
+                validated_data["product"], validated_data.get("images", []), names, validated_data.get("primary")
+            )
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    max_chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ["token", "filename", "size", "sha256", "offset", "status", "max_chunk_size", "expires_at"]
+        read_only_fields = ["token", "offset", "status", "expires_at"]
+
+    def get_max_chunk_size(self, obj):
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes")
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or value.strip("0123456789abcdef")):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value
+
+
 # ---- RATINGS ----
 class ProductRatingSerializer(serializers.ModelSerializer):
     class Meta:
@@ -127,7 +327,7 @@ class ProductRatingSerializer(serializers.ModelSerializer):
 # Accounts / Wishlist / Cart
 # =========================
 
-class CustomerLiteSerializer(serializers.ModelSerializer):
+class CustomerLiteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomerProfile
         fields = ["id", "user", "mobile"]
@@ -145,7 +345,7 @@ class WishlistSerializer(serializers.ModelSerializer):
         fields = ["id", "customer", "product", "created_at"]
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         source="product", queryset=Product.objects.all(), write_only=True, required=True
@@ -156,7 +356,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "cart", "product", "product_id", "quantity", "created_at", "updated_at"]
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -168,7 +368,7 @@ class CartSerializer(serializers.ModelSerializer):
 # Orders
 # =========================
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
 
     class Meta:
@@ -176,7 +376,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "quantity", "price_snapshot", "created_at"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     customer = CustomerLiteSerializer(read_only=True)
 
@@ -289,6 +489,22 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ["id", "user", "message", "type", "is_read", "created_at", "updated_at"]
 
 
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = [
+            "id", "name", "query", "category", "condition", "min_price", "max_price",
+            "is_active", "created_at", "updated_at",
+        ]
+
+    def validate(self, attrs):
+        min_price = attrs.get("min_price", getattr(self.instance, "min_price", None))
+        max_price = attrs.get("max_price", getattr(self.instance, "max_price", None))
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError({"max_price": "Must be at least min_price"})
+        return attrs
+
+
 class SupportTicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = SupportTicket
@@ -301,6 +517,18 @@ class ResolutionCaseSerializer(serializers.ModelSerializer):
         fields = ["id", "order", "opened_by", "reason", "status", "resolved_at", "created_at", "updated_at"]
 
 
+# =========================
+# Site
+# =========================
+
+class BannerSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField("image")
+
+    class Meta:
+        model = Banner
+        fields = ["id", "title", "image", "image_variants", "link"]
+
+
 # =========================
 # Auth
 # =========================
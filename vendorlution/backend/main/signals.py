@@ -0,0 +1,296 @@
+# main/signals.py
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_on_commit
+from .images import FILE_FIELDS, IMAGE_FIELDS, has_current_variants, queue_variants, release_image, variants_field
+from .listings import LISTING_SOURCE_FIELDS, detach_category, refresh_listings, sync_category, sync_vendor
+from .models import (
+    Banner, CartItem, Order, Product, ProductCategory, ProductImage, VendorProfile, Wishlist,
+)
+from .models_extended import ChunkedUpload, SavedSearch
+from .popularity import add_order_popularity, add_popularity
+from .saved_searches import index_saved_search, notify_saved_searches
+from .search import PRODUCT_SEARCH_SOURCE_FIELDS, prefix_index, refresh_product_search_vectors
+from .search_engines import indexes as search_indexes
+from .storage import release
+from .uploads import discard_files
+from .view_counts import flush_if_due
+
+
+# -------------------- Search vectors --------------------
+
+def _remember_previous(instance, field):
+    """Stash the stored value of `field` (as _prev_<field>) so post_save can tell if it changed."""
+    previous = None
+    if instance.pk:
+        previous = type(instance).objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    setattr(instance, f"_prev_{field}", previous)
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not PRODUCT_SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_product_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=ProductCategory)
+def remember_category_title(sender, instance, **kwargs):
+    _remember_previous(instance, "title")
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_category_product_vectors(sender, instance, created, **kwargs):
+    if created or instance._prev_title == instance.title:
+        return
+    refresh_product_search_vectors(Product.objects.filter(category_id=instance.pk))
+
+
+@receiver(pre_save, sender=VendorProfile)
+def remember_shop_name(sender, instance, **kwargs):
+    _remember_previous(instance, "shop_name")
+
+
+@receiver(post_save, sender=VendorProfile)
+def refresh_vendor_product_vectors(sender, instance, created, **kwargs):
+    if created or instance._prev_shop_name == instance.shop_name:
+        return
+    refresh_product_search_vectors(Product.objects.filter(vendor_id=instance.pk))
+
+
+# -------------------- Listing read model --------------------
+
+@receiver(post_save, sender=Product)
+def refresh_product_listing(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not LISTING_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_listings([instance.pk])
+
+
+@receiver(post_save, sender=ProductCategory)
+def sync_category_listings(sender, instance, created, **kwargs):
+    if not created:
+        sync_category(instance)
+
+
+@receiver(post_delete, sender=ProductCategory)
+def detach_category_listings(sender, instance, **kwargs):
+    detach_category(instance.pk)
+
+
+@receiver(post_save, sender=VendorProfile)
+def sync_vendor_listings(sender, instance, created, **kwargs):
+    if not created:
+        sync_vendor(instance)
+
+
+# -------------------- Popularity --------------------
+
+@receiver(post_save, sender=Wishlist)
+def count_wishlist_add(sender, instance, created, **kwargs):
+    if created:
+        add_popularity([instance.product_id], "wishlist", when=instance.created_at)
+
+
+@receiver(post_save, sender=CartItem)
+def count_cart_add(sender, instance, created, **kwargs):
+    if created:
+        add_popularity([instance.product_id], "cart", when=instance.created_at)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    _remember_previous(instance, "status")
+
+
+@receiver(post_save, sender=Order)
+def count_completed_order(sender, instance, **kwargs):
+    if instance.status == Order.Status.DELIVERED and instance._prev_status != Order.Status.DELIVERED:
+        add_order_popularity(instance)
+
+
+# -------------------- Images and files: variants and storage references --------------------
+
+def queue_image_variants(sender, instance, update_fields=None, **kwargs):
+    for field in IMAGE_FIELDS[sender]:
+        if update_fields and field not in update_fields:
+            continue
+        if not has_current_variants(instance, field):
+            queue_variants(instance, field)
+
+
+def remember_previous_images(sender, instance, **kwargs):
+    """Before a new upload (or a cleared field) is saved, stash the image and variants it replaces."""
+    for field in IMAGE_FIELDS[sender]:
+        image = getattr(instance, field)
+        if instance.pk and (not image._committed or not image.name):
+            previous = sender.objects.filter(pk=instance.pk).values_list(field, variants_field(field)).first()
+            setattr(instance, f"_prev_{field}", previous)
+
+
+def release_replaced_images(sender, instance, **kwargs):
+    for field in IMAGE_FIELDS[sender]:
+        previous = instance.__dict__.pop(f"_prev_{field}", None)
+        if not previous or not previous[0]:
+            continue
+        if previous[0] == getattr(instance, field).name:
+            # the new upload hashed to the image already there: the storage counted it
+            # again, but the row still holds it once (its variants stay valid)
+            transaction.on_commit(partial(release, previous[0]))
+        else:
+            transaction.on_commit(partial(release_image, *previous))
+
+
+def release_deleted_images(sender, instance, **kwargs):
+    for field in IMAGE_FIELDS[sender]:
+        name, variants = getattr(instance, field).name, getattr(instance, variants_field(field))
+        if name:
+            transaction.on_commit(partial(release_image, name, variants))
+
+
+for _model in IMAGE_FIELDS:
+    post_save.connect(queue_image_variants, sender=_model, dispatch_uid=f"image-variants-{_model.__name__}")
+    pre_save.connect(remember_previous_images, sender=_model, dispatch_uid=f"image-previous-{_model.__name__}")
+    post_save.connect(release_replaced_images, sender=_model, dispatch_uid=f"image-replaced-{_model.__name__}")
+    post_delete.connect(release_deleted_images, sender=_model, dispatch_uid=f"image-deleted-{_model.__name__}")
+
+
+def remember_previous_files(sender, instance, **kwargs):
+    for field in FILE_FIELDS[sender]:
+        file = getattr(instance, field)
+        if instance.pk and (not file._committed or not file.name):
+            previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+            setattr(instance, f"_prev_{field}", previous)
+
+
+def release_replaced_files(sender, instance, **kwargs):
+    for field in FILE_FIELDS[sender]:
+        # one release also covers a new upload with the same content (the storage counted it twice)
+        previous = instance.__dict__.pop(f"_prev_{field}", None)
+        if previous:
+            transaction.on_commit(partial(release, previous))
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    for field in FILE_FIELDS[sender]:
+        name = getattr(instance, field).name
+        if name:
+            transaction.on_commit(partial(release, name))
+
+
+for _model in FILE_FIELDS:
+    pre_save.connect(remember_previous_files, sender=_model, dispatch_uid=f"file-previous-{_model.__name__}")
+    post_save.connect(release_replaced_files, sender=_model, dispatch_uid=f"file-replaced-{_model.__name__}")
+    post_delete.connect(release_deleted_files, sender=_model, dispatch_uid=f"file-deleted-{_model.__name__}")
+
+
+# -------------------- Chunked uploads --------------------
+
+@receiver(post_delete, sender=ChunkedUpload)
+def discard_chunked_upload(sender, instance, **kwargs):
+    discard_files(instance)
+
+
+# -------------------- View counters --------------------
+
+request_finished.connect(flush_if_due, dispatch_uid="product-view-flush")
+
+
+# -------------------- Saved searches --------------------
+
+@receiver(post_save, sender=SavedSearch)
+def index_saved_search_keys(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"is_active", "name", "updated_at"}:
+        return
+    index_saved_search(instance)
+
+
+@receiver(post_save, sender=Product)
+def match_saved_searches(sender, instance, created, **kwargs):
+    if created:
+        # after commit, so a rolled-back listing notifies nobody
+        transaction.on_commit(lambda: notify_saved_searches(instance.pk))
+
+
+# -------------------- Typeahead prefix index --------------------
+
+@receiver(post_save, sender=Product)
+def index_product_title(sender, instance, **kwargs):
+    listed = instance.is_active and not instance.is_sold
+    prefix_index.update("product", instance.pk, instance.title if listed else None)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_title(sender, instance, **kwargs):
+    prefix_index.update("product", instance.pk, None)
+
+
+@receiver(post_save, sender=VendorProfile)
+def index_shop_name(sender, instance, **kwargs):
+    name = instance.shop_name if instance.is_active else None
+    prefix_index.update("vendor", instance.pk, name, slug=instance.slug)
+
+
+@receiver(post_delete, sender=VendorProfile)
+def unindex_shop_name(sender, instance, **kwargs):
+    prefix_index.update("vendor", instance.pk, None)
+
+
+# -------------------- In-process search engine --------------------
+
+# refresh() is a no-op until the memory engine has built its index
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def index_product_document(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not PRODUCT_SEARCH_SOURCE_FIELDS.union({"is_active", "is_sold"}).intersection(update_fields):
+        return
+    search_indexes["product"].refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductCategory)
+def index_category_product_documents(sender, instance, created, **kwargs):
+    if not created and instance._prev_title != instance.title:
+        search_indexes["product"].refresh(Product.objects.filter(category_id=instance.pk).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=VendorProfile)
+@receiver(post_delete, sender=VendorProfile)
+def index_vendor_document(sender, instance, created=False, **kwargs):
+    search_indexes["vendor"].refresh([instance.pk])
+    if not created and getattr(instance, "_prev_shop_name", instance.shop_name) != instance.shop_name:
+        search_indexes["product"].refresh(Product.objects.filter(vendor_id=instance.pk).values_list("pk", flat=True))
+
+
+# -------------------- Cache versions --------------------
+
+# model -> collection namespace; each row also has "<namespace>:<pk>"
+CACHE_NAMESPACES = {
+    Product: "product",
+    VendorProfile: "vendor",
+    ProductCategory: "category",
+    Banner: "banner",
+    User: "user",
+}
+
+
+def bump_cache_version(sender, instance, **kwargs):
+    namespace = CACHE_NAMESPACES[sender]
+    bump_on_commit(namespace, f"{namespace}:{instance.pk}")
+
+
+for _model in CACHE_NAMESPACES:
+    post_save.connect(bump_cache_version, sender=_model, dispatch_uid=f"cache-version-save-{_model.__name__}")
+    post_delete.connect(bump_cache_version, sender=_model, dispatch_uid=f"cache-version-delete-{_model.__name__}")
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_product_image_version(sender, instance, **kwargs):
+    bump_on_commit(f"product:{instance.product_id}")
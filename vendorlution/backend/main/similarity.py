@@ -0,0 +1,110 @@
+# main/similarity.py - Item-to-item "similar products" from co-purchase / co-wishlist baskets
+"""
+A basket is one order, one customer's wishlist or one cart. Two products
+are similar when they share baskets:
+
+    score(a, b) = co(a, b) / sqrt(n(a) * n(b))
+
+where co() sums the weight of the baskets holding both and n() the weight
+of the baskets holding each (cosine similarity, so best-sellers do not
+become everyone's neighbour). Orders weigh more than wishlists and carts.
+
+build_similarity() computes the top-K neighbours of each product and
+stores them in ProductSimilarity, one product-id range per statement, so
+the pair counts stay inside the database and the worker's memory is flat
+however long the order history grows.
+"""
+from django.db import connection, transaction
+
+from .models import LIVE_PRODUCT, Product
+from .models_extended import ProductListing
+
+TOP_K = 20
+BASKET_WEIGHTS = {"order": 3.0, "wishlist": 1.0, "cart": 1.0}
+
+# (kind, basket id, product id, weight); a product counts once per basket
+_BASKETS_SQL = """
+    CREATE TEMPORARY TABLE similarity_baskets AS
+    SELECT DISTINCT 1 AS kind, order_id AS basket_id, product_id, %(w_order)s::float8 AS weight FROM main_orderitem
+    UNION ALL
+    SELECT DISTINCT 2, customer_id, product_id, %(w_wishlist)s::float8 FROM main_wishlist
+    UNION ALL
+    SELECT DISTINCT 3, cart_id, product_id, %(w_cart)s::float8 FROM main_cartitem
+"""
+
+_STAGE_SQL = [
+    "CREATE INDEX ON similarity_baskets (product_id)",
+    "CREATE INDEX ON similarity_baskets (kind, basket_id)",
+    """
+    CREATE TEMPORARY TABLE similarity_totals AS
+    SELECT product_id, SUM(weight) AS n FROM similarity_baskets GROUP BY product_id
+    """,
+    "CREATE UNIQUE INDEX ON similarity_totals (product_id)",
+    "ANALYZE similarity_baskets",
+    "ANALYZE similarity_totals",
+]
+
+_BUILD_SQL = """
+    WITH pairs AS (
+        SELECT a.product_id, b.product_id AS neighbor_id, SUM(a.weight) AS co
+        FROM similarity_baskets a
+        JOIN similarity_baskets b ON b.kind = a.kind AND b.basket_id = a.basket_id AND b.product_id <> a.product_id
+        JOIN main_product neighbor ON neighbor.id = b.product_id
+        WHERE a.product_id BETWEEN %(lo)s AND %(hi)s AND neighbor.is_active AND NOT neighbor.is_sold
+        GROUP BY a.product_id, b.product_id
+    ),
+    ranked AS (
+        SELECT p.product_id, p.neighbor_id, p.co / SQRT(ta.n * tb.n) AS score,
+            ROW_NUMBER() OVER (
+                PARTITION BY p.product_id ORDER BY p.co / SQRT(ta.n * tb.n) DESC, p.co DESC, p.neighbor_id
+            ) AS rank
+        FROM pairs p
+        JOIN similarity_totals ta ON ta.product_id = p.product_id
+        JOIN similarity_totals tb ON tb.product_id = p.neighbor_id
+    )
+    INSERT INTO main_productsimilarity (product_id, neighbor_id, score, rank)
+    SELECT product_id, neighbor_id, score, rank FROM ranked WHERE rank <= %(top_k)s
+"""
+
+
+def build_similarity(top_k=TOP_K, chunk_size=500):
+    """
+    Replace the stored neighbours of every product. Basket memberships and
+    per-product totals are staged once in indexed temporary tables; each
+    product-id range is then scored and swapped in its own transaction
+    (readers see either the old or the new list for a product).
+    Yields the number of neighbour rows written per chunk.
+    """
+    params = {"top_k": top_k, **{f"w_{kind}": weight for kind, weight in BASKET_WEIGHTS.items()}}
+    with connection.cursor() as cursor:
+        cursor.execute(_BASKETS_SQL, params)
+        for statement in _STAGE_SQL:
+            cursor.execute(statement)
+    try:
+        last_id = 0
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                return
+            bounds = {**params, "lo": ids[0], "hi": ids[-1]}
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM main_productsimilarity WHERE product_id BETWEEN %s AND %s", [ids[0], ids[-1]]
+                )
+                cursor.execute(_BUILD_SQL, bounds)
+                written = cursor.rowcount
+            yield written
+            last_id = ids[-1]
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS similarity_baskets, similarity_totals")
+
+
+def similar_listings(product_id):
+    """Live listing cards for the stored neighbours of `product_id`, best first."""
+    return (
+        ProductListing.objects.filter(LIVE_PRODUCT, product__similar_to__product_id=product_id)
+        .order_by("product__similar_to__rank")
+    )
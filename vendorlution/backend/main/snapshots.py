@@ -0,0 +1,146 @@
+# main/snapshots.py - Static catalog snapshots (gzip JSON shards + manifest) for CDN / offline browsing
+"""
+build_snapshots() renders the browse pages the frontend needs most as
+static files under CATALOG_SNAPSHOT_ROOT (served from MEDIA_URL):
+
+    categories                  every category with its live product count
+    featured-vendors            same list as /api/home/
+    products-page-<k>           newest live products, pages 1..N
+    category-<id>-page-<k>      newest live products of a category, pages 1..N
+
+Each shard is canonical JSON, gzip-compressed with a fixed mtime, saved as
+<name>.<content hash>.json.gz. A shard whose hash is unchanged already
+exists under that name and is not rewritten, so the CDN can cache shard
+files forever. manifest.json maps shard names to their current files and
+is the only file that changes on every run. Files referenced by neither
+the new nor the previous manifest are deleted.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import LIVE_PRODUCT, ProductCategory, VendorProfile
+from .models_extended import ProductListing
+from .pagination import CustomPagination
+from .serializers import ProductCategorySerializer, ProductListingSerializer, VendorProfileSerializer
+
+MANIFEST = "manifest.json"
+FEATURED_VENDORS = 8
+
+
+def snapshot_root():
+    return settings.CATALOG_SNAPSHOT_ROOT
+
+
+def _dump(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def _load_manifest():
+    try:
+        with open(os.path.join(snapshot_root(), MANIFEST)) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {"shards": {}}
+
+
+def _write_shard(name, payload):
+    """Store `payload` under its content hash; returns (manifest entry, written?)."""
+    raw = _dump(payload)
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    filename = f"{name}.{digest}.json.gz"
+    path = os.path.join(snapshot_root(), filename)
+    written = not os.path.exists(path)
+    if written:
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh, gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+            gz.write(raw)
+        os.replace(tmp, path)
+    return {"file": filename, "hash": digest, "bytes": len(raw)}, written
+
+
+# ---------------- shard contents ----------------
+
+def _category_shard():
+    counts = dict(
+        ProductListing.objects.filter(LIVE_PRODUCT).order_by()
+        .values_list("category_id").annotate(n=Count("pk"))
+    )
+    categories = ProductCategorySerializer(ProductCategory.objects.order_by("title"), many=True).data
+    return [{**category, "product_count": counts.get(category["id"], 0)} for category in categories]
+
+
+def _featured_vendor_shard():
+    vendors = (
+        VendorProfile.objects.filter(is_active=True).select_related("user")
+        .order_by("-rating_avg", "shop_name")[:FEATURED_VENDORS]
+    )
+    return VendorProfileSerializer(vendors, many=True).data
+
+
+def _pages(prefix, queryset, pages, page_size):
+    """{"<prefix>-page-<k>": {...}} for the first `pages` pages, from one query."""
+    limit = pages * page_size
+    rows = list(queryset.order_by("-created_at", "-product_id")[: limit + 1])
+    more_beyond = len(rows) > limit
+    cards = ProductListingSerializer(rows[:limit], many=True).data
+    chunks = [cards[i:i + page_size] for i in range(0, len(cards), page_size)] or [[]]
+    shards = {}
+    for number, results in enumerate(chunks, start=1):
+        last = number == len(chunks)
+        shards[f"{prefix}-page-{number}"] = {
+            "page": number,
+            "results": results,
+            "next": None if last else f"{prefix}-page-{number + 1}",
+            # more rows exist than were snapshotted: continue from the API
+            "has_more": not last or more_beyond,
+        }
+    return shards
+
+
+def snapshot_payloads(pages, page_size=CustomPagination.page_size):
+    live = ProductListing.objects.filter(LIVE_PRODUCT)
+    payloads = {"categories": _category_shard(), "featured-vendors": _featured_vendor_shard()}
+    payloads.update(_pages("products", live, pages, page_size))
+    for category_id in ProductCategory.objects.order_by("pk").values_list("pk", flat=True):
+        payloads.update(_pages(f"category-{category_id}", live.filter(category_id=category_id), pages, page_size))
+    return payloads
+
+
+# ---------------- build ----------------
+
+def build_snapshots(pages=None):
+    """Write changed shards, publish the manifest, prune stale files. Returns counts."""
+    pages = pages or settings.CATALOG_SNAPSHOT_PAGES
+    os.makedirs(snapshot_root(), exist_ok=True)
+    previous = _load_manifest()
+    shards, written = {}, 0
+    for name, payload in snapshot_payloads(pages).items():
+        shards[name], changed = _write_shard(name, payload)
+        written += changed
+
+    manifest = {
+        "generated_at": timezone.now().isoformat(),
+        "base_url": settings.CATALOG_SNAPSHOT_URL,
+        "pages": pages,
+        "shards": shards,
+    }
+    tmp = os.path.join(snapshot_root(), f"{MANIFEST}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(snapshot_root(), MANIFEST))
+
+    # keep the previous generation for clients still holding the old manifest
+    keep = {entry["file"] for entry in shards.values()}
+    keep |= {entry["file"] for entry in previous["shards"].values()}
+    removed = 0
+    for filename in os.listdir(snapshot_root()):
+        if filename.endswith(".json.gz") and filename not in keep:
+            os.remove(os.path.join(snapshot_root(), filename))
+            removed += 1
+    return {"shards": len(shards), "written": written, "unchanged": len(shards) - written, "removed": removed}
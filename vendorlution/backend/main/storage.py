@@ -0,0 +1,99 @@
+# main/storage.py - Content-addressed media storage with reference counting
+"""
+ContentAddressedStorage (the default storage, see settings.STORAGES)
+ignores the upload_to path and files every upload under the SHA-256 of
+its bytes:
+
+    cas/<h[0:2]>/<h[2:4]>/<h>.<ext>
+
+The upload is streamed to a temp file while it is hashed, so memory does
+not grow with the file. main_mediablob counts the references to each
+name: saving the same photo again only bumps the count and the temp file
+is dropped instead of written twice. delete() takes one reference away
+and removes the file with the last one. Row-level bookkeeping (a replaced
+or deleted file gives its reference back) lives in main.signals, for
+every field listed in main.images IMAGE_FIELDS / FILE_FIELDS; a new file
+field on the default storage belongs in one of them.
+
+Names outside cas/ (uploads from before this storage) behave exactly as
+with FileSystemStorage; migrate_media_to_cas moves them over.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, transaction
+
+PREFIX = "cas"
+CONTENT_NAME_RE = re.compile(rf"^{PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[a-z0-9]{{1,8}})?$")
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+_ADD_REF_SQL = """
+    INSERT INTO main_mediablob (name, size, refs, created_at) VALUES (%s, %s, 1, NOW())
+    ON CONFLICT (name) DO UPDATE SET refs = main_mediablob.refs + 1
+"""
+
+
+def is_content_name(name):
+    return bool(name) and CONTENT_NAME_RE.match(name) is not None
+
+
+def content_name(digest, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    extension = extension if _EXTENSION_RE.match(extension) else ""
+    return f"{PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # the final name is only known once the content is hashed (_save)
+        return name
+
+    def _save(self, name, content):
+        tmp_dir = self.path(f"{PREFIX}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest, size = hashlib.sha256(), 0
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    fh.write(chunk)
+                    size += len(chunk)
+            name = content_name(digest.hexdigest(), name)
+            path = self.path(name)
+            # the reference row is locked before the file is checked, so a concurrent
+            # delete() of the last reference cannot remove the file under us
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(_ADD_REF_SQL, [name, size])
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp, path)
+                    tmp = None
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        finally:
+            if tmp is not None:
+                os.remove(tmp)
+        return name
+
+    def delete(self, name):
+        if not is_content_name(name):
+            return super().delete(name)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("UPDATE main_mediablob SET refs = refs - 1 WHERE name = %s RETURNING refs", [name])
+            row = cursor.fetchone()
+            if row is not None and row[0] > 0:
+                return
+            cursor.execute("DELETE FROM main_mediablob WHERE name = %s", [name])
+            super().delete(name)
+
+
+def release(*names):
+    """Give back one reference to each content-addressed name; other names are left on disk as before."""
+    for name in names:
+        if is_content_name(name):
+            default_storage.delete(name)
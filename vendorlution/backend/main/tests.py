@@ -1,3 +1,1437 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import (
+    Banner, Cart, CartItem, CustomerProfile, Notification, Order, OrderItem,
+    Product, ProductCategory, ProductImage, VendorProfile, Wishlist,
+)
+from .models_extended import ChunkedUpload, MediaBlob, ProductListing, ProductViewDay, Shipment
+from .pagination import KeysetPagination, estimate_count
+from .popularity import record_product_views
+from .serializers import ProductDetailSerializer
+from .view_counts import product_views
+from . import facets, feeds, geo, images, search, search_engines, snapshots, views
+from .caching import bump_version, cache_stats, read_through
+
+
+def make_vendor(username, shop_name):
+    user = User.objects.create(username=username)
+    return VendorProfile.objects.create(user=user, shop_name=shop_name)
+
+
+class ProductSearchTests(TestCase):
+    """Postgres full-text ?search= over the weighted Product.search_vector."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Copper Works")
+        self.kettle = Product.objects.create(
+            title="Stovetop kettle", price=Decimal("20.00"), category=self.category, vendor=self.vendor
+        )
+        self.mug = Product.objects.create(
+            title="Blue mug", detail="Pairs with any kettle", price=Decimal("5.00"), vendor=make_vendor("other", "Mugs")
+        )
+
+    def titles(self, search):
+        return [row["title"] for row in self.client.get("/api/products/", {"search": search}).json()["results"]]
+
+    def test_title_match_ranks_above_detail_match(self):
+        self.assertEqual(self.titles("kettles"), ["Stovetop kettle", "Blue mug"])
+        self.assertEqual(self.titles("copper kettle"), ["Stovetop kettle"])
+        self.assertEqual(self.titles("teapot"), [])
+        # an explicit ordering still wins over the rank
+        self.assertEqual(
+            [row["title"] for row in self.client.get(
+                "/api/products/", {"search": "kettle", "ordering": "price"}
+            ).json()["results"]],
+            ["Blue mug", "Stovetop kettle"],
+        )
+
+    def test_renames_refresh_search_vectors(self):
+        self.category.title = "Teaware"
+        self.category.save()
+        self.vendor.shop_name = "Brass House"
+        self.vendor.save()
+        self.assertEqual(self.titles("teaware"), ["Stovetop kettle"])
+        self.assertEqual(self.titles("brass"), ["Stovetop kettle"])
+        self.assertEqual(self.titles("kitchen"), [])
+        self.assertEqual(self.titles("copper"), [])
+
+    def test_saves_that_skip_source_fields_keep_the_vector(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.kettle.stock = 3
+            self.kettle.save(update_fields=["stock"])
+        self.assertFalse(any(
+            q["sql"].startswith("UPDATE") and "search_vector" in q["sql"] for q in ctx.captured_queries
+        ))
+        self.assertEqual(search.refresh_product_search_vectors(), 2)
+
+
+class SuggestTests(TestCase):
+    """Typeahead completions from the prefix index (used when pg_trgm is not installed)."""
+
+    def setUp(self):
+        self.vendor = make_vendor("kettle", "Kettle Corner")
+        self.products = {
+            title: Product.objects.create(title=title, price=Decimal("5.00"), vendor=self.vendor)
+            for title in ("Purple Kettle", "Kettlebell 8kg", "Tea Kettle Stand")
+        }
+        Product.objects.create(title="Kettle Sold", price=Decimal("5.00"), vendor=self.vendor, is_sold=True)
+
+    def test_prefix_index_matches_word_starts(self):
+        index = search.PrefixIndex()
+        # names starting with the query first, then by length; sold products and mid-word hits are left out
+        self.assertEqual(
+            [hit["text"] for hit in index.search("kett", 10)],
+            ["Kettle Corner", "Kettlebell 8kg", "Purple Kettle", "Tea Kettle Stand"],
+        )
+        self.assertEqual(index.search("ettle", 10), [])
+
+        index.update("product", self.products["Purple Kettle"].pk, "Copper Pot")
+        index.update("product", self.products["Tea Kettle Stand"].pk, None)
+        self.assertEqual([hit["text"] for hit in index.search("kettle", 10)], ["Kettle Corner", "Kettlebell 8kg"])
+        self.assertEqual(index.search("copper", 10)[0]["id"], self.products["Purple Kettle"].pk)
+
+    def test_suggest_endpoint(self):
+        client = APIClient()
+        with mock.patch.object(search, "trigram_enabled", return_value=False), \
+                mock.patch.object(search, "prefix_index", search.PrefixIndex()):
+            hits = client.get("/api/products/suggest/", {"q": "Kett", "limit": 2}).json()
+            self.assertEqual(client.get("/api/products/suggest/", {"q": "k"}).json(), [])
+            self.assertEqual(len(client.get("/api/products/suggest/", {"q": "kett", "limit": "x"}).json()), 4)
+        self.assertEqual(hits, [
+            {"type": "vendor", "id": self.vendor.pk, "text": "Kettle Corner", "slug": self.vendor.slug},
+            {"type": "product", "id": self.products["Kettlebell 8kg"].pk, "text": "Kettlebell 8kg"},
+        ])
+
+
+class FacetTests(TestCase):
+    """?facets=1 on /api/products/: counts for the filtered set, cached per normalized filter."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.kitchen = ProductCategory.objects.create(title="Kitchen")
+        self.garden = ProductCategory.objects.create(title="Garden")
+        self.alpha = make_vendor("alpha", "Alpha")
+        self.beta = make_vendor("beta", "Beta")
+        for title, price, category, vendor, condition in [
+            ("Kettle", "20.00", self.kitchen, self.alpha, "new"),
+            ("Pan", "120.00", self.kitchen, self.alpha, "good"),
+            ("Hose", "60.00", self.garden, self.beta, "new"),
+            ("Mower", "1500.00", None, self.beta, "new"),
+        ]:
+            Product.objects.create(
+                title=title, price=Decimal(price), category=category, vendor=vendor, condition=condition
+            )
+        Product.objects.create(title="Sold", price=Decimal("5.00"), category=self.garden, vendor=self.beta, is_sold=True)
+
+    def facets(self, **params):
+        return self.client.get("/api/products/", {**params, "facets": 1}).json()["facets"]
+
+    def test_counts(self):
+        counts = self.facets()
+        self.assertEqual(counts["category"], [
+            {"value": self.kitchen.pk, "label": "Kitchen", "count": 2},
+            {"value": self.garden.pk, "label": "Garden", "count": 1},
+        ])
+        self.assertEqual(counts["condition"], [
+            {"value": "new", "label": "New", "count": 3},
+            {"value": "good", "label": "Good", "count": 1},
+        ])
+        self.assertEqual(
+            [(bucket["value"], bucket["min"], bucket["max"], bucket["count"]) for bucket in counts["price"]],
+            [("0-50", None, "50", 1), ("50-100", "50", "100", 1), ("100-250", "100", "250", 1), ("1000+", "1000", None, 1)],
+        )
+        self.assertEqual(counts["vendor"], [
+            {"value": self.alpha.pk, "label": "Alpha", "count": 2},
+            {"value": self.beta.pk, "label": "Beta", "count": 2},
+        ])
+
+    def test_counts_follow_filters(self):
+        counts = self.facets(condition="new", max_price="100")
+        self.assertEqual([(b["value"], b["count"]) for b in counts["category"]], [(self.garden.pk, 1), (self.kitchen.pk, 1)])
+        self.assertEqual([(b["value"], b["count"]) for b in counts["condition"]], [("new", 2)])
+        self.assertNotIn("facets", self.client.get("/api/products/").json())
+
+    def test_cache_key_ignores_paging_and_order(self):
+        key = facets.facet_cache_key
+        self.assertEqual(
+            key(QueryDict("category=3&min_price=10&page=2&facets=1&search=")),
+            key(QueryDict("min_price=10&category=3&ordering=-price&cursor=abc&page_size=5")),
+        )
+        self.assertEqual(key(QueryDict("condition=new&condition=good")), key(QueryDict("condition=good&condition=new")))
+        self.assertNotEqual(key(QueryDict("category=3")), key(QueryDict("category=4")))
+
+        with mock.patch.object(facets, "compute_facets", wraps=facets.compute_facets) as compute:
+            first = self.facets(condition="new")
+            self.assertEqual(self.facets(condition="new", ordering="price", page_size=1), first)
+            self.assertEqual(compute.call_count, 1)
+            self.facets(condition="good")
+            self.assertEqual(compute.call_count, 2)
+
+            # a write bumps the product version, so the next counts match the list again
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(title="Grater", price=Decimal("8.00"), vendor=self.alpha, condition="new")
+            self.assertEqual(self.facets(condition="new")["condition"], [{"value": "new", "label": "New", "count": 4}])
+            self.assertEqual(compute.call_count, 3)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages on /api/products/: every row exactly once, in order, whatever the ordering."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_vendor("seller", "Seller Shop")
+        # equal prices and creation times, so only the id tie-breaker tells rows apart
+        self.products = [
+            Product.objects.create(title=f"Kettle {i}", price=Decimal("10.00"), vendor=self.vendor)
+            for i in range(5)
+        ]
+        ProductListing.objects.update(created_at=timezone.now())
+
+    def ids(self, params):
+        return [row["id"] for row in self.client.get("/api/products/", {**params, "page_size": 100}).json()["results"]]
+
+    def walk(self, params):
+        """Follow `next` from the first page, then `previous` back; returns both lists of pages."""
+        body = self.client.get("/api/products/", {**params, "page_size": 2}).json()
+        forward = [[row["id"] for row in body["results"]]]
+        while body["next"]:
+            body = self.client.get(body["next"]).json()
+            forward.append([row["id"] for row in body["results"]])
+        backward = [forward[-1]]
+        while body["previous"]:
+            body = self.client.get(body["previous"]).json()
+            backward.insert(0, [row["id"] for row in body["results"]])
+        return forward, backward
+
+    def assert_pages(self, params, expected):
+        self.assertEqual(self.ids(params), expected)
+        forward, backward = self.walk(params)
+        self.assertEqual(forward, [expected[0:2], expected[2:4], expected[4:]])
+        self.assertEqual(backward, forward)
+
+    def test_default_ordering_breaks_ties_on_id(self):
+        self.assert_pages({}, [p.pk for p in reversed(self.products)])
+        first = self.client.get("/api/products/", {"page_size": 2}).json()
+        self.assertIsNone(first["previous"])
+        self.assertNotIn("count_is_estimate", first)
+
+    def test_explicit_ordering(self):
+        self.products[3].price = Decimal("5.00")
+        self.products[3].save()
+        ascending = [self.products[i].pk for i in (3, 0, 1, 2, 4)]
+        self.assert_pages({"ordering": "price"}, ascending)
+        self.assert_pages({"ordering": "-price"}, ascending[:0:-1] + ascending[:1])
+
+    def test_search_rank_cursor(self):
+        self.products[2].detail = "A kettle kettle for the kettle"
+        self.products[2].save()
+        for engine in ("database", "memory"):
+            with self.subTest(engine=engine), override_settings(SEARCH_ENGINE=engine):
+                self.addCleanup(setattr, search_engines.indexes["product"], "built", False)
+                expected = self.ids({"search": "kettle"})
+                self.assertEqual(sorted(expected), sorted(p.pk for p in self.products))
+                self.assertEqual(expected[0], self.products[2].pk)
+                self.assert_pages({"search": "kettle"}, expected)
+
+    def test_popular_queryset_paginates(self):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get("/api/products/popular/", {"page_size": 2}))
+        first = paginator.paginate_queryset(views._popular_products(), request)
+        self.assertEqual(paginator.ordering, [("popularity", True), ("product_id", True)])
+        request = Request(APIRequestFactory().get(paginator.get_next_link()))
+        second = paginator.paginate_queryset(views._popular_products(), request)
+        self.assertEqual([row.pk for row in first + second], [p.pk for p in reversed(self.products)][:4])
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", "eyJkIjoibiIsInYiOltdfQ"):  # the second is {"d":"n","v":[]}
+            self.assertEqual(self.client.get("/api/products/", {"cursor": cursor}).status_code, 404)
+
+    def test_count(self):
+        exact = self.client.get("/api/products/", {"count": "exact", "page_size": 2}).json()
+        self.assertEqual((exact["count"], exact["count_is_estimate"]), (5, False))
+        estimate = self.client.get("/api/products/", {"count": "estimate"}).json()
+        self.assertIs(estimate["count_is_estimate"], True)
+        self.assertIsInstance(estimate["count"], int)
+        self.assertIsNone(self.client.get("/api/products/").json()["count"])
+        # filtered querysets are estimated from the plan (ANALYZE so the planner knows the rows)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Product._meta.db_table}")
+        self.assertGreaterEqual(estimate_count(Product.objects.filter(price__gte=1)), 1)
+        self.assertEqual(estimate_count(Product.objects.all()), 5)
+
+
+class ProductListQueryBudgetTests(TestCase):
+    """
+    Every endpoint that returns products must cost a fixed number of
+    queries no matter how many rows it renders.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.buyer = User.objects.create(username="buyer")
+        self.customer = CustomerProfile.objects.create(user=self.buyer)
+        self.seller = make_vendor("seller", "Seller Shop")
+
+    def add_products(self, count):
+        """Each product gets its own vendor so per-row vendor/owner lookups would show up."""
+        products = []
+        for i in range(count):
+            n = Product.objects.count()
+            vendor = make_vendor(f"vendor{n}", f"Shop {n}")
+            products.append(Product.objects.create(
+                title=f"Product {n}", price=Decimal("10.00"), category=self.category, vendor=vendor,
+            ))
+            products.append(Product.objects.create(
+                title=f"Own product {n}", price=Decimal("12.00"), category=self.category, vendor=self.seller,
+            ))
+        return products
+
+    def add_order_and_cart_lines(self, products):
+        order = Order.objects.create(customer=self.customer, total_amount=Decimal("10.00"))
+        cart, _ = Cart.objects.get_or_create(customer=self.customer)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, price_snapshot=product.price)
+            CartItem.objects.get_or_create(cart=cart, product=product)
+
+    def count_queries(self, url, params=None, user=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assert_constant(self, url, budget, params=None, user=None):
+        small = self.count_queries(url, params, user)
+        self.add_order_and_cart_lines(self.add_products(6))
+        large = self.count_queries(url, params, user)
+        self.assertEqual(small, large, f"{url}: {small} queries for a small page, {large} for a large one")
+        self.assertLessEqual(large, budget, f"{url}: {large} queries, budget {budget}")
+
+    def test_product_list(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/products/", budget=1, params={"page_size": 50})
+
+    def test_product_list_search(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/products/", budget=1, params={"page_size": 50, "search": "product"})
+
+    def test_new_and_popular(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/products/new/", budget=1, params={"limit": 50})
+        self.assert_constant("/api/products/popular/", budget=1, params={"limit": 50})
+
+    def test_vendor_products(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/vendor/products/", budget=2, params={"page_size": 50}, user=self.seller.user)
+
+    def test_my_orders(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/me/orders/", budget=3, user=self.buyer)
+
+    def test_cart(self):
+        self.add_order_and_cart_lines(self.add_products(1))
+        self.assert_constant("/api/me/cart/", budget=3, user=self.buyer)
+
+    def test_card_shape(self):
+        self.add_products(1)
+        row = self.client.get("/api/products/").json()["results"][0]
+        self.assertEqual(set(row["vendor"]), {"id", "shop_name", "slug"})
+        self.assertEqual(set(row["category"]), {"id", "title", "slug"})
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= / ?expand= shape the payload and the SQL behind it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(
+            title="Kettle", price=Decimal("10.00"), category=self.category, vendor=self.vendor,
+        )
+
+    def test_fields_and_collapsed_relations(self):
+        row = self.client.get("/api/products/", {"fields": "id,title,vendor"}).json()["results"][0]
+        self.assertEqual(row, {"id": self.product.id, "title": "Kettle", "vendor": self.vendor.id})
+
+    def test_dotted_fields_expand_relation(self):
+        row = self.client.get("/api/products/", {"fields": "title,vendor.shop_name"}).json()["results"][0]
+        self.assertEqual(row, {"title": "Kettle", "vendor": {"shop_name": "Seller Shop"}})
+
+    def test_expand_nested_owner(self):
+        data = self.client.get(
+            f"/api/products/{self.product.id}/", {"fields": "id,vendor", "expand": "vendor.owner"}
+        ).json()
+        self.assertEqual(data["vendor"]["owner"]["username"], "seller")
+
+    def test_unexpanded_columns_are_not_loaded(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/products/", {"fields": "id,title"})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]["sql"]
+        self.assertNotIn("main_vendorprofile", sql)
+        self.assertNotIn('"detail"', sql)
+
+    def test_default_shape_unchanged(self):
+        row = self.client.get("/api/products/").json()["results"][0]
+        self.assertEqual(set(row["vendor"]), {"id", "shop_name", "slug"})
+
+
+class HomeEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(
+            title="Kettle", price=Decimal("10.00"), category=self.category, vendor=self.vendor,
+        )
+        Banner.objects.create(image="banners/a.jpg", title="Sale")
+
+    def get_home(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/home/")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_payload_and_cache_hit(self):
+        data, _ = self.get_home()
+        self.assertEqual(
+            set(data), {"new_products", "popular_products", "featured_vendors", "categories", "banners"}
+        )
+        self.assertEqual(data["new_products"][0]["title"], "Kettle")
+        self.assertEqual(data["banners"][0]["title"], "Sale")
+        _, queries = self.get_home()
+        self.assertEqual(queries, 0)
+
+    def test_writes_invalidate(self):
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = "Blue kettle"
+            self.product.save()
+        data, queries = self.get_home()
+        self.assertGreater(queries, 0)
+        self.assertEqual(data["new_products"][0]["title"], "Blue kettle")
+
+    def test_owner_rename_invalidates(self):
+        self.get_home()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.user.username = "renamed"
+            self.vendor.user.save()
+        data, _ = self.get_home()
+        self.assertEqual(data["featured_vendors"][0]["owner"]["username"], "renamed")
+
+
+class ReadThroughCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(
+            title="Kettle", price=Decimal("10.00"), category=self.category, vendor=self.vendor,
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_product_detail_hit_and_invalidation(self):
+        url = f"/api/products/{self.product.id}/"
+        self.get(url)
+        data, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        self.assertEqual(cache_stats()["hits"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image="products/a.jpg")
+        data, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        self.assertEqual(len(data["images"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.shop_name = "Renamed Shop"
+            self.vendor.save()
+        data, _ = self.get(url)
+        self.assertEqual(data["vendor"]["shop_name"], "Renamed Shop")
+        self.assertEqual(cache_stats()["stale"], 2)
+
+    def test_write_committed_during_build_is_not_served(self):
+        def build():
+            bump_version("product:race")  # another request commits while this payload is being built
+            return "built before the write"
+
+        self.assertEqual(read_through("race", ["product:race"], build), "built before the write")
+        self.assertEqual(read_through("race", ["product:race"], lambda: "rebuilt"), "rebuilt")
+        self.assertEqual(cache_stats()["stale"], 1)
+
+    def test_vendor_by_slug_and_category_list(self):
+        url = f"/api/vendors/slug/{self.vendor.slug}/"
+        self.get(url)
+        self.assertEqual(self.get(url)[1], 0)
+        self.get("/api/categories/")
+        self.assertEqual(self.get("/api/categories/")[1], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.is_active = False
+            self.vendor.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(
+            title="Kettle", price=Decimal("10.00"), category=self.category, vendor=self.vendor,
+        )
+
+    def test_product_detail_etag(self):
+        url = f"/api/products/{self.product.id}/"
+        first = self.client.get(url)
+        self.assertIn("ETag", first.headers)
+        # images are validated too, and a deleted image would not move MAX(updated_at)
+        self.assertNotIn("Last-Modified", first.headers)
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first.headers["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        ProductImage.objects.create(product=self.product, image="products/a.jpg")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first.headers["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], first.headers["ETag"])
+
+    def test_list_fingerprint_tracks_deletes(self):
+        ProductCategory.objects.create(title="Garden")
+        first = self.client.get("/api/categories/all/")
+        self.assertNotIn("Last-Modified", first.headers)
+        self.assertEqual(
+            self.client.get("/api/categories/all/", HTTP_IF_NONE_MATCH=first.headers["ETag"]).status_code, 304
+        )
+        ProductCategory.objects.filter(title="Garden").delete()
+        self.assertEqual(
+            self.client.get("/api/categories/all/", HTTP_IF_NONE_MATCH=first.headers["ETag"]).status_code, 200
+        )
+        # a delete leaves MAX(updated_at) where it was: If-Modified-Since alone must not get a 304
+        since = http_date(timezone.now().timestamp() + 60)
+        self.assertEqual(self.client.get("/api/categories/all/", HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_single_row_keeps_last_modified(self):
+        first = self.client.get(f"/api/vendors/{self.vendor.pk}/")
+        self.assertEqual(
+            self.client.get(
+                f"/api/vendors/{self.vendor.pk}/", HTTP_IF_MODIFIED_SINCE=first.headers["Last-Modified"]
+            ).status_code,
+            304,
+        )
+
+    def test_notifications(self):
+        user = self.vendor.user
+        note = Notification.objects.create(user=user, message="Hi")
+        self.client.force_authenticate(user)
+        first = self.client.get("/api/me/notifications/")
+        self.assertIn("Authorization", first.headers["Vary"])
+        again = self.client.get("/api/me/notifications/", HTTP_IF_NONE_MATCH=first.headers["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertIn("Cookie", again.headers["Vary"])
+
+        # same URL and timestamps, different user: a different ETag
+        other = User.objects.create(username="other")
+        twin = Notification.objects.create(user=other, message="Hi")
+        Notification.objects.filter(pk=twin.pk).update(updated_at=Notification.objects.get(pk=note.pk).updated_at)
+        self.client.force_authenticate(other)
+        self.assertEqual(
+            self.client.get("/api/me/notifications/", HTTP_IF_NONE_MATCH=first.headers["ETag"]).status_code, 200
+        )
+        self.client.force_authenticate(user)
+        note.is_read = True
+        note.save()
+        self.assertEqual(
+            self.client.get("/api/me/notifications/", HTTP_IF_NONE_MATCH=first.headers["ETag"]).status_code, 200
+        )
+
+
+class LiveListingIndexTests(TestCase):
+    """
+    EXPLAIN each public listing query with sequential scans disabled: the
+    planner still falls back to a Seq Scan when no index can serve it.
+    Sorts and bitmap scans are disabled too, so on these tiny tables the
+    planner picks the index whose order matches the query.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        vendor = make_vendor("seller", "Seller Shop")
+        for i in range(5):
+            Product.objects.create(
+                title=f"Product {i}", price=Decimal(10 + i), category=self.category, vendor=vendor,
+            )
+
+    def plan_for(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content)
+        sql = [q["sql"] for q in ctx.captured_queries if 'FROM "main_productlisting"' in q["sql"]][-1]
+        with connection.cursor() as cursor:
+            for setting in ("enable_seqscan", "enable_bitmapscan", "enable_sort"):
+                cursor.execute(f"SET LOCAL {setting} = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assert_index(self, index, url, params=None):
+        plan = self.plan_for(url, params)
+        self.assertIsNone(re.search(r"Seq Scan on main_productlisting\b", plan), plan)
+        self.assertIn(index, plan)
+
+    def test_orderings(self):
+        self.assert_index("main_listing_created_idx", "/api/products/")
+        self.assert_index("main_listing_rating_idx", "/api/products/", {"ordering": "-rating_avg"})
+        self.assert_index("main_listing_price_idx", "/api/products/", {"ordering": "price"})
+        self.assert_index("main_listing_created_idx", "/api/products/new/")
+        self.assert_index("main_listing_popular_idx", "/api/products/popular/")
+        self.assert_index("main_listing_popular_idx", "/api/products/", {"ordering": "-popularity"})
+
+    def test_filters(self):
+        self.assert_index(
+            "main_listing_price_idx", "/api/products/", {"ordering": "price", "min_price": 11, "max_price": 13}
+        )
+        self.assert_index("main_listing_category_idx", "/api/products/", {"category": self.category.id})
+        self.assert_index("main_listing_condition_idx", "/api/products/", {"condition": "good"})
+
+    def test_filter_results(self):
+        def titles(params):
+            return {p["title"] for p in self.client.get("/api/products/", params).json()["results"]}
+
+        self.assertEqual(titles({"min_price": 11, "max_price": 12}), {"Product 1", "Product 2"})
+        self.assertEqual(titles({"category": self.category.id + 1}), set())
+        Product.objects.get(title="Product 0").mark_as_sold()
+        self.assertNotIn("Product 0", titles({}))
+
+
+class ProductListingSyncTests(TestCase):
+    """The listing read model follows writes to products, categories and vendors."""
+
+    def setUp(self):
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(
+            title="Kettle", price=Decimal("20.00"), category=self.category, vendor=self.vendor,
+        )
+
+    def listing(self):
+        return ProductListing.objects.get(product=self.product)
+
+    def test_product_changes(self):
+        self.product.price = Decimal("15.00")
+        self.product.save()
+        self.assertEqual(self.listing().price, Decimal("15.00"))
+        self.product.mark_as_sold()
+        self.assertTrue(self.listing().is_sold)
+        self.product.delete()
+        self.assertFalse(ProductListing.objects.exists())
+
+    def test_related_renames(self):
+        self.category.title = "Cookware"
+        self.category.save()
+        self.vendor.shop_name = "Renamed Shop"
+        self.vendor.save()
+        listing = self.listing()
+        self.assertEqual((listing.category_title, listing.vendor_shop_name), ("Cookware", "Renamed Shop"))
+
+    def test_category_delete_detaches(self):
+        self.category.delete()
+        listing = self.listing()
+        self.assertEqual((listing.category_id, listing.category_title), (None, None))
+
+    def test_rebuild_command(self):
+        ProductListing.objects.all().delete()
+        call_command("rebuild_product_listings", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual(self.listing().title, "Kettle")
+
+
+class PopularityTests(TestCase):
+    def setUp(self):
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.old, self.new = [
+            Product.objects.create(title=title, price=Decimal("10.00"), vendor=self.vendor)
+            for title in ("Old favourite", "New arrival")
+        ]
+        buyer = User.objects.create(username="buyer")
+        self.customer = CustomerProfile.objects.create(user=buyer)
+
+    def popular_titles(self):
+        return [p["title"] for p in APIClient().get("/api/products/popular/").json()]
+
+    def scores(self):
+        return dict(Product.objects.values_list("title", "popularity"))
+
+    def test_events_raise_score_and_order_feed(self):
+        Wishlist.objects.create(customer=self.customer, product=self.old)
+        self.assertEqual(self.popular_titles(), ["Old favourite", "New arrival"])
+        cart = Cart.objects.create(customer=self.customer)
+        CartItem.objects.create(cart=cart, product=self.new)
+        self.assertEqual(self.popular_titles(), ["New arrival", "Old favourite"])
+        self.assertEqual(
+            ProductListing.objects.get(product=self.new).popularity,
+            Product.objects.get(pk=self.new.pk).popularity,
+        )
+
+    def test_recent_activity_outweighs_older_activity(self):
+        now = timezone.now()
+        # ten views a month ago (~4 half-lives) lose to two views today
+        record_product_views({self.old.pk: 10}, when=now - timedelta(days=30))
+        record_product_views({self.new.pk: 2}, when=now)
+        self.assertEqual(self.popular_titles(), ["New arrival", "Old favourite"])
+        self.assertEqual(ProductViewDay.objects.get(product=self.old).views, 10)
+
+    def test_completed_order_and_recompute(self):
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.old, quantity=2, price_snapshot=Decimal("10.00"))
+        record_product_views({self.new.pk: 3})
+        self.assertEqual(self.popular_titles(), ["New arrival", "Old favourite"])
+        order.status = Order.Status.DELIVERED
+        order.save(update_fields=["status"])
+        self.assertEqual(self.popular_titles(), ["Old favourite", "New arrival"])
+
+        incremental = self.scores()
+        Product.objects.update(popularity=0)
+        call_command("recompute_popularity", "--chunk-size", "1", stdout=StringIO())
+        for title, score in self.scores().items():
+            self.assertAlmostEqual(score, incremental[title], places=3)
+        self.assertEqual(self.popular_titles(), ["Old favourite", "New arrival"])
+
+
+class ProductViewCounterTests(TestCase):
+    """Detail views are buffered in memory and written in one batched statement."""
+
+    def setUp(self):
+        cache.clear()
+        product_views.clear()
+        self.addCleanup(product_views.clear)
+        self.client = APIClient()
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.product = Product.objects.create(title="Kettle", price=Decimal("10.00"), vendor=self.vendor)
+        self.url = f"/api/products/{self.product.pk}/"
+
+    def test_views_buffer_then_flush_in_one_statement(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+            self.client.get(self.url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(product_views.pending(), {self.product.pk: 3})
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 0)
+
+        gone = Product.objects.create(title="Deleted later", price=Decimal("1.00"), vendor=self.vendor)
+        product_views.record(gone.pk)
+        gone.delete()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(product_views.flush(), 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.view_count, 3)
+        self.assertEqual(ProductViewDay.objects.get(product=product).views, 3)
+        self.assertGreater(product.popularity, 0)
+        self.assertEqual(ProductListing.objects.get(product=product).popularity, product.popularity)
+        self.assertEqual(product_views.pending(), {})
+
+    @override_settings(PRODUCT_VIEW_FLUSH_SIZE=1)
+    def test_flush_after_request_and_vendor_dashboard(self):
+        self.client.get(self.url)
+        self.assertEqual(product_views.pending(), {})
+        self.assertEqual(Product.objects.get(pk=self.product.pk).view_count, 1)
+
+        self.client.force_authenticate(self.vendor.user)
+        rows = self.client.get("/api/vendor/products/").json()["results"]
+        self.assertEqual(rows[0]["view_count"], 1)
+
+
+@override_settings(RECENTLY_VIEWED_LIMIT=3)
+class RecentlyViewedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(product_views.clear)
+        vendor = make_vendor("seller", "Seller Shop")
+        self.products = [
+            Product.objects.create(title=f"Thing {i}", price=Decimal("5.00"), vendor=vendor) for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="buyer"))
+
+    def view(self, *products):
+        for product in products:
+            self.client.get(f"/api/products/{product.pk}/")
+
+    def recent(self):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.client.get("/api/me/recently-viewed/").json()
+        self.assertLessEqual(len(ctx.captured_queries), 1)
+        return [row["title"] for row in rows]
+
+    def test_bounded_newest_first(self):
+        self.assertEqual(self.recent(), [])
+        a, b, c, d = self.products
+        self.view(a, b, a, c, d)
+        self.assertEqual(self.recent(), ["Thing 3", "Thing 2", "Thing 0"])
+
+        c.is_sold = True
+        c.save()
+        self.assertEqual(self.recent(), ["Thing 3", "Thing 0"])
+        self.assertEqual(self.client.delete("/api/me/recently-viewed/").status_code, 204)
+        self.assertEqual(self.recent(), [])
+
+    def test_anonymous_views_not_tracked(self):
+        APIClient().get(f"/api/products/{self.products[0].pk}/")
+        self.assertEqual(self.recent(), [])
+        self.assertEqual(APIClient().get("/api/me/recently-viewed/").status_code, 401)
+
+
+class SimilarProductsTests(TestCase):
+    def setUp(self):
+        vendor = make_vendor("seller", "Seller Shop")
+        self.kettle, self.mug, self.teapot, self.drill = [
+            Product.objects.create(title=title, price=Decimal("10.00"), vendor=vendor)
+            for title in ("Kettle", "Mug", "Teapot", "Drill")
+        ]
+        customers = [
+            CustomerProfile.objects.create(user=User.objects.create(username=f"c{i}")) for i in range(3)
+        ]
+        for customer, products in zip(customers, [
+            (self.kettle, self.mug), (self.kettle, self.mug, self.teapot), (self.drill,),
+        ]):
+            order = Order.objects.create(customer=customer)
+            for product in products:
+                OrderItem.objects.create(order=order, product=product, price_snapshot=Decimal("10.00"))
+        Wishlist.objects.create(customer=customers[0], product=self.teapot)
+
+    def similar(self, product, **params):
+        response = APIClient().get(f"/api/products/{product.id}/similar/", params)
+        self.assertEqual(response.status_code, 200)
+        return [p["title"] for p in response.json()]
+
+    def test_build_and_serve_neighbours(self):
+        call_command("build_product_similarity", "--chunk-size", "2", stdout=StringIO())
+        self.assertEqual(self.similar(self.kettle), ["Mug", "Teapot"])
+        self.assertEqual(self.similar(self.drill), [])
+        self.assertEqual(self.similar(self.kettle, limit=-3), ["Mug"])
+
+        self.mug.mark_as_sold()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.similar(self.kettle), ["Teapot"])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_rebuild_replaces_previous_lists(self):
+        call_command("build_product_similarity", "--top-k", "1", stdout=StringIO())
+        call_command("build_product_similarity", "--top-k", "1", stdout=StringIO())
+        self.assertEqual(self.similar(self.kettle), ["Mug"])
+
+
+class SavedSearchTests(TestCase):
+    def setUp(self):
+        self.category = ProductCategory.objects.create(title="Kitchen")
+        self.vendor = make_vendor("seller", "Seller Shop")
+        self.buyer = User.objects.create(username="buyer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def save_search(self, **data):
+        response = self.client.post("/api/me/saved-searches/", data, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def list_product(self, title, price="20.00", **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(title=title, price=Decimal(price), vendor=self.vendor, **extra)
+
+    def notified(self):
+        return list(
+            Notification.objects.filter(user=self.buyer, type=Notification.Type.SAVED_SEARCH)
+            .values_list("message", flat=True)
+        )
+
+    def test_text_and_filters_must_all_match(self):
+        self.save_search(query="electric kettles", category=self.category.id, max_price="50.00")
+        self.list_product("Electric kettle", category=self.category)
+        self.list_product("Steel electric kettle", price="80.00", category=self.category)
+        self.list_product("Glass electric kettle")
+        self.list_product("Kettle", category=self.category)
+        self.assertEqual(len(self.notified()), 1)
+        self.assertIn('"Electric kettle"', self.notified()[0])
+
+    def test_overlong_terms_fit_the_key_column(self):
+        self.save_search(query="x" * 150)
+        self.list_product("x" * 150)
+        self.list_product("y" * 150)
+        self.assertEqual(len(self.notified()), 1)
+
+    def test_filter_only_search_and_deactivation(self):
+        search = self.save_search(condition="good")
+        self.list_product("Lamp", condition="good")
+        self.list_product("Chair", condition="new")
+        self.assertEqual(len(self.notified()), 1)
+
+        self.client.patch(f"/api/me/saved-searches/{search['id']}/", {"is_active": False}, format="json")
+        self.list_product("Desk", condition="good")
+        self.assertEqual(len(self.notified()), 1)
+
+    def test_matching_is_one_indexed_lookup(self):
+        for i in range(20):
+            self.save_search(query=f"widget{i}")
+        with CaptureQueriesContext(connection) as ctx:
+            self.list_product("widget7 deluxe")
+        matching = [q["sql"] for q in ctx.captured_queries if "main_savedsearchkey" in q["sql"]]
+        self.assertEqual(len(matching), 1)
+        self.assertEqual(len(self.notified()), 1)
+
+    def test_invalid_price_range(self):
+        response = self.client.post(
+            "/api/me/saved-searches/", {"min_price": "10.00", "max_price": "5.00"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class NearFilterTests(TestCase):
+    """?near= radius filtering over the geohash grid (Cape Town area coordinates)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        spots = {
+            "Campus Shop": (-33.9577, 18.4612),      # ~0.5 km from the query point
+            "Claremont Shop": (-33.9810, 18.4650),   # ~3 km
+            "Stellenbosch Shop": (-33.9321, 18.8602),  # ~37 km
+            "Nowhere Shop": (None, None),
+        }
+        for i, (name, (lat, lng)) in enumerate(spots.items()):
+            vendor = make_vendor(f"seller{i}", name)
+            vendor.latitude, vendor.longitude = lat, lng
+            vendor.save()
+            Product.objects.create(title=f"Item from {name}", price=Decimal("10.00"), vendor=vendor)
+        self.near = "-33.9550,18.4600"
+
+    def test_encode_and_cover(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        cells = geo.cover(-33.9550, 18.4600, 5)
+        self.assertEqual(len(cells), 9)
+        campus = VendorProfile.objects.get(shop_name="Campus Shop")
+        self.assertTrue(any(campus.geohash.startswith(cell) for cell in cells))
+
+    def test_products_near(self):
+        response = self.client.get("/api/products/", {"near": self.near, "radius": 5})
+        results = response.json()["results"]
+        self.assertEqual(
+            [p["title"] for p in results], ["Item from Campus Shop", "Item from Claremont Shop"]
+        )
+        self.assertLess(results[0]["distance"], results[1]["distance"])
+        self.assertAlmostEqual(results[1]["distance"], 2.9, delta=0.3)
+
+        wide = self.client.get("/api/products/", {"near": self.near, "radius": 50, "page_size": 2}).json()
+        self.assertEqual(len(wide["results"]), 2)
+        rest = self.client.get(wide["next"]).json()["results"]
+        self.assertEqual([p["title"] for p in rest], ["Item from Stellenbosch Shop"])
+
+    def test_vendors_near_and_listing_sync(self):
+        vendor = VendorProfile.objects.get(shop_name="Stellenbosch Shop")
+        vendor.latitude, vendor.longitude = -33.9560, 18.4620
+        vendor.save(update_fields=["latitude", "longitude"])
+        names = [v["shop_name"] for v in self.client.get("/api/vendors/", {"near": self.near, "radius": 2}).json()["results"]]
+        self.assertEqual(set(names), {"Campus Shop", "Stellenbosch Shop"})
+        listing = ProductListing.objects.get(vendor_id=vendor.id)
+        self.assertEqual(listing.geohash, VendorProfile.objects.get(pk=vendor.pk).geohash)
+
+    def test_invalid_params(self):
+        for params in ({"near": "abc"}, {"near": "100,0"}, {"near": self.near, "radius": 0}):
+            self.assertEqual(self.client.get("/api/products/", params).status_code, 400)
+
+
+@override_settings(SEARCH_ENGINE="memory")
+class MemorySearchEngineTests(TestCase):
+    """In-process BM25 engine behind ?search= on the product and vendor lists."""
+
+    def setUp(self):
+        self.client = APIClient()
+        for index in search_engines.indexes.values():
+            self.addCleanup(setattr, index, "built", False)
+        self.vendor = make_vendor("seller", "Kitchen Corner")
+        self.kettle = Product.objects.create(title="Red kettle", price=Decimal("20.00"), vendor=self.vendor)
+        self.mug = Product.objects.create(
+            title="Blue mug", detail="Goes well with a kettle", price=Decimal("5.00"), vendor=self.vendor
+        )
+
+    def titles(self, url, search):
+        rows = self.client.get(url, {"search": search}).json()["results"]
+        return [row.get("title") or row.get("shop_name") for row in rows]
+
+    def test_bm25_ranking_and_all_terms(self):
+        self.assertEqual(self.titles("/api/products/", "kettles"), ["Red kettle", "Blue mug"])
+        self.assertEqual(self.titles("/api/products/", "kettle mug"), ["Blue mug"])
+        self.assertEqual(self.titles("/api/products/", "teapot"), [])
+        self.assertEqual(self.titles("/api/vendors/", "corner"), ["Kitchen Corner"])
+
+    def test_signals_keep_index_current(self):
+        self.titles("/api/products/", "kettle")  # builds the index
+        self.kettle.title = "Red teapot"
+        self.kettle.save()
+        self.assertEqual(self.titles("/api/products/", "teapot"), ["Red teapot"])
+        self.assertEqual(self.titles("/api/products/", "red kettle"), [])
+        self.mug.is_sold = True
+        self.mug.save()
+        self.assertEqual(self.titles("/api/products/", "mug"), [])
+        self.vendor.shop_name = "Brew House"
+        self.vendor.save()
+        self.assertEqual(self.titles("/api/products/", "brew"), ["Red teapot"])
+        self.assertEqual(self.titles("/api/vendors/", "brew"), ["Brew House"])
+
+    def test_hit_limit_is_reported(self):
+        response = self.client.get("/api/products/", {"search": "kettle"}).json()
+        self.assertNotIn("search_hit_limit", response)
+        with mock.patch.object(search_engines.MemorySearchEngine, "MAX_HITS", 1):
+            response = self.client.get("/api/products/", {"search": "kettle"}).json()
+        self.assertEqual([row["title"] for row in response["results"]], ["Red kettle"])
+        self.assertEqual(response["search_hit_limit"], 1)
+
+    def test_warm_up_builds_indexes(self):
+        search_engines.warm_up()
+        self.assertTrue(all(index.built for index in search_engines.indexes.values()))
+        with self.assertRaises(TypeError):
+            type("NoDocuments", (search_engines.InvertedIndex,), {})({"title": 1})
+
+    def test_compact_keeps_results(self):
+        index = search_engines.indexes["product"]
+        index.build()
+        for i in range(3):
+            self.kettle.title = f"Kettle mark {i}"
+            self.kettle.save()
+        with index._lock:
+            index.compact()
+        self.assertEqual(len(index._doc_pks), 2)
+        self.assertEqual([pk for pk, _score in index.search("kettle mark", 10)], [self.kettle.pk])
+
+
+class CatalogFeedTests(TestCase):
+    """Sharded sitemap / JSONL feed with small shards (3 ids each)."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.enterContext(override_settings(CATALOG_FEED_ROOT=self.root, FRONTEND_ORIGIN="https://shop.test"))
+        self.enterContext(mock.patch.object(feeds, "SHARD_SIZE", 3))
+        vendor = make_vendor("seller", "Seller Shop")
+        self.products = [
+            Product.objects.create(title=f"Item {i}", price=Decimal("5.00"), vendor=vendor) for i in range(7)
+        ]
+        self.base = self.products[0].pk - 1
+
+    def build(self, force=False):
+        return dict(feeds.build_feeds(force=force))
+
+    def read(self, kind, shard):
+        with gzip.open(feeds.shard_path(kind, shard), "rt") as fh:
+            return fh.read()
+
+    def test_incremental_rebuild(self):
+        actions = self.build()
+        self.assertTrue(actions and set(actions.values()) == {"written"})
+        first = min(actions)
+        self.assertIn("<loc>https://shop.test/products/", self.read("sitemap", first))
+        lines = sum(len(self.read("feed", shard).splitlines()) for shard in actions)
+        self.assertEqual(lines, 7)
+
+        self.assertEqual(set(self.build().values()), {"unchanged"})
+        changed = self.products[-1]
+        changed.title = "Renamed"
+        changed.save()
+        actions = self.build()
+        self.assertEqual([s for s, a in actions.items() if a == "written"], [(changed.pk - 1) // 3])
+        self.assertIn('"title":"Renamed"', self.read("feed", (changed.pk - 1) // 3))
+
+    def test_endpoints(self):
+        self.build()
+        client = APIClient()
+        index = client.get("/api/sitemap.xml")
+        self.assertEqual(index["Content-Type"], "application/xml")
+        self.assertIn("/api/sitemap-", index.content.decode())
+        feed = client.get("/api/feed/").json()
+        self.assertEqual(sum(shard["count"] for shard in feed["shards"]), 7)
+
+        shard = (self.products[0].pk - 1) // 3
+        response = client.get(f"/api/feed-{shard}.jsonl.gz")
+        self.assertEqual(response.status_code, 200)
+        body = gzip.decompress(b"".join(response.streaming_content)).decode()
+        self.assertIn('"title":"Item 0"', body)
+        again = client.get(f"/api/feed-{shard}.jsonl.gz", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(client.get("/api/sitemap-999.xml.gz").status_code, 404)
+
+
+class CatalogSnapshotTests(TestCase):
+    """Static snapshot shards: content-hashed names, only changed shards rewritten."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_ROOT=self.root, CATALOG_SNAPSHOT_PAGES=2))
+        vendor = make_vendor("seller", "Seller Shop")
+        self.books = ProductCategory.objects.create(title="Books")
+        self.games = ProductCategory.objects.create(title="Games")
+        self.book = Product.objects.create(title="Novel", price=Decimal("5.00"), vendor=vendor, category=self.books)
+        Product.objects.create(title="Chess", price=Decimal("9.00"), vendor=vendor, category=self.games)
+
+    def manifest(self):
+        with open(f"{self.root}/manifest.json") as fh:
+            return json.load(fh)
+
+    def read(self, name):
+        entry = self.manifest()["shards"][name]
+        with gzip.open(f"{self.root}/{entry['file']}", "rt") as fh:
+            return json.load(fh)
+
+    def test_only_changed_shards_are_rewritten(self):
+        first = snapshots.build_snapshots()
+        self.assertEqual(first["written"], first["shards"])
+        self.assertEqual(self.read(f"category-{self.books.pk}-page-1")["results"][0]["title"], "Novel")
+        counts = {c["title"]: c["product_count"] for c in self.read("categories")}
+        self.assertEqual(counts, {"Books": 1, "Games": 1})
+
+        self.assertEqual(snapshots.build_snapshots()["written"], 0)
+
+        old_file = self.manifest()["shards"][f"category-{self.games.pk}-page-1"]["file"]
+        self.book.title = "Short Stories"
+        self.book.save()
+        result = snapshots.build_snapshots()
+        # the category page and the all-products page hold the book
+        self.assertEqual(result["written"], 2)
+        self.assertEqual(self.read(f"category-{self.books.pk}-page-1")["results"][0]["title"], "Short Stories")
+        self.assertEqual(self.manifest()["shards"][f"category-{self.games.pk}-page-1"]["file"], old_file)
+
+    def test_stale_files_pruned_after_two_generations(self):
+        snapshots.build_snapshots()
+        original = self.manifest()["shards"]["products-page-1"]["file"]
+        self.book.title = "Edition 2"
+        self.book.save()
+        snapshots.build_snapshots()
+        self.assertTrue(os.path.exists(f"{self.root}/{original}"))
+        self.book.title = "Edition 3"
+        self.book.save()
+        snapshots.build_snapshots()
+        self.assertFalse(os.path.exists(f"{self.root}/{original}"))
+
+
+def make_photo(name="photo.jpg", size=(300, 200), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class MediaTestCase(TestCase):
+    """Base for tests that write images: a throwaway MEDIA_ROOT, variants built inline, one vendor."""
+
+    variant_widths = (100,)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.enterContext(override_settings(**self.media_settings()))
+        self.vendor = make_vendor("seller", "Seller Shop")
+
+    def media_settings(self):
+        return {"MEDIA_ROOT": self.root, "IMAGE_VARIANT_WORKERS": 0, "IMAGE_VARIANT_WIDTHS": self.variant_widths}
+
+
+class ImageVariantTests(MediaTestCase):
+    """Resized WebP/JPEG copies built after commit and exposed as srcsets."""
+
+    variant_widths = (100, 400)
+
+    def test_variants_built_and_serialized(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                title="Lamp", price=Decimal("9.00"), vendor=self.vendor, main_image=make_photo()
+            )
+        product.refresh_from_db()
+        files = product.main_image_variants["files"]
+        self.assertEqual(sorted(files["webp"]), ["100", "300"])  # 400 > original width: not upscaled
+        with Image.open(os.path.join(self.root, files["jpeg"]["100"])) as thumb:
+            self.assertEqual(thumb.size, (100, 67))
+        self.assertEqual(ProductListing.objects.get(product=product).main_image_variants, product.main_image_variants)
+
+        card = APIClient().get("/api/products/").json()["results"][0]
+        self.assertIn("100w", card["main_image_variants"]["srcset"]["webp"])
+        self.assertTrue(card["main_image_variants"]["jpeg"]["300"].endswith(".jpg"))
+
+        # a new upload hides the old variants until its own are built
+        product.main_image = make_photo("other.jpg", color="blue")
+        product.save()
+        detail = ProductDetailSerializer(Product.objects.get(pk=product.pk)).data
+        self.assertIsNone(detail["main_image_variants"])
+
+    def test_placeholder_in_cards(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                title="Lamp", price=Decimal("9.00"), vendor=self.vendor, main_image=make_photo(size=(240, 160))
+            )
+            ProductImage.objects.create(product=product, image=make_photo(size=(90, 120), color="blue"))
+        card = APIClient().get("/api/products/").json()["results"][0]
+        placeholder = card["main_image_placeholder"]
+        self.assertEqual((placeholder["width"], placeholder["height"]), (240, 160))
+        self.assertRegex(placeholder["blurhash"], r"^L.{27}$")  # 4x3 components
+        gallery = APIClient().get(f"/api/products/{product.pk}/").json()["images"]
+        self.assertEqual(gallery[0]["image_placeholder"]["height"], 120)
+
+        # rows rendered before placeholders existed are picked up by the backfill
+        Product.objects.filter(pk=product.pk).update(
+            main_image_variants={"src": product.main_image.name, "files": {"jpeg": {}}}
+        )
+        call_command("generate_image_variants", "--workers", "0", stdout=StringIO())
+        product.refresh_from_db()
+        self.assertIn("blurhash", product.main_image_variants)
+
+    def test_backfill_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(
+                product=Product.objects.create(title="Desk", price=Decimal("5.00"), vendor=self.vendor),
+                image=make_photo(),
+            )
+        ProductImage.objects.filter(pk=image.pk).update(image_variants={})
+        call_command("generate_image_variants", "--workers", "0", stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.image_variants["src"], image.image.name)
+
+
+class MediaStorageTests(MediaTestCase):
+    """Uploads stored once per content hash, with references given back on replace/delete."""
+
+    def make_product(self, title, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(title=title, price=Decimal("5.00"), vendor=self.vendor, **kwargs)
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.make_product("Mug", main_image=make_photo("a.jpg"))
+        second = self.make_product("Cup", main_image=make_photo("b.JPG"))
+        name = first.main_image.name
+        self.assertRegex(name, r"^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(second.main_image.name, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refs, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(os.path.join(self.root, name)))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(os.path.join(self.root, name)))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_replacing_an_image_releases_the_old_one(self):
+        product = self.make_product("Mug", main_image=make_photo())
+        product.refresh_from_db()
+        old = product.main_image.name
+        old_variants = [path for by_width in product.main_image_variants["files"].values() for path in by_width.values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.main_image = make_photo(color="blue")
+            product.save()
+        self.assertNotEqual(product.main_image.name, old)
+        for path in [old, *old_variants]:
+            self.assertFalse(os.path.exists(os.path.join(self.root, path)), path)
+        self.assertEqual(MediaBlob.objects.filter(name=product.main_image.name).get().refs, 1)
+
+    def test_uploading_the_same_image_again_keeps_one_reference(self):
+        product = self.make_product("Mug", main_image=make_photo())
+        name = product.main_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            product.main_image = make_photo("again.jpg")
+            product.save()
+        self.assertEqual(product.main_image.name, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refs, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.root, name)))
+
+    def test_rebuilding_variants_keeps_one_reference(self):
+        product = self.make_product("Mug", main_image=make_photo())
+        images.build_variants(Product, product.pk, "main_image", product.main_image.name)
+        product.refresh_from_db()
+        for path in images.variant_files(product.main_image_variants):
+            self.assertEqual(MediaBlob.objects.get(name=path).refs, 1, path)
+
+    def test_shipment_proof_references(self):
+        order = Order.objects.create(customer=CustomerProfile.objects.create(user=User.objects.create(username="buyer")))
+        with self.captureOnCommitCallbacks(execute=True):
+            shipment = Shipment.objects.create(order=order, method="courier", proof_of_dropoff=make_photo())
+        first = shipment.proof_of_dropoff.name
+        self.assertEqual(MediaBlob.objects.get(name=first).refs, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            shipment.proof_of_dropoff = make_photo(color="blue")
+            shipment.save()
+        second = shipment.proof_of_dropoff.name
+        self.assertFalse(MediaBlob.objects.filter(name=first).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.root, first)))
+        with self.captureOnCommitCallbacks(execute=True):
+            shipment.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=second).exists())
+
+    def test_migrate_command_moves_legacy_files(self):
+        product = self.make_product("Mug")
+        legacy = "products/legacy/mug.jpg"
+        os.makedirs(os.path.join(self.root, "products/legacy"))
+        with open(os.path.join(self.root, legacy), "wb") as fh:
+            fh.write(make_photo().read())
+        Product.objects.filter(pk=product.pk).update(main_image=legacy, main_image_variants={"src": legacy})
+        ProductListing.objects.filter(pk=product.pk).update(main_image=legacy)
+
+        out = StringIO()
+        call_command("migrate_media_to_cas", "--delete-originals", stdout=out)
+        product.refresh_from_db()
+        self.assertTrue(product.main_image.name.startswith("cas/"))
+        self.assertEqual(product.main_image_variants["src"], product.main_image.name)
+        self.assertEqual(ProductListing.objects.get(pk=product.pk).main_image.name, product.main_image.name)
+        self.assertFalse(os.path.exists(os.path.join(self.root, legacy)))
+        self.assertIn("Moved 1 images", out.getvalue())
+
+
+class ChunkedUploadTests(MediaTestCase):
+    """Resumable uploads: checked chunks streamed to disk, then attached to a product by token."""
+
+    def media_settings(self):
+        return {
+            **super().media_settings(),
+            "MEDIA_ROOT": os.path.join(self.root, "media"),
+            "CHUNKED_UPLOAD_DIR": os.path.join(self.root, "partial"),
+            "CHUNKED_UPLOAD_CHUNK_SIZE": 1024,
+        }
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor.user)
+        self.photo = make_photo(size=(400, 300)).read()
+
+    def send(self, token, offset, chunk, checksum=None):
+        return self.client.put(
+            f"/api/uploads/{token}/", chunk, content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def upload(self, data):
+        token = self.client.post("/api/uploads/", {
+            "filename": "kettle.jpg", "size": len(data), "sha256": hashlib.sha256(data).hexdigest(),
+        }, format="json").json()["token"]
+        for offset in range(0, len(data), 1024):
+            self.assertEqual(self.send(token, offset, data[offset:offset + 1024]).status_code, 200)
+        self.assertEqual(self.client.post(f"/api/uploads/{token}/complete/").json()["status"], "complete")
+        return token
+
+    def test_bad_and_out_of_order_chunks_are_rejected(self):
+        data = self.photo
+        token = self.client.post("/api/uploads/", {"filename": "kettle.jpg", "size": len(data)}, format="json").json()["token"]
+        self.assertEqual(self.send(token, 0, data[:1024]).status_code, 200)
+
+        response = self.send(token, 1024, data[1024:2048], checksum="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        # a resent or skipped chunk is answered with the offset to resume from
+        response = self.send(token, 2048, data[2048:3072])
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 1024))
+        self.assertEqual(self.client.get(f"/api/uploads/{token}/").json()["offset"], 1024)
+        self.assertEqual(os.path.getsize(os.path.join(self.root, "partial", f"{token}.part")), 1024)
+        # a bad chunk is refused before the row lock is taken, and leaves no spooled file behind
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.send(token, 1024, data[1024:2048], checksum="0" * 64).status_code, 400)
+        self.assertFalse(any("FOR UPDATE" in q["sql"] for q in ctx.captured_queries))
+        self.assertEqual(os.listdir(os.path.join(self.root, "partial")), [f"{token}.part"])
+
+        self.assertEqual(self.client.post(f"/api/uploads/{token}/complete/").status_code, 400)
+        self.assertEqual(self.client.delete(f"/api/uploads/{token}/").status_code, 204)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "partial", f"{token}.part")))
+
+    def test_completed_upload_attaches_to_product(self):
+        main_token, gallery_token = self.upload(self.photo), self.upload(make_photo(color="blue").read())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/vendor/products/create/", {
+                "title": "Kettle", "price": "12.00",
+                "main_image_upload": main_token, "gallery_uploads": [gallery_token],
+            }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        product = Product.objects.get(pk=response.json()["id"])
+        self.assertEqual(product.main_image.width, 400)
+        self.assertEqual(product.images.count(), 1)
+        self.assertEqual(MediaBlob.objects.get(name=product.main_image.name).refs, 1)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+        # a token is used once
+        response = self.client.patch(f"/api/vendor/products/{product.pk}/", {"main_image_upload": main_token}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class GalleryUploadTests(MediaTestCase):
+    """Many gallery images per request: one INSERT, one primary, variants queued."""
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(title="Desk", price=Decimal("5.00"), vendor=self.vendor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.vendor.user)
+        self.url = f"/api/vendor/products/{self.product.pk}/images/"
+
+    def post(self, colors, **extra):
+        files = [make_photo(f"{color}.jpg", color=color) for color in colors]
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {"images": files, **extra}, format="multipart")
+
+    def test_bulk_upload(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(["red", "green", "blue"], primary=1)
+        self.assertEqual(response.status_code, 201, response.content)
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "main_productimage"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([image["is_primary"] for image in response.json()], [False, True, False])
+
+        images = self.product.images.order_by("pk")
+        self.assertTrue(all(image.image_variants.get("src") == image.image.name for image in images))
+
+        # later batches keep the primary unless asked to move it
+        self.post(["white"])
+        self.assertEqual(self.product.images.get(is_primary=True).pk, images[1].pk)
+        newest = self.post(["black"], primary=0).json()[0]
+        self.assertEqual(list(self.product.images.filter(is_primary=True).values_list("pk", flat=True)), [newest["id"]])
+
+    def test_rejects_other_vendors_and_bad_primary(self):
+        self.assertEqual(self.post(["red"], primary=1).status_code, 400)
+        other = make_vendor("other", "Other Shop")
+        self.client.force_authenticate(other.user)
+        self.assertEqual(self.post(["red"]).status_code, 404)
+        self.assertFalse(ProductImage.objects.exists())
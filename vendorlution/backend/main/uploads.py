@@ -0,0 +1,189 @@
+# main/uploads.py - Resumable chunked uploads for listing photos
+"""
+Large photos can be sent in pieces instead of one multipart request:
+
+    POST   /api/uploads/                  {"filename", "size", "sha256"?} -> {"token", "offset": 0, ...}
+    PUT    /api/uploads/<token>/          raw chunk bytes, with headers
+                                              Upload-Offset: <bytes already received>
+                                              Chunk-SHA256:  <hex digest of this chunk>
+    GET    /api/uploads/<token>/          current offset, to resume after a dropped connection
+    POST   /api/uploads/<token>/complete/ move the file into media storage
+    DELETE /api/uploads/<token>/          give up
+
+Each chunk is streamed from the request into a temporary file under
+CHUNKED_UPLOAD_DIR, READ_SIZE bytes at a time, and only counts once its
+checksum matches: then, under the upload's row lock, it is moved onto
+the end of the partial file. A failed chunk is thrown away so the client
+just resends it. A completed upload's token is then passed to the vendor
+product endpoints (main_image_upload / gallery_uploads), which claim() it:
+the stored file's reference moves from the upload to the row.
+Unclaimed uploads expire after CHUNKED_UPLOAD_TTL seconds
+(purge_chunked_uploads).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+from .images import variants_field
+from .models_extended import ChunkedUpload
+from .storage import release
+
+READ_SIZE = 64 * 1024
+
+
+def expiry():
+    return timezone.now() + timedelta(seconds=settings.CHUNKED_UPLOAD_TTL)
+
+
+def part_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{upload.token}.part")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while data := fh.read(READ_SIZE):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def receive_chunk(upload, stream, length, checksum):
+    """
+    Spool `length` bytes of `stream` into a temporary file beside the
+    partial one and check them against `checksum`; returns its path.
+    Runs before the row lock is taken, so a client stalling mid-chunk
+    holds no transaction or lock while its bytes trickle in.
+    """
+    if not 0 < length <= settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise serializers.ValidationError({"chunk": f"Chunks must be 1 to {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes"})
+    if upload.offset + length > upload.size:
+        raise serializers.ValidationError({"chunk": "Chunk runs past the declared size"})
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"{upload.token}.", suffix=".chunk", dir=settings.CHUNKED_UPLOAD_DIR)
+    digest, remaining = hashlib.sha256(), length
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while remaining and (data := stream.read(min(READ_SIZE, remaining))):
+                digest.update(data)
+                fh.write(data)
+                remaining -= len(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if remaining or digest.hexdigest() != checksum.strip().lower():
+            problem = "Connection dropped mid-chunk" if remaining else "Chunk checksum does not match"
+            raise serializers.ValidationError({"chunk": f"{problem}; resend from offset {upload.offset}"})
+    except BaseException:
+        discard_chunk(path)
+        raise
+    return path
+
+
+def append_chunk(upload, chunk, length):
+    """
+    Move a received chunk to upload.offset of the partial file (the caller
+    holds the row lock and has checked the client's offset against it).
+    """
+    path = part_path(upload)
+    if upload.offset == 0:
+        # also drops whatever an abandoned earlier attempt left behind
+        os.replace(chunk, path)
+    else:
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+b") as fh, open(chunk, "rb") as src:
+            fh.seek(upload.offset)
+            shutil.copyfileobj(src, fh, READ_SIZE)
+            # drop anything a previous, interrupted write left past the new end
+            fh.truncate()
+            fh.flush()
+            os.fsync(fh.fileno())
+    upload.offset += length
+    upload.expires_at = expiry()
+    upload.save(update_fields=["offset", "expires_at", "updated_at"])
+
+
+def discard_chunk(chunk):
+    """Remove a received chunk that was not moved into the partial file."""
+    try:
+        os.remove(chunk)
+    except FileNotFoundError:
+        pass
+
+
+def finalize(upload):
+    """Check the received file and save it into default storage (caller holds the row lock)."""
+    if upload.offset != upload.size:
+        raise serializers.ValidationError({"offset": f"Only {upload.offset} of {upload.size} bytes received"})
+    path = part_path(upload)
+    if upload.sha256 and _sha256(path) != upload.sha256:
+        raise serializers.ValidationError({"sha256": "File checksum does not match; restart the upload"})
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        raise serializers.ValidationError({"file": "Upload is not a supported image"})
+    with open(path, "rb") as fh:
+        upload.file = default_storage.save(f"uploads/{get_valid_filename(upload.filename)}", File(fh))
+    upload.status = ChunkedUpload.Status.COMPLETE
+    upload.expires_at = expiry()
+    upload.save(update_fields=["file", "status", "expires_at", "updated_at"])
+    os.remove(path)
+
+
+def discard_files(upload):
+    """post_delete: remove the partial file, and the stored file unless a row claimed it."""
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    if upload.file:
+        transaction.on_commit(lambda: release(upload.file))
+
+
+def claim(upload):
+    """Take over a completed upload's stored file (call inside the transaction that saves the row)."""
+    if not ChunkedUpload.objects.filter(pk=upload.pk, file=upload.file).update(file=""):
+        raise serializers.ValidationError("Upload was already used")
+    ChunkedUpload.objects.filter(pk=upload.pk).delete()
+    return upload.file
+
+
+def attach(instance, field, upload):
+    """Point instance.<field> at a completed upload (saving it is up to the caller)."""
+    name = claim(upload)
+    previous = getattr(instance, field).name
+    if instance.pk and previous:
+        if previous == name:
+            # same content as the current image: keep one reference, not two
+            transaction.on_commit(lambda: release(name))
+            return
+        # main.signals releases the replaced image once the row is saved
+        instance.__dict__[f"_prev_{field}"] = (previous, getattr(instance, variants_field(field)))
+    setattr(instance, field, name)
+
+
+class UploadTokenField(serializers.CharField):
+    """Write-only token of one of the requesting user's completed uploads; validates to the ChunkedUpload."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("write_only", True)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        token = super().to_internal_value(data)
+        user = getattr(self.context.get("request"), "user", None)
+        upload = ChunkedUpload.objects.filter(
+            token=token, user_id=getattr(user, "pk", None), status=ChunkedUpload.Status.COMPLETE,
+        ).first()
+        if upload is None:
+            raise serializers.ValidationError("Unknown or unfinished upload")
+        return upload
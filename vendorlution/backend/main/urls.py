@@ -7,6 +7,15 @@ urlpatterns = [
     # Public (no auth)
     # ======================
 
+    # Homepage bootstrap
+    path("home/", views.HomeView.as_view(), name="home"),
+
+    # Sitemaps / product feed (gzip shards from build_catalog_feeds)
+    path("sitemap.xml", views.SitemapIndexView.as_view(), name="sitemap-index"),
+    path("feed/", views.CatalogFeedIndexView.as_view(), name="catalog-feed"),
+    path("sitemap-<int:shard>.xml.gz", views.CatalogShardView.as_view(), {"kind": "sitemap"}, name="sitemap-shard"),
+    path("feed-<int:shard>.jsonl.gz", views.CatalogShardView.as_view(), {"kind": "feed"}, name="feed-shard"),
+
     # Categories
     path("categories/", views.CategoryListView.as_view(), name="category-list"),
     path("categories/all/", views.CategoryAllView.as_view(), name="category-all"),
@@ -16,6 +25,8 @@ urlpatterns = [
     path("products/<int:pk>/", views.ProductDetailView.as_view(), name="product-detail"),
     path("products/new/", views.ProductNewListView.as_view(), name="product-new"),
     path("products/popular/", views.ProductPopularListView.as_view(), name="product-popular"),
+    path("products/<int:pk>/similar/", views.ProductSimilarListView.as_view(), name="product-similar"),
+    path("products/suggest/", views.ProductSuggestView.as_view(), name="product-suggest"),
 
     # Vendors
     path("vendors/", views.VendorListView.as_view(), name="vendor-list"),
@@ -81,6 +92,13 @@ urlpatterns = [
     path("me/notifications/", views.MyNotificationsView.as_view(), name="me-notifications"),
     path("me/notifications/<int:pk>/read/", views.NotificationMarkReadView.as_view(), name="me-notifications-read"),
 
+    # Saved searches
+    path("me/saved-searches/", views.MySavedSearchesView.as_view(), name="me-saved-searches"),
+    path("me/saved-searches/<int:pk>/", views.MySavedSearchDetailView.as_view(), name="me-saved-search-detail"),
+
+    # Recently viewed products (last N, newest first)
+    path("me/recently-viewed/", views.MyRecentlyViewedView.as_view(), name="me-recently-viewed"),
+
     # Support
     path("me/support/", views.MySupportTicketsView.as_view(), name="me-support"),
 
@@ -113,4 +131,12 @@ urlpatterns = [
     path("vendor/products/create/", views.VendorProductCreateView.as_view(), name="vendor-product-create"),
     path("vendor/products/<int:pk>/", views.VendorProductUpdateView.as_view(), name="vendor-product-update"),
     path("vendor/products/<int:pk>/delete/", views.VendorProductDeleteView.as_view(), name="vendor-product-delete"),
+    path("vendor/products/<int:pk>/images/", views.VendorProductImagesView.as_view(), name="vendor-product-images"),
+
+    # ======================
+    # CHUNKED UPLOADS (resumable; tokens attach to products)
+    # ======================
+    path("uploads/", views.ChunkedUploadCreateView.as_view(), name="upload-create"),
+    path("uploads/<str:token>/", views.ChunkedUploadDetailView.as_view(), name="upload-detail"),
+    path("uploads/<str:token>/complete/", views.ChunkedUploadCompleteView.as_view(), name="upload-complete"),
 ]
\ No newline at end of file
@@ -0,0 +1,83 @@
+# main/view_counts.py - Write-behind product view counter
+"""
+ProductDetailView records each view in a per-process buffer instead of
+writing to the database. After a request finishes, the buffer is flushed
+once it is older than PRODUCT_VIEW_FLUSH_SECONDS or holds more than
+PRODUCT_VIEW_FLUSH_SIZE products: one record_product_views() statement
+(UPDATE ... FROM (VALUES ...)) adds the counts to Product.view_count,
+ProductViewDay and the popularity score.
+
+A process that dies between flushes loses at most that window of views;
+a failed flush puts its counts back for the next attempt.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .popularity import record_product_views
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._started = time.monotonic()
+
+    def record(self, product_id, views=1):
+        with self._lock:
+            if not self._counts:
+                self._started = time.monotonic()
+            self._counts[product_id] += views
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def due(self):
+        with self._lock:
+            if not self._counts:
+                return False
+            return (
+                len(self._counts) >= settings.PRODUCT_VIEW_FLUSH_SIZE
+                or time.monotonic() - self._started >= settings.PRODUCT_VIEW_FLUSH_SECONDS
+            )
+
+    def _take(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            return counts
+
+    def flush(self):
+        """Write the buffered counts; returns how many products they covered."""
+        counts = self._take()
+        if not counts:
+            return 0
+        try:
+            record_product_views(counts)
+        except Exception:
+            with self._lock:
+                self._counts.update(counts)
+            raise
+        return len(counts)
+
+    def clear(self):
+        self._take()
+
+
+product_views = ViewBuffer()
+
+
+def flush_if_due(**kwargs):
+    """request_finished receiver: the write happens after the response is sent, never inside the view."""
+    if not product_views.due():
+        return
+    try:
+        product_views.flush()
+    except DatabaseError:
+        logger.exception("Product view flush failed; counts kept for the next attempt")
@@ -1,13 +1,20 @@
 # main/views.py - COMPLETE with vendor products, checkout, shipments, disputes
 from rest_framework import generics, filters, permissions, status, serializers
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Prefetch, Q
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.core.cache import cache
+from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
 from django.db import transaction as db_tx
 from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from decimal import Decimal
+import hashlib
+from xml.sax.saxutils import escape as xml_escape
 
 from wallet.models import Wallet, LedgerEntry, PaymentIntent
 from wallet.services import WalletService
@@ -19,26 +26,70 @@ from .models import (
     Wallet as OldWallet, Transaction, Payout,
     Discount, Conversation, Message,
     PaymentMethod, CustomerAddress, Notification, SupportTicket, ResolutionCase,
+    Banner, LIVE_PRODUCT,
 )
-from .models_extended import Shipment, Dispute
+from .models_extended import Shipment, Dispute, ProductListing, SavedSearch, ChunkedUpload
+from .caching import CachedListMixin, CachedRetrieveMixin, versioned_key
+from .conditional import ConditionalGetMixin
+from .facets import cached_facets
+from .feeds import SITEMAP_NS, ensure_shard, load_manifest, shard_path
+from .filters import ProductFilter
+from .geo import NearFilter
+from .fieldsets import SparseQuerysetMixin, sparse_options, sparse_queryset
+from .pagination import KeysetPagination
+from .search import SUGGEST_DEFAULT_LIMIT, suggest_completions
+from .search_engines import CatalogSearchFilter
+from .similarity import TOP_K, similar_listings
+from .recently_viewed import clear as clear_recently_viewed, record_view, recently_viewed_listings
+from .uploads import append_chunk, discard_chunk, expiry as upload_expiry, finalize, receive_chunk
+from .view_counts import product_views
 
 from .serializers import (
     ProductCategorySerializer, VendorProfileSerializer, VendorLiteSerializer,
-    VendorProfileWriteSerializer, ProductListSerializer, ProductDetailSerializer,
-    ProductCreateSerializer, ProductRatingSerializer,
+    VendorProfileWriteSerializer, ProductDetailSerializer,
+    PRODUCT_CARD_FIELDS, ProductListingSerializer, VendorProductCardSerializer,
+    ProductCreateSerializer, ProductRatingSerializer, ChunkedUploadSerializer,
+    ProductImageSerializer, ProductImageUploadSerializer,
     WishlistSerializer, CartSerializer, CartItemSerializer, OrderSerializer,
     WalletSerializer, TransactionSerializer, PayoutSerializer,
     DiscountSerializer, DiscountCreateSerializer,
     ConversationSerializer, MessageSerializer, PaymentMethodSerializer,
-    CustomerAddressSerializer, NotificationSerializer, SupportTicketSerializer,
+    CustomerAddressSerializer, NotificationSerializer, SavedSearchSerializer, SupportTicketSerializer,
     ResolutionCaseSerializer, RegisterSerializer, MeSerializer, UserPublicSerializer,
+    BannerSerializer,
 )
 
 # ============================================================
 # Public Endpoints – Catalog & Ratings
 # ============================================================
 
-class CategoryListView(generics.ListAPIView):
+def _product_cards(queryset):
+    """Pin the joins/columns ProductCardSerializer reads: one query per page, no per-row lookups."""
+    return queryset.select_related("category", "vendor").only(*PRODUCT_CARD_FIELDS)
+
+
+def _live_products():
+    """
+    Active, unsold product cards from the ProductListing read model (one
+    narrow table, no joins); the main_listing_* partial indexes cover it.
+    """
+    return ProductListing.objects.filter(LIVE_PRODUCT)
+
+
+def _new_products():
+    return _live_products().order_by("-created_at")
+
+
+def _popular_products():
+    return _live_products().order_by("-popularity", "-product_id")
+
+
+def _featured_vendors():
+    return VendorProfile.objects.filter(is_active=True).select_related("user").order_by("-rating_avg", "shop_name")
+
+
+class CategoryListView(ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
+    cache_namespace = "category"
     queryset = ProductCategory.objects.all().order_by("title")
     serializer_class = ProductCategorySerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -46,23 +97,38 @@ class CategoryListView(generics.ListAPIView):
     ordering_fields = ["title", "created_at"]
 
 
-class CategoryAllView(generics.ListAPIView):
+class CategoryAllView(ConditionalGetMixin, generics.ListAPIView):
     queryset = ProductCategory.objects.all().order_by("title")
     serializer_class = ProductCategorySerializer
     pagination_class = None
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
-    queryset = Product.objects.filter(is_active=True).order_by("-created_at")
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["title", "detail", "category__title", "vendor__shop_name"]
-    ordering_fields = ["created_at", "rating_avg", "price"]
+class ProductListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
+    queryset = _live_products().order_by("-created_at")
+    filter_backends = [DjangoFilterBackend, CatalogSearchFilter, NearFilter, filters.OrderingFilter]
+    filterset_class = ProductFilter
+    search_index = "product"
+    search_fields = ["title", "product__detail", "category_title", "vendor_shop_name"]
+    # full-text matches join back to Product only when ?search= is given
+    search_vector_field = "product__search_vector"
+    ordering_fields = ["created_at", "rating_avg", "price", "popularity"]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
 
     def get_serializer_class(self):
         if self.request and self.request.method == "POST":
             return ProductCreateSerializer
-        return ProductListSerializer
+        return ProductListingSerializer
+
+    def list(self, request, *args, **kwargs):
+        """?facets=1 adds category/condition/price/vendor counts for the filtered set"""
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("facets") in ("1", "true") and isinstance(response.data, dict):
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data["facets"] = cached_facets(
+                queryset, request.query_params, category_label="category_title", vendor_label="vendor_shop_name"
+            )
+        return response
 
     def perform_create(self, serializer):
         """Set vendor from authenticated user"""
@@ -72,10 +138,28 @@ class ProductListCreateView(generics.ListCreateAPIView):
         serializer.save(vendor=vendor)
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+class ProductDetailView(ConditionalGetMixin, CachedRetrieveMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Product.objects.select_related("category", "vendor__user").prefetch_related("images")
     serializer_class = ProductDetailSerializer
     lookup_field = "pk"
+    cache_namespace = "product"
+    conditional_fields = ("updated_at", "category__updated_at", "vendor__updated_at", "images__updated_at")
+
+    def cache_dependencies(self, instance):
+        return [
+            f"category:{instance.category_id}",
+            f"vendor:{instance.vendor_id}",
+            f"user:{instance.vendor.user_id}",
+        ]
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            # buffered in memory; cached and revalidated views count without a query
+            product_views.record(int(self.kwargs["pk"]))
+            if request.user.is_authenticated:
+                record_view(request.user.id, int(self.kwargs["pk"]))
+        return response
 
     def get_permissions(self):
         if self.request.method in ["PUT", "PATCH", "DELETE"]:
@@ -99,59 +183,208 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class ProductNewListView(generics.ListAPIView):
-    serializer_class = ProductListSerializer
+class ProductNewListView(SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = ProductListingSerializer
     pagination_class = None
 
     def get_queryset(self):
         limit = int(self.request.query_params.get("limit", 12))
-        return Product.objects.filter(is_active=True).order_by("-created_at")[:limit]
+        return self.sparse(_new_products())[:limit]
 
 
-class ProductPopularListView(generics.ListAPIView):
-    serializer_class = ProductListSerializer
+class ProductPopularListView(SparseQuerysetMixin, generics.ListAPIView):
+    serializer_class = ProductListingSerializer
     pagination_class = None
 
     def get_queryset(self):
         limit = int(self.request.query_params.get("limit", 12))
-        return Product.objects.filter(is_active=True).order_by("-rating_avg", "-created_at")[:limit]
+        return self.sparse(_popular_products())[:limit]
+
+
+class ProductSimilarListView(SparseQuerysetMixin, generics.ListAPIView):
+    """
+    GET /api/products/<pk>/similar/?limit=<n>
+    Live products most often bought / wishlisted together with <pk>, from the
+    precomputed ProductSimilarity table (see build_product_similarity).
+    """
+    serializer_class = ProductListingSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        try:
+            limit = max(1, min(int(self.request.query_params.get("limit", 12)), TOP_K))
+        except ValueError:
+            limit = 12
+        return self.sparse(similar_listings(self.kwargs["pk"]))[:limit]
+
+
+class ProductSuggestView(APIView):
+    """
+    GET /api/products/suggest/?q=<text>&limit=<n>
+    Typeahead completions from product titles and shop names:
+    [{"type": "product"|"vendor", "id": .., "text": .., "slug"?: ..}]
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", SUGGEST_DEFAULT_LIMIT))
+        except ValueError:
+            limit = SUGGEST_DEFAULT_LIMIT
+        return Response(suggest_completions(request.query_params.get("q", ""), limit))
 
 
-class VendorFeaturedListView(generics.ListAPIView):
+class VendorFeaturedListView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = VendorProfileSerializer
     pagination_class = None
 
     def get_queryset(self):
         limit = int(self.request.query_params.get("limit", 8))
-        return VendorProfile.objects.filter(is_active=True).order_by("-rating_avg", "shop_name")[:limit]
+        return self.sparse(_featured_vendors())[:limit]
 
 
-class VendorListView(generics.ListAPIView):
-    queryset = VendorProfile.objects.filter(is_active=True).order_by("shop_name")
+class VendorListView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListAPIView):
+    queryset = VendorProfile.objects.filter(is_active=True).select_related("user").order_by("shop_name")
     serializer_class = VendorProfileSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [CatalogSearchFilter, NearFilter, filters.OrderingFilter]
+    search_index = "vendor"
     search_fields = ["shop_name", "description", "address"]
     ordering_fields = ["shop_name", "rating_avg", "created_at"]
+    pagination_class = KeysetPagination
 
 
-class VendorAllView(generics.ListAPIView):
+class VendorAllView(ConditionalGetMixin, generics.ListAPIView):
     queryset = VendorProfile.objects.filter(is_active=True).order_by("shop_name")
     serializer_class = VendorLiteSerializer
     pagination_class = None
 
 
-class VendorDetailView(generics.RetrieveAPIView):
-    queryset = VendorProfile.objects.filter(is_active=True)
+class VendorDetailView(ConditionalGetMixin, CachedRetrieveMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
+    queryset = VendorProfile.objects.filter(is_active=True).select_related("user")
     serializer_class = VendorProfileSerializer
     lookup_field = "pk"
+    cache_namespace = "vendor"
 
+    def cache_dependencies(self, instance):
+        return [f"user:{instance.user_id}"]
 
-class VendorBySlugView(generics.RetrieveAPIView):
-    queryset = VendorProfile.objects.filter(is_active=True)
-    serializer_class = VendorProfileSerializer
+
+class VendorBySlugView(VendorDetailView):
     lookup_field = "slug"
 
 
+# Namespaces whose changes invalidate the homepage payload (bumped in signals);
+# "user" because featured vendors embed their owner
+HOME_CACHE_NAMESPACES = ("product", "vendor", "category", "banner", "user")
+
+
+class HomeView(APIView):
+    """
+    GET /api/home/
+    Landing page bootstrap in one payload:
+    {"new_products", "popular_products", "featured_vendors", "categories", "banners"}
+    Served from cache until a product, vendor, vendor owner, category or banner changes.
+    """
+    permission_classes = [permissions.AllowAny]
+    new_limit = 12
+    popular_limit = 12
+    featured_limit = 8
+
+    def get(self, request):
+        shape = hashlib.sha1(
+            f"{request.query_params.get('fields', '')}|{request.query_params.get('expand', '')}".encode()
+        ).hexdigest()
+        key = versioned_key("home", HOME_CACHE_NAMESPACES, request.build_absolute_uri("/"), shape)
+        data = cache.get(key)
+        if data is None:
+            data = self.build(request)
+            cache.set(key, data, settings.HOME_CACHE_TTL)
+        return Response(data)
+
+    def build(self, request):
+        context = {"request": request}
+
+        def cards(queryset, limit):
+            queryset = sparse_queryset(ProductListingSerializer, queryset, request)[:limit]
+            return ProductListingSerializer(queryset, many=True, context=context).data
+
+        vendors = sparse_queryset(VendorProfileSerializer, _featured_vendors(), request)[: self.featured_limit]
+        return {
+            "new_products": cards(_new_products(), self.new_limit),
+            "popular_products": cards(_popular_products(), self.popular_limit),
+            "featured_vendors": VendorProfileSerializer(vendors, many=True, context=context).data,
+            "categories": ProductCategorySerializer(
+                ProductCategory.objects.all().order_by("title"), many=True, context=context
+            ).data,
+            "banners": BannerSerializer(
+                Banner.objects.filter(active=True).order_by("-created_at"), many=True, context=context
+            ).data,
+        }
+
+
+class _CatalogFeedMixin:
+    permission_classes = [permissions.AllowAny]
+
+    def cache_headers(self, response):
+        response["Cache-Control"] = f"public, max-age={settings.CATALOG_FEED_TTL}"
+        return response
+
+
+class SitemapIndexView(_CatalogFeedMixin, APIView):
+    """
+    GET /api/sitemap.xml
+    Sitemap index pointing at the gzip shards written by build_catalog_feeds.
+    """
+
+    def get(self, request):
+        entries = []
+        for key, state in sorted(load_manifest()["shards"].items(), key=lambda item: int(item[0])):
+            url = request.build_absolute_uri(reverse("sitemap-shard", args=[int(key)]))
+            lastmod = f"<lastmod>{state['lastmod']}</lastmod>" if state.get("lastmod") else ""
+            entries.append(f"<sitemap><loc>{xml_escape(url)}</loc>{lastmod}</sitemap>")
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+            + "\n".join(entries)
+            + "\n</sitemapindex>\n"
+        )
+        return self.cache_headers(HttpResponse(body, content_type="application/xml"))
+
+
+class CatalogFeedIndexView(_CatalogFeedMixin, APIView):
+    """GET /api/feed/ -> {"shards": [{"url", "count", "lastmod"}]} for the JSONL product feed."""
+
+    def get(self, request):
+        shards = [
+            {
+                "url": request.build_absolute_uri(reverse("feed-shard", args=[int(key)])),
+                "count": state["count"],
+                "lastmod": state.get("lastmod"),
+            }
+            for key, state in sorted(load_manifest()["shards"].items(), key=lambda item: int(item[0]))
+        ]
+        return self.cache_headers(Response({"shards": shards}))
+
+
+class CatalogShardView(_CatalogFeedMixin, APIView):
+    """
+    GET /api/sitemap-<n>.xml.gz, /api/feed-<n>.jsonl.gz
+    Streams a prebuilt shard from disk (built on first request if missing);
+    the shard fingerprint doubles as its ETag.
+    """
+
+    def get(self, request, kind, shard):
+        state = ensure_shard(shard)
+        if state is None:
+            return Response({"detail": "Not found"}, status=404)
+        etag = f'"{hashlib.sha1(state["fingerprint"].encode()).hexdigest()}"'
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            return self.cache_headers(not_modified)
+        response = FileResponse(open(shard_path(kind, shard), "rb"), content_type="application/gzip")
+        response["ETag"] = etag
+        return self.cache_headers(response)
+
+
 class ProductRatingListCreateView(generics.ListCreateAPIView):
     """GET: list ratings (public), POST: create rating (auth)"""
     queryset = ProductRating.objects.all().order_by("-created_at")
@@ -289,7 +522,12 @@ class CartDetailView(APIView):
     def get(self, request, *args, **kwargs):
         customer = _get_customer(request.user)
         cart, _ = Cart.objects.get_or_create(customer=customer)
-        return Response(CartSerializer(cart).data)
+        if sparse_options(request) is not None:
+            cart = sparse_queryset(CartSerializer, Cart.objects.filter(pk=cart.pk), request).get()
+        else:
+            items = CartItem.objects.select_related("product__category", "product__vendor__user")
+            prefetch_related_objects([cart], Prefetch("items", queryset=items))
+        return Response(CartSerializer(cart, context={"request": request}).data)
 
 
 class CartItemAddView(APIView):
@@ -342,21 +580,27 @@ class CartItemUpdateDeleteView(APIView):
 # Orders
 # ============================================================
 
-class MyOrdersView(generics.ListAPIView):
+def _order_items():
+    """Order items with everything OrderItemSerializer's nested product reads."""
+    return OrderItem.objects.select_related("product__category", "product__vendor__user")
+
+
+class MyOrdersView(SparseQuerysetMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         customer = _get_customer(self.request.user)
-        return (
+        return self.sparse(
             Order.objects.filter(customer=customer)
             .select_related("customer__user")
-            .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product__vendor")))
+            .prefetch_related(Prefetch("items", queryset=_order_items()))
             .order_by("-created_at")
         )
 
 
-class VendorOrdersView(generics.ListAPIView):
+class VendorOrdersView(SparseQuerysetMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
 
@@ -364,11 +608,11 @@ class VendorOrdersView(generics.ListAPIView):
         vendor = _get_vendor(self.request.user)
         if not vendor:
             return Order.objects.none()
-        return (
+        return self.sparse(
             Order.objects.filter(items__product__vendor=vendor)
             .distinct()
             .select_related("customer__user")
-            .prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product__vendor")))
+            .prefetch_related(Prefetch("items", queryset=_order_items()))
             .order_by("-created_at")
         )
 
@@ -492,9 +736,12 @@ class MyPaymentMethodsView(generics.ListAPIView):
 # Conversations & Messages
 # ============================================================
 
-class MyConversationsView(generics.ListCreateAPIView):
+class MyConversationsView(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_per_user = True
     serializer_class = ConversationSerializer
+    # last_message_at is saved with update_fields, which leaves updated_at alone
+    conditional_fields = ("updated_at", "last_message_at")
 
     def get_queryset(self):
         customer = _get_customer(self.request.user)
@@ -532,8 +779,9 @@ class MyConversationsView(generics.ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class ConversationMessagesView(generics.ListCreateAPIView):
+class ConversationMessagesView(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_per_user = True
     serializer_class = MessageSerializer
 
     def get_queryset(self):
@@ -601,8 +849,9 @@ class MyAddressDetailView(generics.RetrieveUpdateDestroyAPIView):
 # Notifications
 # ============================================================
 
-class MyNotificationsView(generics.ListAPIView):
+class MyNotificationsView(ConditionalGetMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_per_user = True
     serializer_class = NotificationSerializer
 
     def get_queryset(self):
@@ -622,6 +871,51 @@ class NotificationMarkReadView(APIView):
         return Response({"detail": "ok"})
 
 
+# ============================================================
+# Saved searches
+# ============================================================
+
+class MySavedSearchesView(generics.ListCreateAPIView):
+    """Stored searches; new listings matching one notify its owner (see main.saved_searches)."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SavedSearchSerializer
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user).order_by("-created_at")
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class MySavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SavedSearchSerializer
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+
+# ============================================================
+# Recently viewed
+# ============================================================
+
+class MyRecentlyViewedView(APIView):
+    """
+    GET    /api/me/recently-viewed/  last viewed live products, newest first (see main.recently_viewed)
+    DELETE /api/me/recently-viewed/  forget them
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        queryset = sparse_queryset(ProductListingSerializer, ProductListing.objects.all(), request)
+        listings = recently_viewed_listings(request.user.id, queryset)
+        return Response(ProductListingSerializer(listings, many=True, context={"request": request}).data)
+
+    def delete(self, request):
+        clear_recently_viewed(request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # ============================================================
 # Support
 # ============================================================
@@ -1185,23 +1479,25 @@ class DisputeDetailView(APIView):
 # VENDOR PRODUCT ENDPOINTS
 # ============================================================
 
-class VendorProductListView(generics.ListAPIView):
+class VendorProductListView(SparseQuerysetMixin, generics.ListAPIView):
     """GET /api/vendor/products/ - List vendor's own products"""
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = ProductListSerializer
+    serializer_class = VendorProductCardSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         vendor = _get_vendor(self.request.user)
         if not vendor:
             return Product.objects.none()
-        return Product.objects.filter(vendor=vendor).order_by("-created_at")
+        products = _product_cards(Product.objects.filter(vendor=vendor).order_by("-created_at"))
+        return self.sparse(products.only(*PRODUCT_CARD_FIELDS, "view_count"))
 
 
 class VendorProductCreateView(generics.CreateAPIView):
     """POST /api/vendor/products/ - Create new product"""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProductCreateSerializer
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def perform_create(self, serializer):
         vendor = _get_vendor(self.request.user)
@@ -1214,7 +1510,7 @@ class VendorProductUpdateView(generics.UpdateAPIView):
     """PATCH /api/vendor/products/<pk>/ - Update product"""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProductCreateSerializer
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
 
     def get_queryset(self):
         vendor = _get_vendor(self.request.user)
@@ -1223,6 +1519,27 @@ class VendorProductUpdateView(generics.UpdateAPIView):
         return Product.objects.filter(vendor=vendor)
 
 
+class VendorProductImagesView(generics.GenericAPIView):
+    """POST /api/vendor/products/<pk>/images/ - Add many gallery images in one request (see main.gallery)"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ProductImageUploadSerializer
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+
+    def get_queryset(self):
+        vendor = _get_vendor(self.request.user)
+        if not vendor:
+            return Product.objects.none()
+        return Product.objects.filter(vendor=vendor)
+
+    def post(self, request, pk):
+        product = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        images = serializer.save(product=product)
+        data = ProductImageSerializer(images, many=True, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
 class VendorProductDeleteView(generics.DestroyAPIView):
     """DELETE /api/vendor/products/<pk>/ - Soft delete product"""
     permission_classes = [permissions.IsAuthenticated]
@@ -1236,4 +1553,78 @@ class VendorProductDeleteView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         """Soft delete"""
         instance.is_active = False
-        instance.save(update_fields=["is_active"])
\ No newline at end of file
+        instance.save(update_fields=["is_active"])
+
+# ============================================================
+# CHUNKED UPLOADS (see main.uploads)
+# ============================================================
+
+class ChunkedUploadCreateView(generics.CreateAPIView):
+    """POST /api/uploads/ - Start a resumable upload {filename, size, sha256?}"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ChunkedUploadSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, expires_at=upload_expiry())
+
+
+class ChunkedUploadDetailView(APIView):
+    """
+    GET    /api/uploads/<token>/  offset received so far (resume from there)
+    PUT    /api/uploads/<token>/  raw chunk at Upload-Offset, checked against Chunk-SHA256
+    DELETE /api/uploads/<token>/  cancel
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_upload(self, request, token, lock=False):
+        uploads = ChunkedUpload.objects.select_for_update() if lock else ChunkedUpload.objects
+        return generics.get_object_or_404(uploads, token=token, user=request.user)
+
+    def get(self, request, token):
+        return Response(ChunkedUploadSerializer(self.get_upload(request, token)).data)
+
+    def put(self, request, token):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except (KeyError, ValueError):
+            return Response({"detail": "Upload-Offset and Content-Length headers required"}, status=400)
+        checksum = request.headers.get("Chunk-SHA256")
+        if not checksum:
+            return Response({"detail": "Chunk-SHA256 header required"}, status=400)
+        upload = self.get_upload(request, token)
+        if not self.accepts(upload, offset):
+            return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT)
+        # read off the network before locking: a stalled client must not hold the row
+        chunk = receive_chunk(upload, request.stream, length, checksum)
+        try:
+            with db_tx.atomic():
+                upload = self.get_upload(request, token, lock=True)
+                if not self.accepts(upload, offset):
+                    # another request for this token got there first
+                    return Response(ChunkedUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT)
+                append_chunk(upload, chunk, length)
+        finally:
+            discard_chunk(chunk)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    @staticmethod
+    def accepts(upload, offset):
+        # the client resumes from the offset we actually have
+        return upload.status == ChunkedUpload.Status.OPEN and offset == upload.offset
+
+    def delete(self, request, token):
+        self.get_upload(request, token).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadCompleteView(ChunkedUploadDetailView):
+    """POST /api/uploads/<token>/complete/ - Store the received file; its token can then be attached to a product"""
+    http_method_names = ["post", "options"]
+
+    def post(self, request, token):
+        with db_tx.atomic():
+            upload = self.get_upload(request, token, lock=True)
+            if upload.status == ChunkedUpload.Status.OPEN:
+                finalize(upload)
+        return Response(ChunkedUploadSerializer(upload).data)
@@ -15,6 +15,9 @@ export const API_ENDPOINTS = {
     createVendor: "/auth/create-vendor/",
   },
 
+  // HOMEPAGE (new/popular products, featured vendors, categories, banners)
+  home: "/home/",
+
   // CATEGORIES
   categories: { list: "/categories/", all: "/categories/all/" },
 
@@ -24,6 +27,7 @@ export const API_ENDPOINTS = {
     detail: (id) => `/products/${id}/`,
     new: "/products/new/",
     popular: "/products/popular/",
+    suggest: "/products/suggest/",
   },
 
   // VENDORS
@@ -96,6 +100,15 @@ export const API_ENDPOINTS = {
     markRead: (id) => `/me/notifications/${id}/read/`,
   },
 
+  // SAVED SEARCHES (notified when a matching product is listed)
+  savedSearches: {
+    list: "/me/saved-searches/",
+    detail: (id) => `/me/saved-searches/${id}/`,
+  },
+
+  // RECENTLY VIEWED (kept server-side, newest first; DELETE clears)
+  recentlyViewed: "/me/recently-viewed/",
+
   support: { my: "/me/support/" },
   resolutions: { my: "/me/resolutions/" },
 
@@ -118,6 +131,16 @@ export const API_ENDPOINTS = {
     create: "/vendor/products/create/",
     update: (id) => `/vendor/products/${id}/`,
     delete: (id) => `/vendor/products/${id}/delete/`,
+    // many gallery files per request: multipart `images` (+ optional `primary` index)
+    images: (id) => `/vendor/products/${id}/images/`,
+  },
+
+  // CHUNKED UPLOADS (PUT chunks with Upload-Offset + Chunk-SHA256, then complete;
+  // pass the token as main_image_upload / gallery_uploads)
+  uploads: {
+    create: "/uploads/",
+    detail: (token) => `/uploads/${token}/`,
+    complete: (token) => `/uploads/${token}/complete/`,
   },
 };
 